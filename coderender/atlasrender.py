@@ -0,0 +1,272 @@
+import io
+import threading
+import numpy as np
+from PIL import Image, ImageColor
+
+MASK_CACHE_SIZE = 4096  # Token masks kept per atlas
+
+# Glyph-atlas render engine for the code-to-PNG tools (optional, needs NumPy).
+# ImageFormatter rasterizes every token with FreeType through ImageDraw.text. This engine keeps the
+# formatter's own layout (positions, colors, line numbers) but draws from an atlas of glyph masks
+# rasterized once per font and size: each token is assembled from atlas cells with a few array
+# operations, and only its inked pixels are blended into a NumPy image with the arithmetic PIL uses.
+# Cells sit one "M" advance apart, which is only what ImageDraw.text does when every character of a
+# token has exactly that advance and no kerning applies; any other text falls back to ImageFormatter.
+
+
+class GlyphAtlas:
+    """Glyph masks of one font, stored as equally sized cells relative to the pen position."""
+
+    def __init__(self, font):
+        self.font = font
+        self.advance = font.getlength("M")
+        self.index = {}    # char -> cell index
+        self.glyphs = []   # (mask, x offset, y offset) per char
+        self.cells = None  # Stacked cells, rebuilt when new chars are added
+        self.masks = {}    # text -> (ys, xs, alpha) or None
+        self.fitting = {}  # text -> whether it lays out on the cell grid
+        self.left = self.top = 0
+        self.lock = threading.Lock()
+
+    def _add(self, char):
+        mask, (ox, oy) = self.font.getmask2(char, "L")
+        width, height = mask.size
+        if width and height:
+            array = np.frombuffer(bytes(mask), dtype=np.uint8).reshape(height, width)
+        else:
+            array = np.zeros((0, 0), dtype=np.uint8)
+        self.index[char] = len(self.glyphs)
+        self.glyphs.append((array, ox, oy))
+        self.cells = None
+        self.masks.clear()  # Cached masks were cut from the old cell geometry
+
+    def _build(self):
+        boxes = [(ox, oy, ox + m.shape[1], oy + m.shape[0]) for m, ox, oy in self.glyphs if m.size]
+        self.left = min((b[0] for b in boxes), default=0)
+        self.top = min((b[1] for b in boxes), default=0)
+        right = max((b[2] for b in boxes), default=1)
+        bottom = max((b[3] for b in boxes), default=1)
+        cells = np.zeros((len(self.glyphs), bottom - self.top, right - self.left), dtype=np.uint8)
+        for i, (mask, ox, oy) in enumerate(self.glyphs):
+            if mask.size:
+                y, x = oy - self.top, ox - self.left
+                cells[i, y:y + mask.shape[0], x:x + mask.shape[1]] = mask
+        self.cells = cells
+
+    def fits_cells(self, text):
+        """Whether PIL lays text out exactly one cell per character (no proportional or missing glyphs,
+        no kerning), so the atlas reproduces it."""
+        fits = self.fitting.get(text)
+        if fits is None:
+            getlength, advance = self.font.getlength, self.advance
+            fits = (getlength(text) == len(text) * advance
+                    and all(getlength(char) == advance for char in set(text)))
+            with self.lock:
+                if len(self.fitting) >= MASK_CACHE_SIZE:
+                    self.fitting.clear()
+                self.fitting[text] = fits
+        return fits
+
+    def text_mask(self, text):
+        """Return (ys, xs, alpha) of the inked pixels of text drawn at the origin, or None."""
+        with self.lock:
+            if text in self.masks:
+                return self.masks[text]
+            for char in text:
+                if char not in self.index:
+                    self._add(char)
+            if self.cells is None:
+                self._build()
+            cells, left, top = self.cells, self.left, self.top
+        ids = np.fromiter((self.index[c] for c in text), dtype=np.intp, count=len(text))
+        count, (height, width) = len(ids), cells.shape[1:]
+        step = int(self.advance)
+
+        # Cells wider than the advance overlap their neighbours, so they are placed in
+        # interleaved passes in which no two cells touch; overlaps are composited like Pillow
+        # does inside one string: src + DIV255(dst * (255 - src))
+        passes = max(1, -(-width // step))
+        canvas = np.zeros((height, (count + passes) * step + width), dtype=np.uint32)
+        for r in range(passes):
+            group = cells[ids[r::passes]]
+            if not len(group):
+                continue
+            span = passes * step
+            view = canvas[:, r * step:r * step + len(group) * span].reshape(height, len(group), span)
+            src = group.transpose(1, 0, 2).astype(np.uint32)
+            tmp = view[:, :, :width] * (255 - src) + 128
+            view[:, :, :width] = src + (((tmp >> 8) + tmp) >> 8)
+
+        # Only inked pixels are kept: offsets from the text origin and their coverage.
+        # Tokens repeat (keywords, indentation), so these are cached per text; blank ones as None
+        ys, xs = np.nonzero(canvas)
+        result = (ys + top, xs + left, canvas[ys, xs][:, None]) if len(ys) else None
+        with self.lock:
+            if len(self.masks) >= MASK_CACHE_SIZE:
+                self.masks.clear()
+            self.masks[text] = result
+        return result
+
+
+_atlases = {}
+_atlases_lock = threading.Lock()
+
+
+def get_atlas(font):
+    key = (getattr(font, "path", id(font)), font.size, getattr(font, "index", 0))
+    with _atlases_lock:
+        atlas = _atlases.get(key)
+        if atlas is None:
+            atlas = _atlases[key] = GlyphAtlas(font)
+        return atlas
+
+
+def supports(formatter):
+    # Pen positions are whole pixels only with integral (hinted) advances; the text itself is checked
+    # once laid out, in format_tokens
+    fonts = formatter.fonts.fonts.values()
+    return not formatter.hl_lines and all(float(f.getlength("M")).is_integer() for f in fonts)
+
+
+def _fill_rect(image, x0, y0, x1, y1, color):
+    # PIL rectangles include both corners
+    image[max(y0, 0):max(y1 + 1, 0), max(x0, 0):max(x1 + 1, 0)] = color
+
+
+def format_tokens(formatter, tokens, outfile):
+    """Drop-in for ImageFormatter.format using the glyph atlas for the text."""
+    tokens = list(tokens)
+    formatter._create_drawables(tokens)
+    formatter._draw_line_numbers()
+    if not all(get_atlas(font).fits_cells(text) for _, text, font, _, _ in formatter.drawables):
+        # Proportional, wide or missing glyphs: only ImageFormatter places them like ImageDraw.text
+        formatter.drawables = []
+        formatter.format(tokens, outfile)
+        return
+    width, height = formatter._get_image_size(formatter.maxlinelength, formatter.maxlineno)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[...] = ImageColor.getrgb(formatter.background_color)
+
+    if formatter.line_numbers and formatter.line_number_fg is not None:
+        rectw = formatter.image_pad + formatter.line_number_width - formatter.line_number_pad
+        _fill_rect(image, 0, 0, rectw, height, ImageColor.getrgb(formatter.line_number_bg))
+        if formatter.line_number_separator:
+            _fill_rect(image, rectw, 0, rectw, height, ImageColor.getrgb(formatter.line_number_fg))
+
+    pixels = image.reshape(-1, 3)
+    placed = {}  # (font, text) -> flat pixel offsets for this image width, bounds, coverage
+    colors = {}
+    for (x, y), text, font, text_fg, text_bg in formatter.drawables:
+        if text_bg:
+            w, h = font.getbbox(text)[2:]
+            _fill_rect(image, x, y, x + w, y + h, ImageColor.getrgb(text_bg))
+        key = (font, text)
+        if key not in placed:
+            glyphs = get_atlas(font).text_mask(text)
+            if glyphs is not None:
+                ys, xs, alpha = glyphs
+                glyphs = (ys * width + xs, ys, xs, (ys[0], ys[-1], xs.min(), xs.max()), alpha, 255 - alpha)
+            placed[key] = glyphs
+        glyphs = placed[key]
+        if glyphs is None:
+            continue
+        offsets, ys, xs, (top, bottom, left, right), alpha, inverse = glyphs
+        if y + top < 0 or y + bottom >= height or x + left < 0 or x + right >= width:
+            inside = (ys + y >= 0) & (ys + y < height) & (xs + x >= 0) & (xs + x < width)
+            offsets, alpha, inverse = offsets[inside], alpha[inside], inverse[inside]
+        if text_fg not in colors:
+            colors[text_fg] = np.array(ImageColor.getrgb(text_fg)[:3], dtype=np.uint32)
+        # Tokens are blended in order with PIL's DIV255(in * (255 - a) + ink * a),
+        # so pixels match ImageDraw.text exactly
+        flat = offsets + (y * width + x)
+        tmp = pixels.take(flat, axis=0) * inverse + colors[text_fg] * alpha + 128
+        pixels[flat] = (tmp + (tmp >> 8)) >> 8
+
+    Image.fromarray(image, "RGB").save(outfile, formatter.image_format.upper())
+
+
+def compare(pil_png, atlas_png):
+    """Pixel difference between two renders: size match, differing pixel fraction and max channel delta."""
+    a = np.asarray(Image.open(io.BytesIO(pil_png)).convert("RGB"), dtype=np.int16)
+    b = np.asarray(Image.open(io.BytesIO(atlas_png)).convert("RGB"), dtype=np.int16)
+    if a.shape != b.shape:
+        return {"same_size": False, "pil_size": a.shape[1::-1], "atlas_size": b.shape[1::-1]}
+    delta = np.abs(a - b)
+    return {"same_size": True, "differing_pixels": float((delta.max(axis=2) > 0).mean()),
+            "max_delta": int(delta.max()) if delta.size else 0}
+
+
+# Built-in inputs for --check: plain ASCII code, and code with accented, combining, wide and
+# symbol characters that many fonts lack or draw at other advances
+CHECK_SAMPLES = {
+    "ascii.py": 'def scale(values, factor=2):\n    """Scale a list."""\n    return [v * factor for v in values if v]  # WAVE, fi, AV\n',
+    "unicode.py": 's = "h\u00e9llo w\u00f6rld \u2705 \u2192 \u2211 \u00df \u6f22\u5b57 \U0001F600"\nt = "e\u0301"  # combining accent\n',
+}
+CHECK_SIZES = (14, 20, 38)
+
+
+def check(fonts, sizes=CHECK_SIZES, style="monokai"):
+    """Render every sample with both engines for each font and size; returns the differing cases."""
+    from renderer import render_png
+
+    failures = []
+    for font_name in fonts:
+        for size in sizes:
+            for name, code in CHECK_SAMPLES.items():
+                for line_numbers in (False, True):
+                    settings = dict(font_name=font_name, font_size=size, line_numbers=line_numbers, style=style)
+                    result = compare(render_png(code, name, engine="pil", **settings),
+                                     render_png(code, name, engine="atlas", **settings))
+                    if not (result["same_size"] and result["max_delta"] == 0):
+                        failures.append((settings, name, result))
+    return failures
+
+
+def main():
+    import sys
+    import time
+    import argparse
+    from renderer import render_png
+
+    parser = argparse.ArgumentParser(description="Render a file with both engines and compare the pixels.")
+    parser.add_argument("input", nargs="?", help="Source file to render")
+    parser.add_argument("--font-name", default="Arial", help="Font name (default: Arial)")
+    parser.add_argument("--font-size", type=int, default=38, help="Font size (default: 38)")
+    parser.add_argument("--line-numbers", action="store_true", help="Show line numbers")
+    parser.add_argument("--style", default="monokai", help="Pygments style (default: monokai)")
+    parser.add_argument("--check", nargs="+", metavar="FONT",
+                        help="Instead of a file, compare built-in ASCII and non-ASCII samples at sizes "
+                             f"{', '.join(map(str, CHECK_SIZES))} in each FONT (include a proportional one); "
+                             "exits 1 on any difference")
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check(args.check, style=args.style)
+        for settings, name, result in failures:
+            print(f"❌ {name} {settings}: {result}")
+        if failures:
+            sys.exit(1)
+        print(f"✅ Pixel-identical to ImageFormatter for {', '.join(args.check)}")
+        return
+    if not args.input:
+        parser.error("an input file or --check is required")
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        code = f.read()
+    settings = dict(font_name=args.font_name, font_size=args.font_size,
+                    line_numbers=args.line_numbers, style=args.style)
+    renders = {}
+    for engine in ("pil", "atlas"):
+        render_png(code, args.input, engine=engine, **settings)  # Warm caches and the atlas
+        start = time.perf_counter()
+        renders[engine] = render_png(code, args.input, engine=engine, **settings)
+        print(f"⏱️ {engine:5s}: {(time.perf_counter() - start) * 1000:.1f} ms")
+    result = compare(renders["pil"], renders["atlas"])
+    if result["same_size"] and result["max_delta"] == 0:
+        print("✅ Pixel-identical to ImageFormatter")
+    else:
+        print(f"❌ Differs from ImageFormatter: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import pygments
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from renderer import render_png
+
+# Parallel, incremental batch rendering.
+# Each output PNG is recorded in a manifest with a hash of its source content and render settings;
+# a file is only re-rendered when that hash changes or its PNG is missing.
+
+MANIFEST_NAME = ".render_manifest.json"
+
+
+def render_hash(code, settings, file_name):
+    h = hashlib.sha256()
+    h.update(code.encode("utf-8"))
+    # The lexer is picked from the file name, and foo.py and foo.js both render to foo.png
+    h.update(b"\0" + os.path.basename(file_name).encode("utf-8") + b"\0")
+    # Settings and the Pygments version both change the pixels
+    h.update(json.dumps(settings, sort_keys=True, default=str).encode("utf-8"))
+    h.update(pygments.__version__.encode("ascii"))
+    return h.hexdigest()
+
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest_path, manifest):
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def _render_job(file_path, output_path, settings):
+    # Runs in a worker process; renderer caches warm up once per worker
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            code = f.read()
+        png = render_png(code, file_path, **settings)
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "wb") as f:
+            f.write(png)
+        return None, len(png)
+    except Exception as e:
+        return str(e), 0
+
+
+def render_batch(jobs, settings, manifest_dir, workers=None, force=False, verbose=True, progress=None):
+    """Render (file_path, output_path) jobs on a process pool, skipping unchanged outputs.
+
+    progress, if given, is called as progress(finished, total) as files complete.
+    Returns a dict with rendered / skipped / failed counts, the failures, elapsed seconds and files per second.
+    """
+    manifest_path = os.path.join(manifest_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    start = time.perf_counter()
+
+    todo = []
+    skipped = 0
+    for file_path, output_path in jobs:
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                digest = render_hash(f.read(), settings, file_path)
+        except (OSError, UnicodeDecodeError):
+            todo.append((file_path, output_path, None))  # Let the worker report the error
+            continue
+        key = os.path.relpath(output_path, manifest_dir)
+        if not force and manifest.get(key) == digest and os.path.exists(output_path):
+            skipped += 1
+        else:
+            todo.append((file_path, output_path, digest))
+
+    rendered = failed = bytes_written = 0
+    failures = []
+    if progress:
+        progress(skipped, len(jobs))
+    try:
+        if todo:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(_render_job, file_path, output_path, settings): (file_path, output_path, digest)
+                    for file_path, output_path, digest in todo
+                }
+                for future in as_completed(futures):
+                    file_path, output_path, digest = futures[future]
+                    error, size = future.result()
+                    key = os.path.relpath(output_path, manifest_dir)
+                    if error is None and digest is not None:
+                        manifest[key] = digest
+                        rendered += 1
+                        bytes_written += size
+                        if verbose:
+                            print(f"✅ Generated: {output_path}")
+                    else:
+                        manifest.pop(key, None)
+                        failed += 1
+                        failures.append((file_path, error or "unreadable file"))
+                        print(f"❌ Failed: {file_path}: {error or 'unreadable file'}")
+                    if progress:
+                        progress(skipped + rendered + failed, len(jobs))
+    finally:
+        # Saved even when interrupted, so finished files are not rendered again
+        save_manifest(manifest_path, manifest)
+
+    elapsed = time.perf_counter() - start
+    files_per_sec = rendered / elapsed if elapsed > 0 else 0.0
+    print(f"📊 Rendered {rendered}, skipped {skipped} unchanged, failed {failed} "
+          f"in {elapsed:.2f}s ({files_per_sec:.1f} files/s, {bytes_written / 1024:.1f} KB written)")
+    return {"rendered": rendered, "skipped": skipped, "failed": failed, "failures": failures,
+            "seconds": elapsed, "files_per_sec": files_per_sec, "bytes": bytes_written}
+
+
+class BackgroundBatch:
+    """Runs render_batch on a daemon thread; progress can be read from another thread (e.g. a UI)."""
+
+    def __init__(self, jobs, settings, manifest_dir, workers=None, force=False):
+        self.total = len(jobs)
+        self.finished = 0
+        self.stats = None
+        self.error = None
+        self.thread = threading.Thread(target=self._run, args=(jobs, settings, manifest_dir, workers, force),
+                                       daemon=True)
+        self.thread.start()
+
+    def _run(self, jobs, settings, manifest_dir, workers, force):
+        try:
+            self.stats = render_batch(jobs, settings, manifest_dir, workers, force,
+                                      verbose=False, progress=self._progress)
+        except Exception as e:
+            self.error = str(e)
+
+    def _progress(self, finished, total):
+        self.finished = finished
+
+    @property
+    def running(self):
+        return self.thread.is_alive()
+
+
+_progress_fragments = {}
+
+
+def show_batch_progress(st, output_folder=None):
+    """Show the BackgroundBatch kept in st.session_state.batch_job, polled every second.
+
+    st is the caller's streamlit module, so this module stays importable without Streamlit.
+    """
+    fragment = _progress_fragments.get(st)
+    if fragment is None:
+        # Built once: a fragment reruns on its own without rerunning the whole page
+        @st.fragment(run_every=1)
+        def fragment(output_folder):
+            job = st.session_state.get("batch_job")
+            if job is None:
+                return
+            if job.running:
+                st.progress(job.finished / max(job.total, 1), text=f"📊 Generating PNGs... {job.finished}/{job.total}")
+            elif job.error:
+                st.error(f"❌ Batch failed: {job.error}")
+            else:
+                stats = job.stats
+                where = f" in '{output_folder}'" if output_folder else ""
+                st.success(f"✅ {stats['rendered']} image(s) created{where}, {stats['skipped']} unchanged "
+                           f"({stats['files_per_sec']:.1f} files/s)")
+                for file_path, error in stats["failures"]:
+                    st.error(f"❌ Failed: {file_path}: {error}")
+
+        _progress_fragments[st] = fragment
+    fragment(output_folder)
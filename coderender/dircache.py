@@ -0,0 +1,57 @@
+import os
+import threading
+
+# Directory listings cached per folder and reused while the mtimes of every directory seen during
+# the walk are unchanged (adding, removing or renaming an entry updates its parent's mtime).
+# Revalidating costs one stat per directory instead of a full os.walk.
+
+_lock = threading.Lock()
+_listings = {}  # (kind, abs folder) -> (dir mtimes, result)
+
+
+def _unchanged(dir_mtimes):
+    try:
+        return all(os.stat(d).st_mtime_ns == m for d, m in dir_mtimes.items())
+    except OSError:
+        return False
+
+
+def _cached(kind, folder, build):
+    key = (kind, os.path.abspath(folder))
+    with _lock:
+        entry = _listings.get(key)
+    if entry is not None and _unchanged(entry[0]):
+        return list(entry[1])
+
+    dir_mtimes, result = build(key[1])
+    with _lock:
+        _listings[key] = (dir_mtimes, result)
+    return list(result)
+
+
+def _walk_files(folder):
+    dir_mtimes = {}
+    all_files = []
+    for root, _, files in os.walk(folder):
+        dir_mtimes[root] = os.stat(root).st_mtime_ns
+        for f in files:
+            all_files.append(os.path.relpath(os.path.join(root, f), start=folder))
+    return dir_mtimes, all_files
+
+
+def _subfolders(folder):
+    dir_mtimes = {folder: os.stat(folder).st_mtime_ns}
+    return dir_mtimes, [f for f in os.listdir(folder) if os.path.isdir(os.path.join(folder, f))]
+
+
+def list_code_files(folder):
+    return _cached("files", folder, _walk_files)
+
+
+def list_subfolders(folder):
+    return _cached("dirs", folder, _subfolders)
+
+
+def clear():
+    with _lock:
+        _listings.clear()
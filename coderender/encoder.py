@@ -0,0 +1,164 @@
+import os
+import io
+import time
+import argparse
+from PIL import Image, features
+
+# Output-encoding stage for the code-to-PNG tools.
+# ImageFormatter always writes a truecolor PNG at Pillow's default settings. Code images hold a
+# handful of solid colors plus their anti-aliased edges, so they shrink a lot with a palette
+# (the solid colors are kept exact, only edge pixels are approximated) or with lossless WebP.
+
+# Format -> file extension
+OUTPUT_FORMATS = {"png": ".png", "webp": ".webp", "avif": ".avif"}
+EFFORTS = ("fast", "balanced", "small")
+PALETTES = ("off", "adaptive")
+PINNED_COLORS = 32  # Most frequent colors copied into the palette exactly
+
+# Writer options per format and effort; "balanced" PNG is Pillow's default (what ImageFormatter writes)
+ENCODER_OPTIONS = {
+    "png": {
+        "fast": {"compress_level": 1},
+        "balanced": {"compress_level": 6},
+        "small": {"compress_level": 9, "optimize": True},
+    },
+    "webp": {
+        "fast": {"lossless": True, "method": 0, "quality": 0},
+        "balanced": {"lossless": True, "method": 4, "quality": 50},
+        "small": {"lossless": True, "method": 6, "quality": 100},
+    },
+    # AVIF has no lossless RGB mode in Pillow: full chroma at quality 90 keeps text edges sharp,
+    # and the encoder speed decides most of the size (lossless WebP is smaller and faster for code)
+    "avif": {
+        "fast": {"quality": 90, "subsampling": "4:4:4", "speed": 8},
+        "balanced": {"quality": 90, "subsampling": "4:4:4", "speed": 6},
+        "small": {"quality": 90, "subsampling": "4:4:4", "speed": 4},
+    },
+}
+
+
+def is_default(output_format="png", palette="off", effort="balanced"):
+    # The settings ImageFormatter already produces, so no re-encoding is needed
+    return output_format == "png" and palette == "off" and effort == "balanced"
+
+
+def check_format(output_format):
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    if output_format != "png" and not features.check(output_format):
+        raise ValueError(f"Pillow was built without {output_format.upper()} support")
+
+
+def adaptive_palette(image):
+    """Convert an RGB image to palette mode, keeping its most frequent colors exact.
+
+    Images with up to 256 colors convert losslessly; otherwise the PINNED_COLORS most common colors
+    (background, line numbers, solid glyph cores) are kept as they are and the remaining slots are
+    fitted to the anti-aliased edge colors.
+    """
+    colors = image.getcolors(256)
+    if colors is not None:
+        palette = [c for _, c in colors]
+    else:
+        colors = sorted(image.getcolors(image.width * image.height), reverse=True)
+        palette = [c for _, c in colors[:PINNED_COLORS]]
+        # Edge colors, each repeated by its (capped) count so common ramps get more slots
+        edges = [c for count, c in colors[PINNED_COLORS:] for _ in range(min(count, 16))]
+        sample = Image.new("RGB", (len(edges), 1))
+        sample.putdata(edges)
+        fitted = sample.quantize(256 - len(palette), method=Image.Quantize.MEDIANCUT)
+        flat = fitted.getpalette()[:(256 - len(palette)) * 3]
+        palette += [tuple(flat[i:i + 3]) for i in range(0, len(flat), 3)]
+
+    palette_image = Image.new("P", (1, 1))
+    palette_image.putpalette([v for color in palette for v in color] + [0] * (768 - 3 * len(palette)))
+    # Nearest-color mapping without dithering: palette colors map to themselves exactly
+    return image.quantize(palette=palette_image, dither=Image.Dither.NONE)
+
+
+def encode(image, output_format="png", palette="off", effort="balanced") -> bytes:
+    check_format(output_format)
+    if effort not in EFFORTS:
+        raise ValueError(f"Unknown effort: {effort}")
+    if palette == "adaptive" and output_format == "png":
+        image = adaptive_palette(image.convert("RGB"))
+    out = io.BytesIO()
+    image.save(out, output_format.upper(), **ENCODER_OPTIONS[output_format][effort])
+    return out.getvalue()
+
+
+def reencode_file(path, output_format="png", palette="off", effort="balanced", keep=False):
+    """Re-encode an existing image file; returns a report with the sizes and the encode time."""
+    with Image.open(path) as image:
+        image.load()
+    start = time.perf_counter()
+    data = encode(image, output_format, palette, effort)
+    encode_ms = (time.perf_counter() - start) * 1000
+
+    out_path = os.path.splitext(path)[0] + OUTPUT_FORMATS[output_format]
+    bytes_in = os.path.getsize(path)
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, out_path)
+    if out_path != path and not keep:
+        os.remove(path)
+    return {"input": path, "output": out_path, "bytes_in": bytes_in, "bytes_out": len(data),
+            "encode_ms": encode_ms}
+
+
+def print_report(reports):
+    bytes_in = sum(r["bytes_in"] for r in reports)
+    bytes_out = sum(r["bytes_out"] for r in reports)
+    encode_ms = sum(r["encode_ms"] for r in reports)
+    print()
+    print("📊 Encoding Summary")
+    print("------------------------")
+    print(f"Files        : {len(reports)}")
+    print(f"Before       : {bytes_in / 1024:.1f} KB")
+    print(f"After        : {bytes_out / 1024:.1f} KB")
+    if bytes_in:
+        print(f"Saved        : {(bytes_in - bytes_out) / 1024:.1f} KB ({100 * (1 - bytes_out / bytes_in):.1f}%)")
+    print(f"Encode time  : {encode_ms:.0f} ms ({encode_ms / max(len(reports), 1):.1f} ms/file)")
+    print("------------------------")
+
+
+def find_images(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(".png"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-encode rendered code images to smaller files.")
+    parser.add_argument("paths", nargs="+", help="PNG files or folders of PNGs")
+    parser.add_argument("--format", choices=sorted(OUTPUT_FORMATS), default="png", help="Output format (default: png)")
+    parser.add_argument("--palette", choices=PALETTES, default="adaptive",
+                        help="PNG palette: adaptive (exact frequent colors) or off (default: adaptive)")
+    parser.add_argument("--effort", choices=EFFORTS, default="balanced",
+                        help="fast = quick encode, small = smallest files (default: balanced)")
+    parser.add_argument("--keep", action="store_true", help="Keep the original when the format changes")
+    args = parser.parse_args()
+
+    check_format(args.format)
+    reports = []
+    for path in find_images(args.paths):
+        try:
+            report = reencode_file(path, args.format, args.palette, args.effort, args.keep)
+        except (OSError, ValueError) as e:
+            print(f"❌ Failed: {path}: {e}")
+            continue
+        saved = report["bytes_in"] - report["bytes_out"]
+        print(f"✅ {report['output']}: {report['bytes_out'] / 1024:.1f} KB "
+              f"({saved / 1024:.1f} KB saved, {report['encode_ms']:.0f} ms)")
+        reports.append(report)
+    print_report(reports)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import pygments.formatters.img as pygments_img
+
+# Persistent font-name -> TTF path cache for Pygments' ImageFormatter on Linux.
+# FontManager runs `fc-list` for every style variant of every formatter it builds; the answers only
+# change when fontconfig's caches or configuration change, so they are stored on disk and keyed by
+# a fingerprint of that state.
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "filetools")
+CACHE_FILE = os.path.join(CACHE_DIR, "fontpaths.json")
+
+FONTCONFIG_PATHS = [
+    "/var/cache/fontconfig",
+    "/usr/lib/fontconfig/cache",
+    os.path.expanduser("~/.cache/fontconfig"),
+    os.path.expanduser("~/.fontconfig"),
+    "/etc/fonts",
+    "/etc/fonts/conf.d",
+    "/etc/fonts/fonts.conf",
+    os.path.expanduser("~/.config/fontconfig"),
+]
+
+_lock = threading.Lock()
+_paths = None  # Loaded lazily: {"name:style": path or None}
+
+
+def fontconfig_state():
+    # fc-cache and config edits replace files, which updates these mtimes
+    parts = [os.environ.get("FONTCONFIG_FILE", ""), os.environ.get("FONTCONFIG_PATH", "")]
+    for path in FONTCONFIG_PATHS:
+        try:
+            parts.append(f"{path}:{os.stat(path).st_mtime_ns}")
+        except OSError:
+            parts.append(f"{path}:-")
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+
+def _load():
+    global _paths
+    if _paths is None:
+        _paths = {}
+        try:
+            with open(CACHE_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("state") == fontconfig_state():
+                _paths = data.get("paths", {})
+        except (OSError, ValueError):
+            pass  # Missing or corrupt cache: start empty
+    return _paths
+
+
+def _save():
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Write to a temp file and rename, so concurrent renderers never read a half-written cache
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"state": fontconfig_state(), "paths": _paths}, f)
+        os.replace(tmp_path, CACHE_FILE)
+    except OSError:
+        pass  # Read-only home etc.: the in-memory cache still helps
+
+
+def clear():
+    global _paths
+    with _lock:
+        _paths = {}
+        try:
+            os.remove(CACHE_FILE)
+        except OSError:
+            pass
+
+
+class CachedFontManager(pygments_img.FontManager):
+    """FontManager that answers fc-list lookups from the persistent cache."""
+
+    def _get_nix_font_path(self, name, style):
+        key = f"{name}:{style}"
+        with _lock:
+            paths = _load()
+            if key in paths and (paths[key] is None or os.path.isfile(paths[key])):
+                return paths[key]
+
+        path = super()._get_nix_font_path(name, style)  # Spawns fc-list, only on a cache miss
+        with _lock:
+            _load()[key] = path
+            _save()
+        return path
+
+
+def install():
+    # ImageFormatter looks FontManager up in its module at construction time
+    pygments_img.FontManager = CachedFontManager
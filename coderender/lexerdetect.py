@@ -0,0 +1,151 @@
+import os
+import re
+import fnmatch
+from functools import lru_cache
+from pygments.lexers import get_all_lexers, get_lexer_by_name, find_lexer_class, guess_lexer
+from pygments.util import ClassNotFound
+
+# Fast lexer detection for the code-to-PNG tools.
+# get_lexer_for_filename walks every lexer's filename globs on each call and guess_lexer runs every
+# lexer's analyse_text over the whole file. Instead, file names are looked up in an index built once
+# from the lexer metadata, extensionless files are sniffed for a shebang or an editor modeline, and
+# only the first few KB ever reach guess_lexer, whose answers are cached.
+
+ANALYSE_BYTES = 4096  # Head of the file handed to guess_lexer
+MODELINE_LINES = 5    # Lines searched for modelines at the top and bottom, as in vim
+
+# Interpreter (from a shebang) -> Pygments alias, where the two differ
+INTERPRETERS = {
+    "sh": "bash", "dash": "bash", "ksh": "bash", "ash": "bash",
+    "pypy": "python",
+    "node": "javascript", "nodejs": "javascript", "deno": "typescript",
+    "Rscript": "r",
+    "tclsh": "tcl", "wish": "tcl",
+    "gawk": "awk", "mawk": "awk", "nawk": "awk",
+    "runghc": "haskell", "runhaskell": "haskell",
+    "escript": "erlang",
+    "pwsh": "powershell",
+    "osascript": "applescript",
+}
+
+VIM_MODELINE = re.compile(r"(?:^|\s)(?:vi|vim|ex)(?:[<=>]?\d+)?:.*?\b(?:ft|filetype|syn|syntax)=([\w+-]+)")
+EMACS_MODELINE = re.compile(r"-\*-(.*?)-\*-")
+
+
+@lru_cache(maxsize=1)
+def _filename_index():
+    # Plain "*.ext" globs by extension, literal file names by name, everything else kept as globs
+    # Entries carry their position in the lexer list, which breaks rating ties
+    by_ext, by_name, globs = {}, {}, []
+    order = 0
+    for name, _, filenames, _ in get_all_lexers():
+        for pattern in filenames:
+            entry = (order, name, pattern)
+            order += 1
+            if pattern.startswith("*.") and not any(c in pattern[2:] for c in "*?[."):
+                by_ext.setdefault(pattern[1:], []).append(entry)
+            elif not any(c in pattern for c in "*?["):
+                by_name.setdefault(pattern, []).append(entry)
+            else:
+                globs.append(entry)
+    return by_ext, by_name, globs
+
+
+@lru_cache(maxsize=None)
+def _lexer_class(name):
+    return find_lexer_class(name)
+
+
+@lru_cache(maxsize=1024)
+def lexer_for_filename(base):
+    by_ext, by_name, globs = _filename_index()
+    ext = os.path.splitext(base)[1]
+    matches = by_name.get(base, []) + by_ext.get(ext, [])
+    matches += [entry for entry in globs if fnmatch.fnmatchcase(base, entry[2])]
+    if not matches:
+        return None
+
+    # Same choice as get_lexer_for_filename without code: highest priority, literal names
+    # get a bonus, and the last of equally rated matches wins
+    best = best_rating = None
+    for _, name, pattern in sorted(matches):
+        cls = _lexer_class(name)
+        if cls is None:
+            continue
+        rating = cls.priority + (0.5 if "*" not in pattern else 0)
+        if best_rating is None or rating >= best_rating:
+            best, best_rating = cls, rating
+    return best() if best else None
+
+
+@lru_cache(maxsize=None)
+def lexer_for_alias(alias):
+    try:
+        return get_lexer_by_name(alias)
+    except ClassNotFound:
+        return None
+
+
+def lexer_from_shebang(first_line):
+    if not first_line.startswith("#!"):
+        return None
+    words = first_line[2:].split()
+    if words and os.path.basename(words[0]) == "env":
+        # "#!/usr/bin/env -S python3 -u": skip env's own flags and VAR=value assignments
+        words = [w for w in words[1:] if not w.startswith("-") and "=" not in w]
+    if not words:
+        return None
+    interpreter = os.path.basename(words[0])
+    for name in (interpreter, re.sub(r"[\d.]+$", "", interpreter)):
+        lexer = lexer_for_alias(INTERPRETERS.get(name, name)) if name else None
+        if lexer is not None:
+            return lexer
+    return None
+
+
+def lexer_from_modeline(lines):
+    for line in lines:
+        match = VIM_MODELINE.search(line)
+        if match:
+            return lexer_for_alias(match.group(1).lower())
+        match = EMACS_MODELINE.search(line)
+        if match:
+            body = match.group(1).strip()
+            if ":" not in body:
+                return lexer_for_alias(body.lower())  # "-*- python -*-"
+            for field in body.split(";"):
+                key, _, value = field.partition(":")
+                if key.strip().lower() == "mode":
+                    return lexer_for_alias(value.strip().lower())
+    return None
+
+
+@lru_cache(maxsize=4096)
+def lexer_from_content(head, complete):
+    # Keyed by the head of the file, so re-rendering the same file is a cache hit;
+    # complete means head is the whole file, so its last lines are the file's last lines
+    lines = head.splitlines()
+    lexer = lexer_from_shebang(lines[0]) if lines else None
+    if lexer is None:
+        edges = lines[:MODELINE_LINES] + (lines[MODELINE_LINES:][-MODELINE_LINES:] if complete else [])
+        lexer = lexer_from_modeline(edges)
+    if lexer is None:
+        try:
+            lexer = guess_lexer(head)
+        except ClassNotFound:
+            return None
+    return lexer
+
+
+def detect_lexer(file_path, code):
+    """Return a lexer for file_path from its name, shebang, modeline or content, or None."""
+    lexer = lexer_for_filename(os.path.basename(file_path))
+    if lexer is not None:
+        return lexer
+    complete = len(code) <= ANALYSE_BYTES
+    if not complete:
+        # Modelines may also sit at the end of the file, outside the analysed head
+        lexer = lexer_from_modeline(code[-ANALYSE_BYTES:].splitlines()[-MODELINE_LINES:])
+        if lexer is not None:
+            return lexer
+    return lexer_from_content(code[:ANALYSE_BYTES], complete)
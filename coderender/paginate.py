@@ -0,0 +1,121 @@
+import os
+import io
+import argparse
+from renderer import ENGINES, get_lexer, render_tokens
+
+# Paginated rendering for very long source files.
+# One ImageFormatter bitmap per file grows with the line count, so long files are cut into pages of
+# a fixed number of lines instead. Tokens are lexed lazily and rendered one page at a time, so peak
+# memory is bounded by a single page; line numbers continue from page to page.
+
+DEFAULT_PAGE_LINES = 200
+
+
+def split_pages(tokens, page_lines):
+    # Groups a (ttype, value) stream into lists covering page_lines lines each
+    page = []
+    lines = 0
+    for ttype, value in tokens:
+        while value:
+            end = value.find("\n")
+            if end < 0:
+                page.append((ttype, value))
+                break
+            page.append((ttype, value[:end + 1]))
+            value = value[end + 1:]
+            lines += 1
+            if lines == page_lines:
+                yield page
+                page = []
+                lines = 0
+    if any(value for _, value in page):
+        yield page
+
+
+def iter_pages(code, file_path, page_lines=DEFAULT_PAGE_LINES, font_name='Arial', font_size=38,
+               line_numbers=False, style='monokai', image_pad=20, border=10, dpi=300, lang=None, lexer=None,
+               engine="pil", output_format="png", palette="off", effort="balanced"):
+    """Yield (first_line, png_bytes) for each page of code, rendering one page at a time."""
+    if page_lines < 1:
+        raise ValueError("page_lines must be at least 1")
+    lexer = lexer or get_lexer(file_path, code, lang)
+    # Same number column width on every page, wide enough for the last line number
+    number_chars = max(2, len(str(code.count("\n") + 1)))
+    first_line = 1
+    for page in split_pages(lexer.get_tokens(code), page_lines):
+        png = render_tokens(page, font_name, font_size, line_numbers, style, image_pad, border, dpi,
+                            line_number_start=first_line, line_number_chars=number_chars, engine=engine,
+                            output_format=output_format, palette=palette, effort=effort)
+        yield first_line, png
+        first_line += page_lines
+
+
+def page_path(output_path, index):
+    base, ext = os.path.splitext(output_path)
+    return f"{base}_p{index:03d}{ext or '.png'}"
+
+
+def render_paginated(code, file_path, output_path, page_lines=DEFAULT_PAGE_LINES, pdf=False, **settings):
+    """Render code as numbered page PNGs next to output_path, or as one multi-page PDF.
+
+    Returns the list of files written.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    pages = iter_pages(code, file_path, page_lines, **settings)
+    if not pdf:
+        written = []
+        for index, (_, png) in enumerate(pages, start=1):
+            path = page_path(output_path, index)
+            with open(path, "wb") as f:
+                f.write(png)
+            written.append(path)
+        return written
+
+    from PIL import Image
+
+    pdf_path = os.path.splitext(output_path)[0] + ".pdf"
+    tmp_path = pdf_path + ".tmp"
+    count = 0
+    try:
+        for _, png in pages:
+            with Image.open(io.BytesIO(png)) as image:
+                # append=True adds the page as an incremental update, so earlier pages stay on disk
+                image.convert("RGB").save(tmp_path, "PDF", append=count > 0,
+                                          resolution=float(settings.get("dpi", 300)))
+            count += 1
+        if count:
+            os.replace(tmp_path, pdf_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return [pdf_path] if count else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a long source file as a series of page images.")
+    parser.add_argument("input", help="Source file to render")
+    parser.add_argument("output", help="Output path; pages are written as <name>_p001.png, ...")
+    parser.add_argument("--page-lines", type=int, default=DEFAULT_PAGE_LINES,
+                        help=f"Lines per page (default: {DEFAULT_PAGE_LINES})")
+    parser.add_argument("--pdf", action="store_true", help="Write all pages into a single multi-page PDF")
+    parser.add_argument("--font-name", default="Arial", help="Font name (default: Arial)")
+    parser.add_argument("--font-size", type=int, default=38, help="Font size (default: 38)")
+    parser.add_argument("--line-numbers", action="store_true", help="Show line numbers")
+    parser.add_argument("--style", default="monokai", help="Pygments style (default: monokai)")
+    parser.add_argument("--lang", default=None, help="Manually set language for syntax highlighting")
+    parser.add_argument("--engine", choices=ENGINES, default="pil", help="Text render engine (default: pil)")
+    args = parser.parse_args()
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        code = f.read()
+    written = render_paginated(code, args.input, args.output, args.page_lines, args.pdf,
+                               font_name=args.font_name, font_size=args.font_size,
+                               line_numbers=args.line_numbers, style=args.style, lang=args.lang,
+                               engine=args.engine)
+    for path in written:
+        print(f"✅ Generated: {path}")
+    print(f"📄 {len(written)} file(s) written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import os
+import io
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
+from pygments.formatters import ImageFormatter
+from pygments.styles import get_all_styles
+from PIL import Image
+import fontcache
+import encoder
+from lexerdetect import detect_lexer
+
+# Shared rendering core for the code-to-PNG tools.
+# Building an ImageFormatter loads every font variant, so formatters are cached per settings tuple,
+# lexer choices in lexerdetect and the style list is read once.
+
+DEFAULT_STYLE = "monokai"
+ENGINES = ("pil", "atlas")  # "atlas" draws text from a NumPy glyph atlas, see atlasrender
+PREVIEW_CACHE_SIZE = 32  # Rendered PNGs kept in memory for the live previews
+
+# Font lookups go through the persistent font path cache instead of spawning fc-list
+fontcache.install()
+
+
+class _ImageSink:
+    # Saving to the "CAPTURE" format hands the formatter's finished image to the encoding stage
+    image = None
+
+
+def _capture(image, fp, filename):
+    fp.image = image
+
+
+Image.register_save("CAPTURE", _capture)
+
+
+@lru_cache(maxsize=1)
+def available_styles():
+    return frozenset(get_all_styles())
+
+
+@lru_cache(maxsize=None)
+def resolve_style(style):
+    # Cached, so the warning is printed once per unknown style rather than once per file
+    if style not in available_styles():
+        print(f"⚠️ Warning: Style '{style}' not found. Using default '{DEFAULT_STYLE}'.")
+        return DEFAULT_STYLE
+    return style
+
+
+@lru_cache(maxsize=None)
+def _lexer_for_name(lang):
+    # None for an unknown name; cached, so the warning is printed once per name
+    try:
+        return get_lexer_by_name(lang)
+    except ClassNotFound:
+        print(f"⚠️ Warning: Unknown language '{lang}'. Detecting it from the file instead.")
+        return None
+
+
+def get_lexer(file_path, code, lang=None):
+    lexer = _lexer_for_name(lang) if lang else None
+    if lexer is not None:
+        return lexer
+    lexer = detect_lexer(file_path, code)
+    if lexer is None:
+        raise ValueError(f"Cannot detect lexer for: {file_path}")
+    return lexer
+
+
+@lru_cache(maxsize=32)
+def get_formatter(font_name, font_size, line_numbers, style, image_pad, border, dpi, line_number_chars=2):
+    formatter = ImageFormatter(
+        font_name=font_name,
+        font_size=font_size,
+        line_numbers=line_numbers,
+        line_number_chars=line_number_chars,
+        style=resolve_style(style),
+        image_pad=image_pad,
+        line_pad=2,
+        image_border=border,
+        dpi=dpi
+    )
+    # A formatter keeps per-render state, so each one is used by one thread at a time
+    return formatter, threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _atlas_engine():
+    try:
+        import atlasrender
+        return atlasrender
+    except ImportError:
+        print("⚠️ Warning: NumPy is not installed. Using the 'pil' render engine.")
+        return None
+
+
+def render_png(code, file_path, font_name='Arial', font_size=38, line_numbers=False,
+               style=DEFAULT_STYLE, image_pad=20, border=10, dpi=300, lang=None, lexer=None,
+               engine="pil", output_format="png", palette="off", effort="balanced") -> bytes:
+    lexer = lexer or get_lexer(file_path, code, lang)
+    return render_tokens(lexer.get_tokens(code), font_name, font_size, line_numbers, style,
+                         image_pad, border, dpi, engine=engine, output_format=output_format,
+                         palette=palette, effort=effort)
+
+
+def _format(tokens, settings, line_number_start, line_number_chars, engine, out, image_format):
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown render engine: {engine}")
+    font_name, font_size, line_numbers, style, image_pad, border, dpi = settings
+    formatter, lock = get_formatter(font_name, int(font_size), bool(line_numbers), style,
+                                    int(image_pad), int(border), int(dpi), int(line_number_chars))
+    atlas = _atlas_engine() if engine == "atlas" else None
+    with lock:
+        formatter.drawables = []  # ImageFormatter appends to this on every format() call
+        formatter.line_number_start = line_number_start
+        formatter.image_format = image_format
+        if atlas is not None and atlas.supports(formatter):
+            atlas.format_tokens(formatter, tokens, out)
+        else:
+            formatter.format(tokens, out)
+
+
+def render_image(tokens, font_name='Arial', font_size=38, line_numbers=False, style=DEFAULT_STYLE,
+                 image_pad=20, border=10, dpi=300, line_number_start=1, line_number_chars=2,
+                 engine="pil") -> Image.Image:
+    # The formatter's finished image, before any encoding
+    sink = _ImageSink()
+    _format(tokens, (font_name, font_size, line_numbers, style, image_pad, border, dpi),
+            line_number_start, line_number_chars, engine, sink, "capture")
+    return sink.image
+
+
+def render_tokens(tokens, font_name='Arial', font_size=38, line_numbers=False, style=DEFAULT_STYLE,
+                  image_pad=20, border=10, dpi=300, line_number_start=1, line_number_chars=2,
+                  engine="pil", output_format="png", palette="off", effort="balanced") -> bytes:
+    # Renders an already-lexed token stream; used directly by the paginated renderer
+    if not encoder.is_default(output_format, palette, effort):
+        encoder.check_format(output_format)
+        image = render_image(tokens, font_name, font_size, line_numbers, style, image_pad, border, dpi,
+                             line_number_start, line_number_chars, engine)
+        return encoder.encode(image, output_format, palette, effort)
+    out = io.BytesIO()
+    _format(tokens, (font_name, font_size, line_numbers, style, image_pad, border, dpi),
+            line_number_start, line_number_chars, engine, out, "png")
+    return out.getvalue()
+
+
+_preview_cache = OrderedDict()
+_preview_lock = threading.Lock()
+
+
+def render_png_cached(code, file_path, **settings) -> bytes:
+    # In-memory LRU for previews, keyed by a hash of the code plus the settings, so UI reruns
+    # (slider drags, widget changes elsewhere) reuse the PNG instead of rendering again
+    key = (hashlib.sha256(code.encode("utf-8")).hexdigest(), os.path.basename(file_path),
+           tuple(sorted(settings.items())))
+    with _preview_lock:
+        if key in _preview_cache:
+            _preview_cache.move_to_end(key)
+            return _preview_cache[key]
+
+    png = render_png(code, file_path, **settings)
+    with _preview_lock:
+        _preview_cache[key] = png
+        while len(_preview_cache) > PREVIEW_CACHE_SIZE:
+            _preview_cache.popitem(last=False)
+    return png
@@ -0,0 +1,529 @@
+import os
+import json
+import math
+import time
+import shutil
+import signal
+import select
+import resource
+import statistics
+import hashlib
+import tempfile
+import threading
+import subprocess
+from functools import lru_cache
+
+# Per-program resource measurement for the compile-and-run tools.
+# RUSAGE_CHILDREN only keeps the largest ru_maxrss of every child reaped so far, so a before/after
+# delta says nothing about one program. Each program's own usage comes from wait4() on its pid.
+# A child forked from this Python process starts with a copy of its memory, which the kernel counts
+# in ru_maxrss at exec, so programs are started through a tiny C launcher (compiled once with the
+# system C compiler) that forks them from its own small address space and reports wait4's rusage.
+# Without a C compiler, programs are waited on directly and their peak RSS is only an upper bound.
+# Every run is bounded: wall time is enforced by killing the program's process group, CPU time,
+# address space and output size by setrlimit before exec, so runaway programs cannot stall a batch.
+
+# None disables a limit
+DEFAULT_LIMITS = {"wall_s": 10.0, "cpu_s": 10.0, "memory_mb": 1024, "output_mb": 64}
+GO_RESERVED_MB = 1024  # Address space the Go runtime reserves at startup
+# Lowercased stderr fragments of allocation failures in the supported languages
+OOM_MARKERS = ("memoryerror", "bad_alloc", "out of memory", "memory allocation of", "cannot allocate memory",
+               "outofmemoryerror", "heap exhausted")
+# Runtimes that ignore SIGXFSZ (CPython, the JVM) see the output cap as a failed write instead
+EFBIG_MARKERS = ("file too large", "efbig", "errno 27")
+
+# Two-sided 95% Student t critical values by degrees of freedom; 1.96 beyond the table
+T_95 = [None, 12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "filetools")
+
+LAUNCHER_SOURCE = r"""
+#include <errno.h>
+#include <fcntl.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+#include <unistd.h>
+#include <sys/resource.h>
+#include <sys/wait.h>
+
+/* runmeter FD PROG [ARGS...]: runs PROG in its own process group, writes its pid to FD and,
+   once it exits, "status wall_ns utime_us stime_us maxrss_kb nvcsw nivcsw minflt majflt" */
+int main(int argc, char **argv) {
+    if (argc < 3) return 2;
+    int fd = atoi(argv[1]);
+    FILE *report = fdopen(fd, "w");
+    if (!report) return 2;
+    fcntl(fd, F_SETFD, FD_CLOEXEC);
+
+    struct timespec start, end;
+    clock_gettime(CLOCK_MONOTONIC, &start);
+    pid_t pid = fork();
+    if (pid < 0) return 2;
+    if (pid == 0) {
+        setpgid(0, 0);
+        execvp(argv[2], argv + 2);
+        _exit(127);
+    }
+    setpgid(pid, pid);
+    fprintf(report, "%d\n", (int)pid);
+    fflush(report);
+
+    int status;
+    struct rusage ru;
+    while (wait4(pid, &status, 0, &ru) < 0)
+        if (errno != EINTR) return 2;
+    clock_gettime(CLOCK_MONOTONIC, &end);
+    long long wall = (end.tv_sec - start.tv_sec) * 1000000000LL + (end.tv_nsec - start.tv_nsec);
+    fprintf(report, "%d %lld %lld %lld %ld %ld %ld %ld %ld\n", status, wall,
+            (long long)ru.ru_utime.tv_sec * 1000000 + ru.ru_utime.tv_usec,
+            (long long)ru.ru_stime.tv_sec * 1000000 + ru.ru_stime.tv_usec,
+            ru.ru_maxrss, ru.ru_nvcsw, ru.ru_nivcsw, ru.ru_minflt, ru.ru_majflt);
+    fclose(report);
+    return 0;
+}
+"""
+
+
+@lru_cache(maxsize=1)
+def launcher_path():
+    """Path of the compiled launcher, building it on first use; None without a C compiler."""
+    digest = hashlib.sha1(LAUNCHER_SOURCE.encode()).hexdigest()[:12]
+    path = os.path.join(CACHE_DIR, f"runmeter-{digest}")
+    if os.access(path, os.X_OK):
+        return path
+    compiler = shutil.which("cc") or shutil.which("gcc") or shutil.which("clang")
+    if compiler is None:
+        print("⚠️ Warning: No C compiler found. Peak memory includes the analyzer's own footprint.")
+        return None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=CACHE_DIR) as tmp:
+            source = os.path.join(tmp, "runmeter.c")
+            binary = os.path.join(tmp, "runmeter")
+            with open(source, "w") as f:
+                f.write(LAUNCHER_SOURCE)
+            subprocess.run([compiler, "-O2", "-o", binary, source],
+                           stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+            os.replace(binary, path)  # Atomic, so parallel workers never run a half-written file
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"⚠️ Warning: Could not build the measurement launcher ({e}). "
+              "Peak memory includes the analyzer's own footprint.")
+        return None
+    return path
+
+
+def _metrics(status, wall_s, utime_s, stime_s, maxrss, nvcsw, nivcsw, minflt, majflt):
+    return {
+        "exit_code": os.waitstatus_to_exitcode(status),
+        "wall_s": wall_s,
+        "user_s": utime_s,
+        "sys_s": stime_s,
+        "max_rss_kb": maxrss,
+        "voluntary_switches": nvcsw,
+        "involuntary_switches": nivcsw,
+        "minor_faults": minflt,
+        "major_faults": majflt,
+    }
+
+
+def _resource_limiter(limits):
+    # setrlimit values are worked out here, in the parent; the returned function runs in the child
+    # between fork and exec, where it can only call setrlimit
+    rlimits = []
+    for name, key, scale, slack in ((resource.RLIMIT_CPU, "cpu_s", 1, 1),
+                                    (resource.RLIMIT_AS, "memory_mb", 2 ** 20, 0),
+                                    (resource.RLIMIT_FSIZE, "output_mb", 2 ** 20, 0)):
+        if limits.get(key):
+            soft = math.ceil(limits[key] * scale)
+            hard = resource.getrlimit(name)[1]
+            if hard != resource.RLIM_INFINITY:
+                soft = min(soft, hard)
+            # RLIMIT_CPU sends SIGXCPU at the soft limit and SIGKILL at the hard one
+            rlimits.append((name, (soft, soft + slack if hard == resource.RLIM_INFINITY else hard)))
+
+    def apply():
+        for name, values in rlimits:
+            resource.setrlimit(name, values)
+    return apply
+
+
+def _exited_within(pid, timeout):
+    # A pidfd becomes readable once the process exits, so waiting needs no polling loop
+    fd = os.pidfd_open(pid)
+    try:
+        return bool(select.select([fd], [], [], timeout)[0])
+    finally:
+        os.close(fd)
+
+
+def _kill_group(pgid):
+    # Also catches anything the program forked and left behind
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _run_launched(launcher, command, out, err, limits, stdin=subprocess.DEVNULL, pump=None, watch=None):
+    read_fd, write_fd = os.pipe()
+    try:
+        proc = subprocess.Popen([launcher, str(write_fd), *command], stdin=stdin, stdout=out, stderr=err,
+                                pass_fds=(write_fd,), preexec_fn=_resource_limiter(limits))
+    finally:
+        os.close(write_fd)
+    if pump:
+        pump(proc)
+    timed_out = False
+    with os.fdopen(read_fd) as report:
+        pid = report.readline().strip()
+        if pid and watch:
+            watch(int(pid))
+        if pid:
+            # The launcher exits right after the program, so its exit marks the program's end
+            timed_out = not _exited_within(proc.pid, limits.get("wall_s"))
+            _kill_group(int(pid))
+        lines = report.read().split()
+    proc.wait()
+    if len(lines) != 9:
+        raise OSError(f"measurement launcher failed with exit code {proc.returncode}")
+    status, wall_ns, utime_us, stime_us, *counters = (int(v) for v in lines)
+    return _metrics(status, wall_ns / 1e9, utime_us / 1e6, stime_us / 1e6, *counters), timed_out
+
+
+def _run_direct(command, out, err, limits, stdin=subprocess.DEVNULL, pump=None, watch=None):
+    start = time.perf_counter()
+    proc = subprocess.Popen(command, stdin=stdin, stdout=out, stderr=err, preexec_fn=_resource_limiter(limits),
+                            start_new_session=True)
+    if pump:
+        pump(proc)
+    if watch:
+        watch(proc.pid)
+    timed_out = not _exited_within(proc.pid, limits.get("wall_s"))
+    _kill_group(proc.pid)
+    _, status, usage = os.wait4(proc.pid, 0)
+    wall_s = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)  # Already reaped; keeps Popen from waiting again
+    return _metrics(status, wall_s, usage.ru_utime, usage.ru_stime, usage.ru_maxrss, usage.ru_nvcsw,
+                    usage.ru_nivcsw, usage.ru_minflt, usage.ru_majflt), timed_out
+
+
+def _measure(command, out, err, limits, stdin=subprocess.DEVNULL, pump=None, watch=None):
+    # Without piped input the program reads /dev/null, never the caller's stdin: a program waiting
+    # on a terminal or an open pipe would otherwise sit there until the wall limit
+    launcher = launcher_path()
+    if launcher:
+        return _run_launched(launcher, command, out, err, limits, stdin, pump, watch)
+    return _run_direct(command, out, err, limits, stdin, pump, watch)
+
+
+def _stderr_tail(err):
+    err.seek(max(err.seek(0, os.SEEK_END) - 4096, 0))
+    return err.read().decode(errors="replace")
+
+
+def _output_size(*files):
+    return max(os.fstat(f.fileno()).st_size for f in files)
+
+
+def _run_status(metrics, timed_out, limits, stderr_tail, output_bytes=0):
+    code = metrics["exit_code"]
+    tail = stderr_tail.lower()
+    cpu_s = metrics["user_s"] + metrics["sys_s"]
+    if timed_out or code == -signal.SIGXCPU or (
+            code == -signal.SIGKILL and limits.get("cpu_s") and cpu_s >= limits["cpu_s"]):
+        return "Time Limit"
+    # A file that reached the cap was cut short, even if the program ignored the failed write
+    cap = limits.get("output_mb") and math.ceil(limits["output_mb"] * 2 ** 20)
+    if code == -signal.SIGXFSZ or (cap and output_bytes >= cap) or (
+            code != 0 and any(marker in tail for marker in EFBIG_MARKERS)):
+        return "Output Limit"
+    if code != 0:
+        # With an address-space limit, allocations fail inside the program, which reports it its own way
+        return "Memory Limit" if any(marker in tail for marker in OOM_MARKERS) else "Runtime Error"
+    return None
+
+
+def run_limits(ext, limits):
+    # The JVM reserves far more address space than it uses, so Java gets a heap cap (-Xmx) instead;
+    # the Go runtime reserves its page summaries up front, so Go gets that much extra address space
+    if ext == ".java":
+        return dict(limits, memory_mb=None)
+    if ext == ".go" and limits.get("memory_mb"):
+        return dict(limits, memory_mb=limits["memory_mb"] + GO_RESERVED_MB)
+    return limits
+
+
+def run_and_measure(command, stdout_path=None, stderr_path=None, limits=None, watch=None):
+    """Run command once under limits (DEFAULT_LIMITS if None) and return (metrics, error).
+
+    metrics holds the program's own exit code, wall time (s), user and system CPU time (s),
+    peak RSS (KB), voluntary/involuntary context switches and minor/major page faults; error is
+    None or one of "Runtime Error", "Time Limit", "Memory Limit" and "Output Limit".
+    watch, if given, is called with the program's pid as soon as it has started.
+    """
+    limits = DEFAULT_LIMITS if limits is None else limits
+    # stderr is kept even when not wanted, since it tells out-of-memory failures apart
+    with open(stdout_path or os.devnull, "w") as out, \
+            (open(stderr_path, "w+b") if stderr_path else tempfile.TemporaryFile()) as err:
+        try:
+            metrics, timed_out = _measure(command, out, err, limits, watch=watch)
+        except (OSError, subprocess.SubprocessError):
+            return None, "Runtime Error"
+        return metrics, _run_status(metrics, timed_out, limits, _stderr_tail(err), _output_size(out, err))
+
+
+def run_with_input(command, input_data, limits=None):
+    """Run command once with input_data piped to its stdin and return (metrics, error, output).
+
+    stdout is captured through a pipe, up to the output limit; a program writing past it has the
+    pipe closed on it and ends with "Output Limit".
+    """
+    limits = DEFAULT_LIMITS if limits is None else limits
+    cap = math.ceil(limits["output_mb"] * 2 ** 20) if limits.get("output_mb") else None
+    output = bytearray()
+    overflow = []
+    threads = []
+
+    def feed(proc):
+        try:
+            proc.stdin.write(input_data)
+        except OSError:
+            pass  # The program stopped reading; its exit status tells the rest
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    def drain(proc):
+        while True:
+            chunk = proc.stdout.read1(1 << 16)
+            if not chunk:
+                break
+            output.extend(chunk)
+            if cap is not None and len(output) > cap:
+                overflow.append(True)
+                del output[cap:]
+                break
+        proc.stdout.close()  # A program still writing gets SIGPIPE
+
+    def pump(proc):
+        # Both ends are serviced on threads, so neither the program nor this process blocks on a full pipe
+        threads.extend([threading.Thread(target=feed, args=(proc,), daemon=True),
+                        threading.Thread(target=drain, args=(proc,), daemon=True)])
+        for thread in threads:
+            thread.start()
+
+    with tempfile.TemporaryFile() as err:
+        try:
+            metrics, timed_out = _measure(command, subprocess.PIPE, err, limits, subprocess.PIPE, pump)
+        except (OSError, subprocess.SubprocessError):
+            return None, "Runtime Error", b""
+        finally:
+            for thread in threads:
+                thread.join()
+        error = "Output Limit" if overflow else _run_status(metrics, timed_out, limits, _stderr_tail(err),
+                                                            _output_size(err))
+    return metrics, error, bytes(output)
+
+
+def summarize(samples):
+    """Median, mean, stddev, min and the 95% confidence half-width of the mean (None below 2 samples)."""
+    n = len(samples)
+    mean = statistics.fmean(samples)
+    stddev = statistics.stdev(samples) if n > 1 else 0.0
+    ci95 = (T_95[n - 1] if n - 1 < len(T_95) else 1.96) * stddev / math.sqrt(n) if n > 1 else None
+    return {"median": statistics.median(samples), "mean": mean, "stddev": stddev, "min": min(samples),
+            "ci95": ci95, "n": n}
+
+
+def summarize_runs(runs, warmup=0):
+    return {
+        "runs": len(runs),
+        "warmup": warmup,
+        "wall_s": summarize([m["wall_s"] for m in runs]),
+        "cpu_s": summarize([m["user_s"] + m["sys_s"] for m in runs]),
+        "max_rss_kb": max(m["max_rss_kb"] for m in runs),
+        # Per-metric medians, for the counters that are reported as single numbers
+        "median": {key: statistics.median(m[key] for m in runs) for key in runs[0]},
+    }
+
+
+def measure_repeated(command, stdout_path=None, stderr_path=None, warmup=1, min_runs=3, max_runs=10,
+                     rel_error=0.02, limits=None):
+    """Run command warmup times unmeasured, then until the 95% confidence half-width of the mean wall
+    time is within rel_error of the mean (at least min_runs, at most max_runs runs).
+
+    Returns (summary, error); a failing run stops early and is the only one summarized.
+    """
+    for _ in range(warmup):
+        metrics, error = run_and_measure(command, stdout_path, stderr_path, limits)
+        if error:
+            return (summarize_runs([metrics], 0) if metrics else None), error
+
+    runs = []
+    while len(runs) < max(max_runs, 1):
+        metrics, error = run_and_measure(command, stdout_path, stderr_path, limits)
+        if error:
+            return (summarize_runs([metrics], warmup) if metrics else None), error
+        runs.append(metrics)
+        if len(runs) >= max(min_runs, 2):
+            wall = summarize([m["wall_s"] for m in runs])
+            if wall["ci95"] <= rel_error * wall["mean"]:
+                break
+    return summarize_runs(runs, warmup), None
+
+
+# --- Startup calibration ---
+# Interpreted and JVM programs pay for runtime startup on every run, which dominates short programs.
+# An empty program per runtime gives the baseline (wall and CPU time, peak RSS) that reports subtract
+# for startup-adjusted numbers. Baselines are cached per toolchain version and command in
+# startup.json under the cache directory.
+STARTUP_DIR = os.path.join(CACHE_DIR, "startup")
+STARTUP_CACHE = os.path.join(CACHE_DIR, "startup.json")
+# Runtime -> (extensions, empty program file, its source, tools whose versions key the cache)
+STARTUP_PROGRAMS = {
+    "python": ((".py",), "empty.py", "", ("python3",)),
+    "java": ((".java",), "Empty.java", "public class Empty { public static void main(String[] args) {} }\n",
+             ("javac", "java")),
+}
+STARTUP_RUNS = {"warmup": 2, "min_runs": 10, "max_runs": 30, "rel_error": 0.01}
+
+
+def runtime_for(ext):
+    return next((runtime for runtime, (exts, *_) in STARTUP_PROGRAMS.items() if ext in exts), None)
+
+
+@lru_cache(maxsize=None)
+def _toolchain(tools):
+    versions = []
+    for tool in tools:
+        path = shutil.which(tool)
+        if path is None:
+            return None
+        # java and javac print -version to stderr
+        proc = subprocess.run([path, "--version" if tool == "python3" else "-version"],
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        versions.append(f"{path} {proc.stdout.strip()}")
+    return "\n".join(versions)
+
+
+def _empty_program(runtime, heap_mb):
+    _, filename, source, _ = STARTUP_PROGRAMS[runtime]
+    program_dir = os.path.join(STARTUP_DIR, runtime)
+    source_path = os.path.join(program_dir, filename)
+    if not os.path.exists(source_path):
+        os.makedirs(program_dir, exist_ok=True)
+        with open(source_path, "w") as f:
+            f.write(source)
+    if runtime == "python":
+        return ["python3", source_path]
+    if not os.path.exists(os.path.join(program_dir, "Empty.class")):
+        subprocess.run(["javac", "-d", program_dir, source_path], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    heap = [f"-Xmx{heap_mb}m"] if heap_mb else []
+    return ["java", *heap, "-cp", program_dir, "Empty"]
+
+
+def _load_startup_cache():
+    try:
+        with open(STARTUP_CACHE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def startup_baseline(runtime, heap_mb=None, refresh=False):
+    """Startup cost of runtime ("python" or "java"): the medians of wall_s, cpu_s and max_rss_kb of an
+    empty program, plus runs and toolchain. Measured once per toolchain version and cached; None if
+    the toolchain is missing or the empty program fails.
+
+    heap_mb is the -Xmx the measured Java programs get, since the heap size changes JVM startup.
+    """
+    tools = STARTUP_PROGRAMS[runtime][3]
+    toolchain = _toolchain(tools)
+    if toolchain is None:
+        return None
+    try:
+        command = _empty_program(runtime, heap_mb)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    key = hashlib.sha256("\0".join([toolchain, *command]).encode()).hexdigest()
+    if not refresh:
+        cached = _load_startup_cache().get(key)
+        if cached:
+            return cached
+
+    summary, error = measure_repeated(command, **STARTUP_RUNS, limits=dict(DEFAULT_LIMITS, memory_mb=None))
+    if error:
+        return None
+    baseline = {"runtime": runtime, "wall_s": summary["wall_s"]["median"], "cpu_s": summary["cpu_s"]["median"],
+                "max_rss_kb": summary["median"]["max_rss_kb"], "runs": summary["runs"],
+                "toolchain": toolchain.splitlines()[0], "measured_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    # Re-read before writing, so baselines calibrated elsewhere meanwhile are kept
+    cache = _load_startup_cache()
+    cache[key] = baseline
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{STARTUP_CACHE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, STARTUP_CACHE)
+    return baseline
+
+
+def startup_adjusted(value, baseline, key):
+    # Raw value minus the runtime's startup share, never below zero; unchanged without a baseline
+    if baseline is None:
+        return value
+    return max(value - baseline[key], 0)
+
+
+# --- Self-check ---
+# python measure.py --check: a program that reads stdin must see end-of-file at once, on both the
+# launcher and the fallback path, even while this process's own stdin is a pipe that never closes
+CHECK_STDIN_PROGRAM = ["python3", "-c", "import sys; print(len(sys.stdin.read()))"]
+
+
+def check():
+    limits = dict(DEFAULT_LIMITS, wall_s=5.0)
+    read_fd, write_fd = os.pipe()
+    saved_stdin = os.dup(0)
+    os.dup2(read_fd, 0)
+    failures = 0
+    try:
+        runners = [("direct", _run_direct)]
+        launcher = launcher_path()
+        if launcher:
+            runners.insert(0, ("launcher", lambda *args, **kwargs: _run_launched(launcher, *args, **kwargs)))
+        for name, runner in runners:
+            with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+                metrics, timed_out = runner(CHECK_STDIN_PROGRAM, out, err, limits)
+                out.seek(0)
+                output = out.read().strip()
+            ok = not timed_out and metrics["exit_code"] == 0 and output == b"0"
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {name}: stdin-reading program took {metrics['wall_s']:.3f}s, "
+                  f"exit {metrics['exit_code']}, output {output!r}")
+        metrics, error = run_and_measure(CHECK_STDIN_PROGRAM, limits=limits)
+        ok = error is None and metrics["wall_s"] < limits["wall_s"] / 2
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} run_and_measure: {error or 'Ran'} in {metrics['wall_s']:.3f}s")
+    finally:
+        os.dup2(saved_stdin, 0)
+        for fd in (saved_stdin, read_fd, write_fd):
+            os.close(fd)
+    return failures
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measurement helpers shared by the analyzer and the compile checker.")
+    parser.add_argument("--check", action="store_true", help="Check that measured programs never read this process's stdin")
+    args = parser.parse_args()
+    if args.check:
+        raise SystemExit(1 if check() else 0)
+    parser.print_help()
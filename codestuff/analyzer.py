@@ -1,15 +1,23 @@
 import os
+import math
 import time
+import shutil
+import signal
+import hashlib
+import tempfile
 import subprocess
-import resource
 import argparse
 import json
 import logging
 from collections import defaultdict
-from multiprocessing import Pool, cpu_count
-from pygments import highlight
-from pygments.lexers import get_lexer_for_filename
-from pygments.formatters import ImageFormatter
+from functools import lru_cache
+from multiprocessing import Pool, Queue, cpu_count
+import corepath  # noqa: F401  (puts the shared rendering and measurement modules on sys.path)
+from renderer import render_png
+from measure import (CACHE_DIR, DEFAULT_LIMITS, launcher_path, measure_repeated, run_and_measure, run_limits,
+                     runtime_for, startup_adjusted, startup_baseline)
+from timeline import TimelineSampler
+from judge import CHECKERS, DEFAULT_EPSILON, find_cases, judge_program, summarize_cases
 
 SUPPORTED_EXTS = (".cpp", ".c", ".go", ".rs", ".py", ".java", ".hs")
 
@@ -30,139 +38,381 @@ def load_png_config(config_path="png_config.json"):
     return default_config
 
 # --- Compilation Logic ---
-def compile_and_get_binary(file_path, ext):
-    base = os.path.splitext(file_path)[0]
-    filename = os.path.basename(file_path)
+# Builds are cached by source hash + compiler version + flags, in a per-key directory under the
+# build cache, so unchanged programs are never recompiled and nothing is written next to the sources
+COMPILERS = {".cpp": "g++", ".c": "gcc", ".go": "go", ".rs": "rustc", ".java": "javac", ".hs": "ghc"}
+VERSION_ARGS = {"go": ["version"], "javac": ["-version"], "ghc": ["--numeric-version"]}
+BUILD_CACHE_DIR = os.path.join(CACHE_DIR, "builds")
+COMPILE_TIMEOUT = 120  # Seconds
+
+# Compiler flags per optimization profile and extension; a profiles JSON file can add or override
+# profiles in the same shape. --matrix builds and measures every profile, speedups are relative to the first
+FLAG_PROFILES = {
+    "debug": {".cpp": ["-O0", "-g"], ".c": ["-O0", "-g"], ".rs": ["-C", "opt-level=0", "-g"],
+              ".hs": ["-O0"], ".go": ["-gcflags=all=-N -l"], ".java": ["-g"]},
+    "O2": {".cpp": ["-O2"], ".c": ["-O2"], ".rs": ["-C", "opt-level=2"], ".hs": ["-O2"]},
+    "O3-native": {".cpp": ["-O3", "-march=native"], ".c": ["-O3", "-march=native"],
+                  ".rs": ["-C", "opt-level=3", "-C", "target-cpu=native"], ".hs": ["-O2"]},
+}
+DEFAULT_PROFILE = "O2"
+
+def load_flag_profiles(config_path=None):
+    profiles = dict(FLAG_PROFILES)
+    if config_path:
+        with open(config_path, "r") as f:
+            profiles.update(json.load(f))
+    return profiles
+
+def profile_flags(profiles, profile, ext):
+    return tuple(profiles[profile].get(ext, ()))
 
+@lru_cache(maxsize=None)
+def compiler_version(compiler):
+    path = shutil.which(compiler)
+    if path is None:
+        return None
+    try:
+        proc = subprocess.run([path, *VERSION_ARGS.get(compiler, ["--version"])],
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    except OSError:
+        return None
+    return f"{path} {proc.stdout.strip()}"
+
+def build_command(ext, file_path, build_dir, output, flags):
     if ext == ".cpp":
-        output = base + ".out"
-        cmd = ["g++", file_path, "-o", output]
-    elif ext == ".c":
-        output = base + ".out"
-        cmd = ["gcc", file_path, "-o", output]
-    elif ext == ".go":
-        output = base + ".out"
-        cmd = ["go", "build", "-o", output, file_path]
-    elif ext == ".rs":
-        output = base + ".out"
-        cmd = ["rustc", file_path, "-o", output]
-    elif ext == ".java":
-        class_name = os.path.splitext(filename)[0]
-        cmd = ["javac", file_path]
-        try:
-            subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-            return class_name, None
-        except subprocess.CalledProcessError as e:
-            return None, e.stderr.decode()
-    elif ext == ".py":
+        return ["g++", *flags, file_path, "-o", output]
+    if ext == ".c":
+        return ["gcc", *flags, file_path, "-o", output]
+    if ext == ".go":
+        return ["go", "build", *flags, "-o", output, file_path]
+    if ext == ".rs":
+        return ["rustc", *flags, file_path, "-o", output]
+    if ext == ".java":
+        return ["javac", *flags, "-d", build_dir, file_path]
+    # ghc writes .hi/.o files next to the source unless given an output directory
+    return ["ghc", *flags, "-outputdir", build_dir, "-o", output, file_path]
+
+def run_compiler(cmd, timeout):
+    # Own session, so a timeout also kills the compiler's helpers (cc1plus, ld, ...) holding the pipes
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.communicate()
+        raise
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+
+def compile_and_get_binary(file_path, ext, cache_dir=BUILD_CACHE_DIR, flags=(), timeout=COMPILE_TIMEOUT):
+    if ext == ".py":
         return "python3", None
-    elif ext == ".hs":
-        output = base + ".out"
-        cmd = ["ghc", "-o", output, file_path]
-    else:
+    if ext not in COMPILERS:
         return None, f"Unsupported file extension: {ext}"
+    version = compiler_version(COMPILERS[ext])
+    if version is None:
+        return None, f"Compiler not found: {COMPILERS[ext]}"
 
-    try:
-        subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-        return output, None
-    except subprocess.CalledProcessError as e:
-        return None, e.stderr.decode()
+    # Java runs by class name, so the file name is part of the key too
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    with open(file_path, "rb") as f:
+        digest = hashlib.sha256(f.read())
+    digest.update("\0".join([ext, name, version, *flags]).encode())
+    key = digest.hexdigest()
+    build_dir = os.path.join(cache_dir, key[:2], key)
+    output = os.path.join(build_dir, name if ext == ".java" else "program")
+    error_path = os.path.join(build_dir, "compile_error.txt")
 
-# --- Runtime Logic ---
-def run_and_measure(command, stdout_path=None, stderr_path=None):
-    start = time.time()
-    usage_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    if not os.path.isdir(build_dir):
+        os.makedirs(os.path.dirname(build_dir), exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(build_dir), prefix=".build-")
+        try:
+            tmp_output = os.path.join(tmp_dir, os.path.basename(output))
+            try:
+                start = time.perf_counter()
+                run_compiler(build_command(ext, file_path, tmp_dir, tmp_output, flags), timeout)
+                with open(os.path.join(tmp_dir, "build.json"), "w") as f:
+                    json.dump({"compile_s": time.perf_counter() - start, "flags": list(flags)}, f)
+            except subprocess.CalledProcessError as e:
+                # Compile errors depend only on the key as well, so they are cached too
+                with open(os.path.join(tmp_dir, "compile_error.txt"), "w") as f:
+                    f.write(e.stderr.decode(errors="replace"))
+            except subprocess.TimeoutExpired:
+                return None, f"Compilation timed out after {timeout}s"  # Not cached: load-dependent
+            try:
+                os.rename(tmp_dir, build_dir)  # Atomic; a parallel build of the same key may have won
+            except OSError:
+                pass
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    else:
+        logging.info(f"Build cache hit: {file_path}")
 
-    try:
-        with open(stdout_path or os.devnull, "w") as out, open(stderr_path or os.devnull, "w") as err:
-            subprocess.run(command, stdout=out, stderr=err, check=True)
-    except subprocess.CalledProcessError:
-        return None, None, "Runtime Error"
+    if os.path.exists(error_path):
+        with open(error_path, "r") as f:
+            return None, f.read()
+    return output, None
 
-    end = time.time()
-    usage_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+def build_info(binary, ext):
+    # Compile time recorded when the build was made (unknown for builds cached before it was), and
+    # the size of what it produced
+    if ext not in COMPILERS:
+        return None
+    info = {"compile_s": None}
+    info_path = os.path.join(os.path.dirname(binary), "build.json")
+    if os.path.exists(info_path):
+        with open(info_path, "r") as f:
+            info.update(json.load(f))
+    if ext == ".java":
+        build_dir = os.path.dirname(binary)
+        size = sum(os.path.getsize(os.path.join(build_dir, name)) for name in os.listdir(build_dir)
+                   if name.endswith(".class"))
+    else:
+        size = os.path.getsize(binary)
+    info["binary_kb"] = size / 1024
+    return info
 
-    elapsed = end - start
-    memory = usage_end.ru_maxrss - usage_start.ru_maxrss
-    return elapsed, memory, None
+def run_command(binary, file_path, ext, memory_mb=None):
+    if ext == ".py":
+        return [binary, file_path]
+    if ext == ".java":
+        heap = [f"-Xmx{memory_mb}m"] if memory_mb else []
+        return ["java", *heap, "-cp", os.path.dirname(binary), os.path.basename(binary)]
+    return [binary]
 
 # --- Code to PNG ---
 def convert_code_to_png(file_path, out_folder="pngs", config=None):
     try:
         with open(file_path, "r") as f:
             code = f.read()
-        lexer = get_lexer_for_filename(file_path)
         cfg = config or load_png_config()
-        formatter = ImageFormatter(
-            line_numbers=cfg.get("line_numbers", True),
-            font_name=cfg.get("font_name", "DejaVu Sans Mono"),
-            style=cfg.get("style", "monokai")
-        )
+        png = render_png(code, file_path,
+                         font_name=cfg.get("font_name", "DejaVu Sans Mono"),
+                         font_size=14, image_pad=10, border=0,  # ImageFormatter defaults
+                         line_numbers=cfg.get("line_numbers", True),
+                         style=cfg.get("style", "monokai"))
         os.makedirs(out_folder, exist_ok=True)
         out_path = os.path.join(out_folder, os.path.basename(file_path) + ".png")
         with open(out_path, "wb") as img_file:
-            img_file.write(highlight(code, lexer, formatter))
+            img_file.write(png)
     except Exception as e:
         logging.warning(f"Failed to convert {file_path} to PNG: {e}")
 
 # --- File Processor ---
-def process_file(args):
-    file_path, single_result_dir, png_dir, verbose, force, png_cfg = args
+# Files go through two phases: compiling and PNG rendering in a wide pool, then the timed runs in a
+# small pool whose workers each own a core, so measurements never share a core with a compiler
+def prepare_file(args):
+    job, single_result_dir, png_dir, png_cfg, build_cache, compile_timeout, flags = args
+    file_path = job[0]
     ext = os.path.splitext(file_path)[1].lower()
-    filename = os.path.basename(file_path)
 
-    result_path = os.path.join(single_result_dir, filename + ".txt")
-    if not force and os.path.exists(result_path):
-        return (filename, "Skipped", "", "", ""), ext[1:]
+    os.makedirs(single_result_dir, exist_ok=True)
+    if png_dir:
+        convert_code_to_png(file_path, png_dir, png_cfg)
+    binary, compile_err = compile_and_get_binary(file_path, ext, build_cache, flags, compile_timeout)
+    build = build_info(binary, ext) if binary else None
+    return job, binary, compile_err, build
+
+def measure_file(args):
+    job, binary, single_result_dir, timing = args
+    file_path = job[0]
+    ext = os.path.splitext(file_path)[1].lower()
+    filename = os.path.basename(file_path)
 
-    convert_code_to_png(file_path, png_dir, png_cfg)
-    binary, compile_err = compile_and_get_binary(file_path, ext)
+    limits = timing["limits"]
+    command = run_command(binary, file_path, ext, limits.get("memory_mb"))
+    if timing.get("judge"):
+        return job, *judge_file(file_path, command, single_result_dir, run_limits(ext, limits), timing["judge"])
+    stdout_path = os.path.join(single_result_dir, filename + ".stdout")
+    stderr_path = os.path.join(single_result_dir, filename + ".stderr")
+    stats, runtime_err = measure_repeated(command, stdout_path, stderr_path, timing["warmup"], timing["min_runs"],
+                                          timing["max_runs"], timing["rel_error"], run_limits(ext, limits))
+    if timing.get("timeline"):
+        # Failing runs are sampled too: the timeline shows how a program got to its limit
+        stats = stats or {}
+        stats["timeline"] = sample_timeline(command, single_result_dir, filename, run_limits(ext, limits),
+                                            timing["timeline"], stats)
 
-    if compile_err:
-        result = (filename, "Compile Error", "", "", compile_err.strip())
+    if runtime_err:
+        # Runtime Error, Time Limit, Memory Limit or Output Limit
+        result = (filename, runtime_err, "", "", runtime_err)
     else:
-        command = ([binary, file_path] if ext == ".py" else
-                   ["java", binary] if ext == ".java" else
-                   [binary])
+        # Median wall time of the measured runs, worst peak RSS
+        result = (filename, "Ran", f"{stats['wall_s']['median']:.4f}", f"{stats['max_rss_kb']}", "")
+    write_file_result(single_result_dir, result, stats)
+    return job, result, stats
 
-        stdout_path = os.path.join(single_result_dir, filename + ".stdout")
-        stderr_path = os.path.join(single_result_dir, filename + ".stderr")
-        time_taken, mem_used, runtime_err = run_and_measure(command, stdout_path, stderr_path)
+def sample_timeline(command, single_result_dir, filename, limits, timeline, stats):
+    # One extra run with the sampler attached, kept out of the timing statistics
+    sampler = TimelineSampler(timeline["interval_s"])
+    try:
+        metrics, error = run_and_measure(command, limits=limits, watch=sampler.start)
+    finally:
+        sampler.stop()
+    summary = sampler.summary(metrics["wall_s"] if metrics else None)
+    summary["status"] = error or "Ran"
+    if metrics and "wall_s" in stats:
+        # Wall time of the sampled run against the unsampled median
+        summary["slowdown"] = metrics["wall_s"] / stats["wall_s"]["median"] - 1
+    base = os.path.join(single_result_dir, filename + ".timeline")
+    sampler.write_csv(base + ".csv")
+    sampler.write_json(base + ".json", summary)
+    if timeline["chart"]:
+        sampler.write_chart(base + ".png", f"{filename} ({summary['status']}): {summary['samples']} samples "
+                                           f"every {timeline['interval_s'] * 1000:g} ms")
+    return summary
 
-        if runtime_err:
-            result = (filename, "Runtime Error", "", "", runtime_err)
-        else:
-            result = (filename, "Ran", f"{time_taken:.4f}", f"{mem_used}", "")
+def judge_file(file_path, command, single_result_dir, limits, judge):
+    filename = os.path.basename(file_path)
+    cases = find_cases(judge["tests"], file_path)
+    if not cases:
+        result = (filename, "No Tests", "", "", f"No test cases for {filename} in {judge['tests']}")
+        write_file_result(single_result_dir, result)
+        return result, None
 
-    os.makedirs(single_result_dir, exist_ok=True)
-    with open(result_path, "w") as f:
+    case_results = judge_program(command, cases, limits, judge["checker"], judge["epsilon"],
+                                 judge["case_jobs"], judge["fail_fast"])
+    status, stats = summarize_cases(case_results)
+    if status == "Accepted":
+        # Slowest case wall time, worst peak RSS
+        slowest = max(case["wall_s"] for case in stats["cases"])
+        result = (filename, status, f"{slowest:.4f}", f"{stats['max_rss_kb']}", "")
+    else:
+        failed = next(case["case"] for case in stats["cases"] if case["status"] != "Accepted")
+        result = (filename, status, "", "", f"{status} on case {failed}")
+    write_file_result(single_result_dir, result, stats)
+    return result, stats
+
+def write_file_result(single_result_dir, result, stats=None):
+    with open(os.path.join(single_result_dir, result[0] + ".txt"), "w") as f:
         f.write(f"Status: {result[1]}\nTime: {result[2]}\nMemory: {result[3]}\nError: {result[4]}\n")
+        if stats and "cases" in stats:
+            f.write(f"Cases: {stats['passed']}/{len(stats['cases'])} accepted\n")
+            for case in stats["cases"]:
+                timing = "" if case["wall_s"] is None else f" {case['wall_s']:.4f}s {case['max_rss_kb']} KB"
+                f.write(f"  {case['case']}: {case['status']}{timing}\n")
+        elif stats and "wall_s" in stats:
+            wall, median = stats["wall_s"], stats["median"]
+            # A single run (e.g. a failure) has no interval
+            ci = "n/a" if wall["ci95"] is None else f"±{wall['ci95']:.4f}s"
+            f.write(f"Runs: {stats['runs']} (after {stats['warmup']} warmup)\n"
+                    f"Wall: mean {wall['mean']:.4f}s, stddev {wall['stddev']:.4f}s, min {wall['min']:.4f}s, "
+                    f"95% CI {ci}\n"
+                    f"CPU: user {median['user_s']:.4f}s, sys {median['sys_s']:.4f}s\n"
+                    f"Context switches: {median['voluntary_switches']:.0f} voluntary, "
+                    f"{median['involuntary_switches']:.0f} involuntary\n"
+                    f"Page faults: {median['minor_faults']:.0f} minor, {median['major_faults']:.0f} major\n")
+        timeline = stats.get("timeline") if stats else None
+        if timeline:
+            slowdown = f"{100 * timeline['slowdown']:+.1f}%" if "slowdown" in timeline else "?"
+            f.write(f"Timeline ({timeline['status']}): {timeline['samples']} samples every "
+                    f"{timeline['interval_s'] * 1000:g} ms, peak RSS {timeline['peak_rss_kb']} KB, "
+                    f"peak VM {timeline['peak_vm_kb']} KB, {timeline['peak_threads']} thread(s); "
+                    f"sampler CPU {timeline['sampler_cpu_s']:.4f}s, sampled run {slowdown} vs median\n")
 
-    return result, ext[1:]
+def format_ci(ci95):
+    return "" if ci95 is None else f"{ci95:.4f}"
 
-# --- Analyzer Core ---
-def analyze_folder(folder_path, result_file_path, per_file_results_dir, png_dir, verbose=False, force=False, json_summary=False):
-    png_cfg = load_png_config()
+# --- Timing Workers ---
+def timing_cores(jobs, cpus=None):
+    # One core per timing worker. An explicit --cpus list is used as given; otherwise the lowest
+    # core is left to the OS and the analyzer when there are spares
+    available = list(cpus) if cpus else sorted(os.sched_getaffinity(0))
+    if not cpus and len(available) > jobs:
+        available = available[1:]
+    if len(available) < jobs:
+        logging.warning(f"{jobs} timing jobs share {len(available)} core(s); timings will interfere")
+    return [available[i % len(available)] for i in range(jobs)]
+
+def init_timing_worker(cores, nice):
+    # Measured programs inherit the worker's CPU affinity and niceness
+    core = cores.get()
+    if core is not None:
+        os.sched_setaffinity(0, {core})
+    if nice:
+        os.nice(nice)
+
+# --- Results Log ---
+# Each finished file is appended to a JSON-lines log right away, so a crash loses nothing. Reruns
+# skip sources whose hash already has a record, and both summaries are generated from the log
+def source_hash(file_path):
+    with open(file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def build_hash(digest, flags):
+    # Profiles with the same flags for a language (e.g. none for Python) share a record
+    if not flags:
+        return digest
+    return hashlib.sha256("\0".join([digest, *flags]).encode()).hexdigest()
+
+def judge_hash(digest, file_path, judge):
+    # A judged result depends on the cases and the checker too, and sources with different stems
+    # can pick up different case directories
+    h = hashlib.sha256(f"{digest}\0{judge['checker']}\0{judge['epsilon']!r}".encode())
+    for name, input_path, expected_path in find_cases(judge["tests"], file_path):
+        h.update(f"\0{name}\0".encode())
+        h.update(source_hash(input_path).encode())
+        h.update(source_hash(expected_path).encode())
+    return h.hexdigest()
+
+def load_log(log_path):
+    # Latest record per source hash; a line torn by a crash is ignored
+    records = {}
+    if os.path.exists(log_path):
+        with open(log_path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records[record["hash"]] = record
+    return records
+
+def open_log(log_path):
+    log = open(log_path, "a")
+    # Terminate a torn last line, so the next record starts on a line of its own
+    if log.tell():
+        with open(log_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read() != b"\n":
+                log.write("\n")
+    return log
+
+def log_record(log, file_path, digest, result, stats=None, profile=None, build=None):
+    _, status, time_taken, mem_used, error = result
+    record = {"hash": digest, "file": file_path, "status": status, "time": time_taken, "memory": mem_used,
+              "error": error, "stats": stats, "profile": profile, "build": build,
+              "logged_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    log.write(json.dumps(record) + "\n")
+    log.flush()
+    return record
+
+def report_progress(phase, done, total, start):
+    elapsed = time.perf_counter() - start
+    eta = f"{elapsed / done * (total - done):.0f}s" if done else "?"
+    print(f"⏳ {phase}: {done}/{total} ({100 * done / total:.0f}%) elapsed={elapsed:.0f}s eta={eta}", flush=True)
+
+# --- Summaries ---
+def write_summaries(files, records, result_file_path, json_summary=False, baselines=None):
     lang_stats = defaultdict(lambda: {
         "total": 0, "success": 0, "compile_fail": 0, "runtime_error": 0,
-        "total_time": 0.0, "total_mem": 0, "filenames": []
+        "time_limit": 0, "memory_limit": 0, "output_limit": 0, "wrong_answer": 0, "no_tests": 0,
+        "total_time": 0.0, "total_cpu": 0.0, "total_mem": 0, "filenames": [], "programs": {}
     })
 
-    file_args = []
-    for root, _, files in os.walk(folder_path):
-        for file in files:
-            ext = os.path.splitext(file)[1].lower()
-            if ext in SUPPORTED_EXTS:
-                full_path = os.path.join(root, file)
-                file_args.append((full_path, per_file_results_dir, png_dir, verbose, force, png_cfg))
-
-    with Pool(cpu_count()) as pool:
-        results = pool.map(process_file, file_args)
-
     with open(result_file_path, "w") as result_file:
-        result_file.write("File, Status, Time (s), Memory (KB), Error\n")
+        result_file.write("File, Status, Time (s), Mean (s), Stddev (s), Min (s), CI95 (s), Runs, Memory (KB), "
+                          "User (s), Sys (s), Vol CS, Invol CS, Minor PF, Major PF, Error\n")
 
-        for (filename, status, time_taken, mem_used, error), lang in results:
+        for file_path, digest in files:
+            record = records.get(digest)
+            if record is None:
+                continue  # Interrupted before this file finished
+            # Identical sources share a record, so names come from the current file
+            filename = os.path.basename(file_path)
+            lang = os.path.splitext(filename)[1].lower()[1:]
+            status, time_taken, mem_used, error = record["status"], record["time"], record["memory"], record["error"]
+            stats = record["stats"]
             lang_stats[lang]["total"] += 1
             lang_stats[lang]["filenames"].append(filename)
 
@@ -172,16 +422,38 @@ def analyze_folder(folder_path, result_file_path, per_file_results_dir, png_dir,
             elif status == "Runtime Error":
                 lang_stats[lang]["runtime_error"] += 1
                 logging.warning(f"Runtime error: {filename}")
-            elif status == "Ran":
+            elif status in ("Time Limit", "Memory Limit", "Output Limit"):
+                lang_stats[lang][status.lower().replace(" ", "_")] += 1
+                logging.warning(f"{status} exceeded: {filename}")
+            elif status in ("Wrong Answer", "No Tests"):
+                lang_stats[lang][status.lower().replace(" ", "_")] += 1
+                logging.warning(f"{status}: {filename}")
+            elif status in ("Ran", "Accepted"):
+                # Judged programs count as successful when every case is accepted
                 lang_stats[lang]["success"] += 1
                 lang_stats[lang]["total_time"] += float(time_taken)
+                lang_stats[lang]["total_cpu"] += stats["cpu_s"]["median"]
                 lang_stats[lang]["total_mem"] += int(mem_used)
-                logging.info(f"Ran {filename}: {time_taken}s, {mem_used} KB")
+                logging.info(f"{status} {filename}: {time_taken}s (over {stats['runs']} runs), {mem_used} KB")
+            if stats:
+                lang_stats[lang]["programs"][filename] = stats
 
-            result_file.write(f"{filename}, {status}, {time_taken}, {mem_used}, {error}\n")
+            spread = ", , , , "
+            usage = ", , , , , "
+            if stats and "wall_s" in stats:
+                wall, median = stats["wall_s"], stats["median"]
+                spread = (f"{wall['mean']:.4f}, {wall['stddev']:.4f}, {wall['min']:.4f}, "
+                          f"{format_ci(wall['ci95'])}, {stats['runs']}")
+                usage = (f"{median['user_s']:.4f}, {median['sys_s']:.4f}, {median['voluntary_switches']:.0f}, "
+                         f"{median['involuntary_switches']:.0f}, {median['minor_faults']:.0f}, "
+                         f"{median['major_faults']:.0f}")
+            result_file.write(f"{filename}, {status}, {time_taken}, {spread}, {mem_used}, {usage}, {error}\n")
 
         result_file.write("\nSummary by Language:\n")
-        result_file.write("Language, Files, Ran, Compile Fails, Runtime Errors, Avg Time (s), Avg Mem (KB), Files\n")
+        result_file.write("Language, Files, Ran, Compile Fails, Runtime Errors, Time Limits, Memory Limits, "
+                          "Output Limits, Wrong Answers, No Tests, Avg Time (s), Avg CPU (s), Avg Mem (KB), "
+                          "Startup (s), Startup Mem (KB), Adj Avg Time (s), Adj Avg CPU (s), Adj Avg Mem (KB), Files\n")
+        baselines = baselines or {}
 
         for lang, data in lang_stats.items():
             files = data["total"]
@@ -189,14 +461,201 @@ def analyze_folder(folder_path, result_file_path, per_file_results_dir, png_dir,
             compile_fail = data["compile_fail"]
             runtime_error = data["runtime_error"]
             avg_time = data["total_time"] / ran if ran > 0 else 0
+            avg_cpu = data["total_cpu"] / ran if ran > 0 else 0
             avg_mem = data["total_mem"] / ran if ran > 0 else 0
             file_list = "; ".join(data["filenames"])
-            result_file.write(f"{lang}, {files}, {ran}, {compile_fail}, {runtime_error}, {avg_time:.4f}, {avg_mem:.0f}, {file_list}\n")
+            limits_hit = (f"{data['time_limit']}, {data['memory_limit']}, {data['output_limit']}, "
+                          f"{data['wrong_answer']}, {data['no_tests']}")
+            # Startup-adjusted averages; languages without a calibrated runtime keep their raw numbers
+            baseline = baselines.get(lang)
+            data["startup"] = baseline
+            startup = f"{baseline['wall_s']:.4f}, {baseline['max_rss_kb']:.0f}" if baseline else ", "
+            adjusted = (f"{startup_adjusted(avg_time, baseline, 'wall_s'):.4f}, "
+                        f"{startup_adjusted(avg_cpu, baseline, 'cpu_s'):.4f}, "
+                        f"{startup_adjusted(avg_mem, baseline, 'max_rss_kb'):.0f}")
+            result_file.write(f"{lang}, {files}, {ran}, {compile_fail}, {runtime_error}, {limits_hit}, {avg_time:.4f}, {avg_cpu:.4f}, {avg_mem:.0f}, {startup}, {adjusted}, {file_list}\n")
 
     if json_summary:
         with open(result_file_path.replace(".txt", ".json"), "w") as jf:
             json.dump(lang_stats, jf, indent=2)
 
+def succeeded(record):
+    return record is not None and record["status"] in ("Ran", "Accepted")
+
+def write_matrix_report(files, keys, records, profiles, matrix_file_path, json_summary=False):
+    # Every profile of every program, with its speedup over the first profile next to what it cost:
+    # binary size and compile time. Per language, speedups are averaged geometrically
+    baseline = profiles[0]
+    lang_stats = defaultdict(lambda: {profile: {"ran": 0, "log_speedup": 0.0, "speedups": 0,
+                                                "binary_kb": 0.0, "builds": 0, "compile_s": 0.0, "timed_builds": 0}
+                                      for profile in profiles})
+    rows = []
+
+    with open(matrix_file_path, "w") as matrix_file:
+        matrix_file.write(f"File, Profile, Status, Time (s), Speedup vs {baseline}, Binary (KB), Compile (s)\n")
+        for file_path, _ in files:
+            filename = os.path.basename(file_path)
+            lang = os.path.splitext(filename)[1].lower()[1:]
+            base = records.get(keys[file_path, baseline])
+            for profile in profiles:
+                record = records.get(keys[file_path, profile])
+                if record is None:
+                    continue
+                data = lang_stats[lang][profile]
+                speedup = None
+                if succeeded(record):
+                    data["ran"] += 1
+                    if succeeded(base) and float(record["time"]) > 0:
+                        speedup = float(base["time"]) / float(record["time"])
+                        data["log_speedup"] += math.log(speedup)
+                        data["speedups"] += 1
+                build = record.get("build")
+                if build:
+                    data["binary_kb"] += build["binary_kb"]
+                    data["builds"] += 1
+                if build and build["compile_s"] is not None:
+                    data["compile_s"] += build["compile_s"]
+                    data["timed_builds"] += 1
+                rows.append({"file": filename, "profile": profile, "status": record["status"],
+                             "time": record["time"], "speedup": speedup, "build": build})
+                cost = ", "
+                if build:
+                    compile_s = "" if build["compile_s"] is None else f"{build['compile_s']:.3f}"
+                    cost = f"{build['binary_kb']:.1f}, {compile_s}"
+                matrix_file.write(f"{filename}, {profile}, {record['status']}, {record['time']}, "
+                                  f"{'' if speedup is None else f'{speedup:.2f}'}, {cost}\n")
+
+        matrix_file.write("\nSummary by Language and Profile:\n")
+        matrix_file.write(f"Language, Profile, Ran, Geomean Speedup vs {baseline}, Avg Binary (KB), Avg Compile (s)\n")
+        for lang, by_profile in lang_stats.items():
+            for profile, data in by_profile.items():
+                geomean = f"{math.exp(data['log_speedup'] / data['speedups']):.2f}" if data["speedups"] else ""
+                avg_kb = f"{data['binary_kb'] / data['builds']:.1f}" if data["builds"] else ""
+                timed = data["timed_builds"]
+                avg_compile = f"{data['compile_s'] / timed:.3f}" if timed else ""
+                matrix_file.write(f"{lang}, {profile}, {data['ran']}, {geomean}, {avg_kb}, {avg_compile}\n")
+
+    if json_summary:
+        with open(os.path.splitext(matrix_file_path)[0] + ".json", "w") as jf:
+            json.dump({"baseline": baseline, "programs": rows}, jf, indent=2)
+
+# --- Analyzer Core ---
+def analyze_folder(folder_path, result_file_path, per_file_results_dir, png_dir, verbose=False, force=False, json_summary=False,
+                   warmup=1, min_runs=3, max_runs=10, rel_error=0.02, build_cache=BUILD_CACHE_DIR,
+                   timing_jobs=1, cpus=None, nice=0, limits=None, compile_timeout=COMPILE_TIMEOUT, log_path=None,
+                   tests_dir=None, checker="exact", epsilon=DEFAULT_EPSILON, case_jobs=1, fail_fast=False,
+                   profiles=(DEFAULT_PROFILE,), profiles_path=None, timeline_interval=None, timeline_chart=False,
+                   calibrate=True, recalibrate=False):
+    png_cfg = load_png_config()
+    flag_profiles = load_flag_profiles(profiles_path)
+    unknown = [profile for profile in profiles if profile not in flag_profiles]
+    if unknown:
+        raise ValueError(f"Unknown flag profile(s): {', '.join(unknown)}")
+    matrix = len(profiles) > 1
+    timing = {"warmup": warmup, "min_runs": min_runs, "max_runs": max_runs, "rel_error": rel_error,
+              "limits": DEFAULT_LIMITS if limits is None else limits}
+    if timeline_interval:
+        timing["timeline"] = {"interval_s": timeline_interval, "chart": timeline_chart}
+    if tests_dir:
+        # Judge mode: one run per test case instead of repeated timing runs
+        timing["judge"] = {"tests": tests_dir, "checker": checker, "epsilon": epsilon,
+                           "case_jobs": case_jobs, "fail_fast": fail_fast}
+    log_path = log_path or os.path.splitext(result_file_path)[0] + ".jsonl"
+
+    files = []
+    for root, _, names in os.walk(folder_path):
+        for file in names:
+            ext = os.path.splitext(file)[1].lower()
+            if ext in SUPPORTED_EXTS:
+                full_path = os.path.join(root, file)
+                digest = source_hash(full_path)
+                if "judge" in timing:
+                    digest = judge_hash(digest, full_path, timing["judge"])
+                files.append((full_path, digest))
+
+    # One job per file and profile; a file's profiles with the same flags are built and measured once
+    keys = {}
+    flags = {}
+    for file_path, digest in files:
+        ext = os.path.splitext(file_path)[1].lower()
+        for profile in profiles:
+            flags[file_path, profile] = profile_flags(flag_profiles, profile, ext)
+            keys[file_path, profile] = build_hash(digest, flags[file_path, profile])
+
+    # --force measures everything again; the newer records then win in the log
+    records = load_log(log_path)
+    pending = {}
+    builds_seen = set()
+    for (file_path, profile), key in keys.items():
+        if (file_path, key) not in builds_seen:
+            builds_seen.add((file_path, key))
+            if force or key not in records:
+                pending[file_path, profile] = key
+    if len(pending) < len(builds_seen):
+        print(f"⏭️ {len(builds_seen) - len(pending)} build(s) already in {log_path}")
+
+    def result_dir(profile):
+        # Matrix runs keep each profile's per-file results apart
+        return os.path.join(per_file_results_dir, profile) if matrix else per_file_results_dir
+
+    launcher_path()  # Build the measurement launcher once, before the workers need it
+    baselines = {}
+    if calibrate:
+        # Before any timing starts, so the empty programs run on a quiet machine
+        for ext in sorted({os.path.splitext(file_path)[1].lower() for file_path, _ in files}):
+            runtime = runtime_for(ext)
+            if runtime:
+                baselines[ext[1:]] = startup_baseline(runtime, timing["limits"].get("memory_mb"), recalibrate)
+                if baselines[ext[1:]]:
+                    print(f"🎯 {runtime} startup: {baselines[ext[1:]]['wall_s']:.4f}s, "
+                          f"{baselines[ext[1:]]['max_rss_kb']:.0f} KB")
+    with open_log(log_path) as log:
+        # Phase 1: compile and render everything, as wide as the machine allows
+        # Each file is rendered once, with its first pending profile
+        rendered = set()
+        file_args = []
+        for job in pending:
+            file_args.append((job, result_dir(job[1]), None if job[0] in rendered else png_dir, png_cfg,
+                              build_cache, compile_timeout, flags[job]))
+            rendered.add(job[0])
+        timing_args = []
+        builds = {}
+        start = time.perf_counter()
+        with Pool(cpu_count()) as pool:
+            prepared = pool.imap_unordered(prepare_file, file_args)
+            for done, (job, binary, compile_err, build) in enumerate(prepared, 1):
+                file_path, profile = job
+                if compile_err:
+                    result = (os.path.basename(file_path), "Compile Error", "", "", compile_err.strip())
+                    write_file_result(result_dir(profile), result)
+                    records[pending[job]] = log_record(log, file_path, pending[job], result, profile=profile)
+                else:
+                    builds[job] = build
+                    timing_args.append((job, binary, result_dir(profile), timing))
+                report_progress("Compiled", done, len(file_args), start)
+
+        # Phase 2: timed runs, a few at a time, each worker pinned to its own core
+        if timing_args:
+            cores = Queue()
+            for core in timing_cores(timing_jobs, cpus):
+                # Cases run in parallel within a program need more than one core, so they go unpinned
+                cores.put(None if tests_dir and case_jobs > 1 else core)
+            start = time.perf_counter()
+            with Pool(timing_jobs, initializer=init_timing_worker, initargs=(cores, nice)) as pool:
+                measured = pool.imap_unordered(measure_file, timing_args)
+                for done, (job, result, stats) in enumerate(measured, 1):
+                    records[pending[job]] = log_record(log, job[0], pending[job], result, stats,
+                                                       job[1], builds[job])
+                    report_progress("Timed", done, len(timing_args), start)
+
+    # The main summary covers the first profile; a matrix run also compares all of them
+    write_summaries([(file_path, keys[file_path, profiles[0]]) for file_path, _ in files], records,
+                    result_file_path, json_summary, baselines)
+    if matrix:
+        matrix_path = os.path.splitext(result_file_path)[0] + "_matrix.txt"
+        write_matrix_report(files, keys, records, profiles, matrix_path, json_summary)
+        print(f"📊 Profile matrix written to {matrix_path}")
+
 # --- CLI ---
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Analyze source code in a folder.")
@@ -205,11 +664,71 @@ if __name__ == "__main__":
     parser.add_argument("--per-file", default="results", help="Directory for per-file results")
     parser.add_argument("--png-dir", default="pngs", help="Directory to save PNGs")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
-    parser.add_argument("--force", action="store_true", help="Reprocess even if result exists")
+    parser.add_argument("--force", action="store_true", help="Reprocess even if the log has a result")
+    parser.add_argument("--log", help="Append-only JSON-lines results log (default: <results>.jsonl)")
     parser.add_argument("--json", action="store_true", help="Output JSON summary alongside results.txt")
+    parser.add_argument("--build-cache", default=BUILD_CACHE_DIR,
+                        help=f"Directory for cached build artifacts (default: {BUILD_CACHE_DIR})")
+    parser.add_argument("--timing-jobs", type=int, default=1,
+                        help="Programs timed at once, each on its own core (default: 1)")
+    parser.add_argument("--cpus", type=int, nargs="+", help="Cores to pin timing workers to (default: all but core 0)")
+    parser.add_argument("--nice", type=int, default=0, help="Niceness added to the timed programs (default: 0)")
+    parser.add_argument("--time-limit", type=float, default=DEFAULT_LIMITS["wall_s"],
+                        help=f"Wall-clock seconds per run, 0 for none (default: {DEFAULT_LIMITS['wall_s']:g})")
+    parser.add_argument("--cpu-limit", type=float, default=DEFAULT_LIMITS["cpu_s"],
+                        help=f"CPU seconds per run, 0 for none (default: {DEFAULT_LIMITS['cpu_s']:g})")
+    parser.add_argument("--memory-limit", type=int, default=DEFAULT_LIMITS["memory_mb"],
+                        help=f"Address space in MB per run, 0 for none (default: {DEFAULT_LIMITS['memory_mb']})")
+    parser.add_argument("--output-limit", type=int, default=DEFAULT_LIMITS["output_mb"],
+                        help=f"Output file size in MB per run, 0 for none (default: {DEFAULT_LIMITS['output_mb']})")
+    parser.add_argument("--compile-timeout", type=float, default=COMPILE_TIMEOUT,
+                        help=f"Seconds per compilation (default: {COMPILE_TIMEOUT})")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured runs per program (default: 1)")
+    parser.add_argument("--min-runs", type=int, default=3, help="Minimum measured runs per program (default: 3)")
+    parser.add_argument("--max-runs", type=int, default=10, help="Maximum measured runs per program (default: 10)")
+    parser.add_argument("--rel-error", type=float, default=0.02,
+                        help="Stop once the 95%% CI of the mean time is within this fraction of it (default: 0.02)")
 
+    parser.add_argument("--profile", default=DEFAULT_PROFILE,
+                        help=f"Compiler flag profile: {', '.join(FLAG_PROFILES)} or one from --profiles-file "
+                             f"(default: {DEFAULT_PROFILE})")
+    parser.add_argument("--profiles-file", help="JSON file of extra flag profiles: {name: {ext: [flags]}}")
+    parser.add_argument("--matrix", nargs="*", metavar="PROFILE",
+                        help="Build and measure every profile (or the ones given) and compare them; "
+                             "speedups are relative to the first")
+    parser.add_argument("--timeline", type=float, metavar="MS",
+                        help="Sample each program's RSS, VM size, threads and I/O every MS milliseconds in one "
+                             "extra run, written to <file>.timeline.csv/.json in the per-file directory")
+    parser.add_argument("--timeline-png", action="store_true", help="Also chart each timeline as a PNG")
+    parser.add_argument("--no-calibrate", action="store_true",
+                        help="Skip the Python/Java startup calibration and the startup-adjusted averages")
+    parser.add_argument("--recalibrate", action="store_true", help="Measure the startup baselines again")
+    parser.add_argument("--tests", help="Judge mode: directory of <name>.in/<name>.out cases, "
+                                        "optionally in a subdirectory per source stem")
+    parser.add_argument("--checker", choices=CHECKERS, default="exact",
+                        help="How judged output is compared with the expected output (default: exact)")
+    parser.add_argument("--epsilon", type=float, default=DEFAULT_EPSILON,
+                        help=f"Absolute/relative tolerance of the float checker (default: {DEFAULT_EPSILON:g})")
+    parser.add_argument("--case-jobs", type=int, default=1, help="Test cases run at once per program (default: 1)")
+    parser.add_argument("--fail-fast", action="store_true", help="Stop judging a program at its first failing case")
     args = parser.parse_args()
+    if args.matrix is None:
+        profiles = [args.profile]
+    else:
+        profiles = args.matrix or list(load_flag_profiles(args.profiles_file))
+    unknown = set(profiles) - set(load_flag_profiles(args.profiles_file))
+    if unknown:
+        parser.error(f"unknown flag profile(s): {', '.join(sorted(unknown))}")
     logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
 
     analyze_folder(args.folder, args.results, args.per_file, args.png_dir,
-                   verbose=args.verbose, force=args.force, json_summary=args.json)
+                   verbose=args.verbose, force=args.force, json_summary=args.json, warmup=args.warmup,
+                   min_runs=args.min_runs, max_runs=args.max_runs, rel_error=args.rel_error, build_cache=args.build_cache,
+                   timing_jobs=args.timing_jobs, cpus=args.cpus, nice=args.nice,
+                   limits={"wall_s": args.time_limit or None, "cpu_s": args.cpu_limit or None,
+                           "memory_mb": args.memory_limit or None, "output_mb": args.output_limit or None},
+                   compile_timeout=args.compile_timeout, log_path=args.log, tests_dir=args.tests,
+                   checker=args.checker, epsilon=args.epsilon, case_jobs=args.case_jobs, fail_fast=args.fail_fast,
+                   profiles=profiles, profiles_path=args.profiles_file,
+                   timeline_interval=args.timeline / 1000 if args.timeline else None, timeline_chart=args.timeline_png,
+                   calibrate=not args.no_calibrate, recalibrate=args.recalibrate)
@@ -6,8 +6,13 @@ import streamlit as st
 from PIL import Image
 from pathlib import Path
 
+import corepath  # noqa: F401  (puts the shared rendering core on sys.path)
+
 try:
     from converter import CodeToPNGConverter
+    from renderer import render_png_cached
+    from batchrender import BackgroundBatch, show_batch_progress
+    import dircache
     from analyzer import analyze_folder
     from latexcompiler import compile_latex_files
 except ImportError as e:
@@ -61,7 +66,8 @@ def run_ui():
         folder_path = os.path.join(app.INPUT_FOLDER, selected_subfolder) if selected_subfolder else app.INPUT_FOLDER
 
         if st.button("🔄 Refresh File List"):
-            st.experimental_rerun()
+            dircache.clear()
+            st.rerun()
 
         files = app.list_code_files(folder_path)
         if not files:
@@ -86,7 +92,7 @@ def run_ui():
             line_numbers = st.checkbox("Show Line Numbers", key="line_numbers")
             style = st.selectbox("Style", ["monokai", "default", "friendly", "native", "trac"], key="style")
 
-            save_settings({
+            current_settings = {
                 "font_name": font_name,
                 "font_size": font_size,
                 "image_pad": image_pad,
@@ -94,7 +100,10 @@ def run_ui():
                 "style": style,
                 "border": border,
                 "dpi": dpi
-            })
+            }
+            # Only touch settings.json when something actually changed
+            if current_settings != persistent_settings:
+                save_settings(current_settings)
 
             generate_all = st.button("📦 Generate All PNGs")
 
@@ -103,34 +112,30 @@ def run_ui():
             try:
                 output_file = os.path.splitext(selected_file)[0] + ".png"
                 output_path = os.path.join(app.OUTPUT_FOLDER, output_file)
-                img_io = app.code_to_png(code, file_path, output_path,
-                                         font_name, font_size, line_numbers,
-                                         style, image_pad, border, dpi)
-                st.image(img_io, caption=output_file, use_container_width=True)
-                st.download_button("📥 Download PNG", data=img_io, file_name=output_file, mime="image/png")
+                # Rendered in memory (LRU cached); nothing is written until the user exports
+                png = render_png_cached(code, file_path, font_name=font_name, font_size=font_size,
+                                        line_numbers=line_numbers, style=style, image_pad=image_pad,
+                                        border=border, dpi=dpi)
+                st.image(png, caption=output_file, use_container_width=True)
+                st.download_button("📥 Download PNG", data=png, file_name=output_file, mime="image/png")
+                if st.button("💾 Save to codeimages"):
+                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                    with open(output_path, "wb") as f:
+                        f.write(png)
+                    st.success(f"✅ Saved: {output_path}")
             except Exception as e:
                 st.error(f"Error rendering image: {e}")
 
             with st.expander("📄 View Source Code"):
                 st.code(code, language="auto")
 
-        if generate_all:
-            st.subheader("📊 Generating PNGs...")
-            count = 0
-            for f in files:
-                full_path = os.path.join(folder_path, f)
-                output_path = os.path.join(app.OUTPUT_FOLDER, os.path.splitext(f)[0] + ".png")
-                try:
-                    with open(full_path, 'r', encoding='utf-8') as file:
-                        content = file.read()
-                    app.code_to_png(content, full_path, output_path,
-                                    font_name, font_size, line_numbers,
-                                    style, image_pad, border, dpi)
-                    st.image(output_path, caption=f)
-                    count += 1
-                except Exception as e:
-                    st.error(f"❌ Failed for {f}: {e}")
-            st.success(f"✅ {count} images generated!")
+        if generate_all and not (st.session_state.get("batch_job") and st.session_state.batch_job.running):
+            jobs = [(os.path.join(folder_path, f), os.path.join(app.OUTPUT_FOLDER, os.path.splitext(f)[0] + ".png"))
+                    for f in files]
+            # Runs on a background thread so the page stays responsive while it renders
+            st.session_state.batch_job = BackgroundBatch(jobs, current_settings, app.OUTPUT_FOLDER)
+
+        show_batch_progress(st, app.OUTPUT_FOLDER)
 
     with tab2:
         st.subheader("📊 Performance Analyzer")
@@ -0,0 +1,347 @@
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import argparse
+import tempfile
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+import corepath  # noqa: F401  (puts the shared rendering core on sys.path)
+
+# Benchmark suite for the code-to-PNG pipeline.
+# Renders a synthetic corpus (several languages, short to very long files, with and without line
+# numbers, several DPIs) and times each stage: lexing, formatting (layout), rasterization and
+# encoding, plus the end-to-end CodeToPNGConverter.code_to_png call. The sibling tools in
+# codetopng/ wrap the same renderer.render_png, so their cost is covered by the same stages.
+# Every case runs in a fresh worker process, so its peak RSS is its own. Results go to JSON and
+# can be compared against an earlier run.
+
+DEFAULT_LANGUAGES = ["python", "c", "cpp", "java", "javascript", "go", "rust", "haskell", "sql", "bash"]
+DEFAULT_LINES = [10, 200, 2000, 20000]
+DEFAULT_DPIS = [72, 300]  # ImageFormatter ignores dpi today; kept in the matrix to catch it starting to matter
+REGRESSION_THRESHOLD = 0.10  # Slowdown vs the baseline that gets flagged
+
+# Language -> (file extension, snippet); {n} is replaced so every repetition differs
+SNIPPETS = {
+    "python": (".py", '''def compute_{n}(values, scale=2):
+    """Scale and filter a list of values."""
+    result = [v * scale for v in values if v % {n} != 0]
+    return sum(result) / max(len(result), 1)
+
+'''),
+    "c": (".c", '''/* Sum an array with a stride */
+static long sum_{n}(const int *data, size_t len) {
+    long total = 0;
+    for (size_t i = 0; i < len; i += {n} % 4 + 1) total += data[i];
+    return total;
+}
+
+'''),
+    "cpp": (".cpp", '''template <typename T>
+std::vector<T> filter_{n}(const std::vector<T>& in) {
+    std::vector<T> out;
+    std::copy_if(in.begin(), in.end(), std::back_inserter(out), [](T v) {{ return v > {n}; }});
+    return out;
+}
+
+'''),
+    "java": (".java", '''    // Counts words longer than a limit
+    public static int count{n}(List<String> words) {
+        int count = 0;
+        for (String w : words) if (w.length() > {n} % 10) count++;
+        return count;
+    }
+
+'''),
+    "javascript": (".js", '''// Debounced handler number {n}
+export function handler{n}(event) {
+  const value = event.target.value.trim();
+  return fetch(`/api/items/${value}?page={n}`).then((r) => r.json());
+}
+
+'''),
+    "go": (".go", '''// Worker{n} drains the channel and reports a total
+func Worker{n}(in <-chan int, out chan<- int) {
+	total := 0
+	for v := range in {
+		total += v * {n}
+	}
+	out <- total
+}
+
+'''),
+    "rust": (".rs", '''/// Returns the largest even value, if any
+pub fn largest_even_{n}(values: &[i64]) -> Option<i64> {
+    values.iter().copied().filter(|v| v % 2 == 0 && *v > {n}).max()
+}
+
+'''),
+    "haskell": (".hs", '''-- | Collatz steps for {n}
+collatz{n} :: Int -> Int
+collatz{n} 1 = 0
+collatz{n} k
+  | even k = 1 + collatz{n} (k `div` 2)
+  | otherwise = 1 + collatz{n} (3 * k + 1)
+
+'''),
+    "sql": (".sql", '''-- Report {n}
+SELECT c.name, COUNT(o.id) AS orders, SUM(o.total) AS revenue
+FROM customers c JOIN orders o ON o.customer_id = c.id
+WHERE o.created_at > '2024-01-01' AND c.region_id = {n}
+GROUP BY c.name ORDER BY revenue DESC;
+
+'''),
+    "bash": (".sh", '''# Archive logs for job {n}
+archive_{n}() {
+    local dir="/var/log/job{n}"
+    [ -d "$dir" ] && tar -czf "$dir.tar.gz" "$dir" && echo "archived $dir"
+}
+
+'''),
+}
+
+
+def synth_code(language, lines):
+    ext, snippet = SNIPPETS[language]
+    snippet_lines = snippet.count("\n")
+    parts = [snippet.replace("{n}", str(n)).replace("{{", "{").replace("}}", "}")
+             for n in range(lines // snippet_lines + 1)]
+    code = "\n".join("".join(parts).splitlines()[:lines]) + "\n"
+    return "bench" + ext, code
+
+
+def build_cases(languages, line_counts, dpis):
+    return [{"language": language, "lines": lines, "line_numbers": line_numbers, "dpi": dpi}
+            for language in languages
+            for lines in line_counts
+            for line_numbers in (False, True)
+            for dpi in dpis]
+
+
+def case_key(case):
+    return f"{case['language']}/{case['lines']}/{'ln' if case['line_numbers'] else 'noln'}/{case['dpi']}"
+
+
+def _stage_times(code, file_name, settings, case):
+    import renderer
+    import encoder
+
+    timings = {}
+    start = time.perf_counter()
+    lexer = renderer.get_lexer(file_name, code)
+    tokens = list(lexer.get_tokens(code))
+    timings["lex_ms"] = (time.perf_counter() - start) * 1000
+
+    formatter_args = (settings["font_name"], settings["font_size"], case["line_numbers"],
+                      settings["style"], settings["image_pad"], 0, case["dpi"])
+    formatter, lock = renderer.get_formatter(*formatter_args)
+    with lock:
+        formatter.drawables = []
+        start = time.perf_counter()
+        formatter._create_drawables(tokens)
+        formatter._draw_line_numbers()
+        timings["format_ms"] = (time.perf_counter() - start) * 1000
+        formatter.drawables = []
+
+    # render_image lays the tokens out again, so rasterization is what it adds on top of the layout
+    start = time.perf_counter()
+    image = renderer.render_image(tokens, *formatter_args, engine=settings["engine"])
+    timings["raster_ms"] = max((time.perf_counter() - start) * 1000 - timings["format_ms"], 0.0)
+
+    start = time.perf_counter()
+    data = encoder.encode(image, settings["output_format"], settings["palette"], settings["effort"])
+    timings["encode_ms"] = (time.perf_counter() - start) * 1000
+    timings["output_bytes"] = len(data)
+    timings["width"], timings["height"] = image.size
+    return timings
+
+
+def run_case(case, settings, repeat):
+    # Runs in its own worker process (one case per process), so ru_maxrss is this case's peak
+    from converter import CodeToPNGConverter
+
+    rss_start_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    file_name, code = synth_code(case["language"], case["lines"])
+    # Warmup on a short file of the same language: lexer import, style and formatter setup
+    _stage_times(synth_code(case["language"], 10)[1], file_name, settings, case)
+    runs = [_stage_times(code, file_name, settings, case) for _ in range(repeat)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = CodeToPNGConverter(input_folder=tmp, output_folder=tmp)
+        totals = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            app.code_to_png(code, file_name, os.path.join(tmp, "out"),
+                            font_name=settings["font_name"], font_size=settings["font_size"],
+                            line_numbers=case["line_numbers"], style=settings["style"],
+                            image_pad=settings["image_pad"], border=0, dpi=case["dpi"],
+                            engine=settings["engine"], output_format=settings["output_format"],
+                            palette=settings["palette"], effort=settings["effort"])
+            totals.append((time.perf_counter() - start) * 1000)
+
+    result = dict(case)
+    for key in ("lex_ms", "format_ms", "raster_ms", "encode_ms"):
+        result[key] = statistics.median(run[key] for run in runs)
+    result["total_ms"] = statistics.median(totals)
+    result["output_bytes"] = runs[-1]["output_bytes"]
+    result["image_size"] = [runs[-1]["width"], runs[-1]["height"]]
+    result["rss_start_kb"] = rss_start_kb
+    result["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+
+def _warm_worker():
+    # Imports and font lookups happen before the measured case, not inside it
+    import renderer  # noqa: F401
+    import converter  # noqa: F401
+
+
+def run_benchmark(cases, settings, repeat=3, verbose=True):
+    results = []
+    for i, case in enumerate(cases, start=1):
+        # A fresh process per case keeps peak RSS per case; one case at a time keeps timings clean
+        with ProcessPoolExecutor(max_workers=1, initializer=_warm_worker) as executor:
+            try:
+                result = executor.submit(run_case, case, settings, repeat).result()
+            except Exception as e:  # e.g. MemoryError on a huge image, or a crashed worker
+                result = dict(case, error=str(e) or type(e).__name__)
+        results.append(result)
+        if verbose:
+            if "error" in result:
+                print(f"❌ [{i}/{len(cases)}] {case_key(case)}: {result['error']}")
+            else:
+                print(f"⏱️ [{i}/{len(cases)}] {case_key(case)}: total {result['total_ms']:.0f} ms "
+                      f"(lex {result['lex_ms']:.0f} / format {result['format_ms']:.0f} / "
+                      f"raster {result['raster_ms']:.0f} / encode {result['encode_ms']:.0f}), "
+                      f"{result['output_bytes'] / 1024:.0f} KB, peak {result['peak_rss_kb'] / 1024:.0f} MB")
+    return results
+
+
+def environment_info():
+    import pygments
+    import PIL
+    return {
+        "python": sys.version.split()[0],
+        "pygments": pygments.__version__,
+        "pillow": PIL.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def baseline_mismatches(report, baseline):
+    """Return (blocking, warnings): why report and baseline cannot, or should not, be compared.
+
+    Different render settings (engine, format, font, ...) make the timings measure different work,
+    which blocks the comparison; a different repeat count, case set or library versions only warrant
+    a warning.
+    """
+    blocking, warnings = [], []
+    old_settings = baseline.get("settings")
+    if old_settings is None:
+        blocking.append("baseline has no recorded settings")
+    else:
+        for key in sorted(set(report["settings"]) | set(old_settings)):
+            if report["settings"].get(key) != old_settings.get(key):
+                blocking.append(f"{key}: {old_settings.get(key)!r} → {report['settings'].get(key)!r}")
+    if baseline.get("repeat") != report["repeat"]:
+        warnings.append(f"repeat: {baseline.get('repeat')} → {report['repeat']}")
+    new_keys = {case_key(r) for r in report["results"]}
+    old_keys = {case_key(r) for r in baseline.get("results", [])}
+    if new_keys != old_keys:
+        warnings.append(f"cases: {len(new_keys & old_keys)} shared, {len(new_keys - old_keys)} new, "
+                        f"{len(old_keys - new_keys)} only in the baseline")
+    old_env = baseline.get("environment", {})
+    for key in ("python", "pygments", "pillow", "platform", "cpu_count"):
+        if old_env.get(key) != report["environment"].get(key):
+            warnings.append(f"{key}: {old_env.get(key)} → {report['environment'].get(key)}")
+    return blocking, warnings
+
+
+def compare_to_baseline(report, baseline, threshold=REGRESSION_THRESHOLD):
+    """Print per-case total time ratios against a baseline run; returns the regressed case keys.
+
+    Returns None, without comparing, when the baseline was recorded with different render settings.
+    """
+    blocking, warnings = baseline_mismatches(report, baseline)
+    if blocking:
+        print("❌ Baseline was recorded with different settings; not comparing:")
+        for line in blocking:
+            print(f"   {line}")
+        return None
+    for line in warnings:
+        print(f"⚠️ Baseline differs: {line}")
+    results = report["results"]
+    previous = {case_key(r): r for r in baseline.get("results", []) if "error" not in r}
+    ratios = []
+    regressions = []
+    print()
+    print("📊 Comparison with baseline (total ms, new / old)")
+    print("------------------------")
+    for result in results:
+        key = case_key(result)
+        old = previous.get(key)
+        if "error" in result or old is None or not old["total_ms"]:
+            continue
+        ratio = result["total_ms"] / old["total_ms"]
+        ratios.append(ratio)
+        marker = "🔺" if ratio > 1 + threshold else ("🔻" if ratio < 1 - threshold else "  ")
+        print(f"{marker} {key:32s} {old['total_ms']:9.0f} → {result['total_ms']:9.0f} ms  x{ratio:.2f}  "
+              f"bytes x{result['output_bytes'] / max(old['output_bytes'], 1):.2f}")
+        if ratio > 1 + threshold:
+            regressions.append(key)
+    if ratios:
+        print("------------------------")
+        print(f"Geometric mean ratio : x{statistics.geometric_mean(ratios):.3f} over {len(ratios)} cases")
+        print(f"Regressions (>{threshold:.0%}) : {len(regressions)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the code-to-PNG rendering pipeline.")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="Results file (default: benchmark.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--languages", nargs="+", default=DEFAULT_LANGUAGES, choices=sorted(SNIPPETS),
+                        help="Languages in the synthetic corpus")
+    parser.add_argument("--lines", nargs="+", type=int, default=DEFAULT_LINES, help="File lengths in lines")
+    parser.add_argument("--dpis", nargs="+", type=int, default=DEFAULT_DPIS, help="DPI settings")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the median is reported (default: 3)")
+    parser.add_argument("--font-name", default="Arial", help="Font name (default: Arial)")
+    parser.add_argument("--font-size", type=int, default=14, help="Font size (default: 14)")
+    parser.add_argument("--style", default="monokai", help="Pygments style (default: monokai)")
+    parser.add_argument("--engine", default="pil", help="Render engine: pil or atlas (default: pil)")
+    parser.add_argument("--format", dest="output_format", default="png", help="Output format (default: png)")
+    parser.add_argument("--palette", default="off", help="PNG palette: off or adaptive (default: off)")
+    parser.add_argument("--effort", default="balanced", help="Encoder effort (default: balanced)")
+    args = parser.parse_args()
+
+    settings = {
+        "font_name": args.font_name, "font_size": args.font_size, "style": args.style, "image_pad": 20,
+        "engine": args.engine, "output_format": args.output_format, "palette": args.palette,
+        "effort": args.effort,
+    }
+    cases = build_cases(args.languages, args.lines, args.dpis)
+    print(f"🔬 Running {len(cases)} cases x {args.repeat} runs")
+    start = time.perf_counter()
+    results = run_benchmark(cases, settings, args.repeat)
+
+    report = {"environment": environment_info(), "settings": settings, "repeat": args.repeat,
+              "seconds": time.perf_counter() - start, "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline)
+        if regressions is None:
+            sys.exit(2)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,12 @@ import os
 import sys
 import json
 import argparse
+import corepath  # noqa: F401  (puts the shared rendering core on sys.path)
 from converter import CodeToPNGConverter
+from batchrender import render_batch
+from renderer import ENGINES
+from encoder import OUTPUT_FORMATS, PALETTES, EFFORTS
+from paginate import render_paginated
 from analyzer import analyze_folder
 from latexcompiler import compile_latex_files
 
@@ -33,6 +38,11 @@ def apply_overrides(settings, args):
         settings["dpi"] = args.dpi
     if args.lang:
         settings["lang"] = args.lang
+    if args.engine:
+        settings["engine"] = args.engine
+    for key in ("output_format", "palette", "effort"):
+        if getattr(args, key):
+            settings[key] = getattr(args, key)
     return settings
 
 def analyze_mode(input_path, settings, args):
@@ -51,31 +61,41 @@ def analyze_mode(input_path, settings, args):
         json_summary=args.json
     )
 
-def convert_single_or_folder(app, input_path, settings):
+def convert_single_or_folder(app, input_path, settings, workers=None, force=False, page_lines=None, pdf=False):
     def convert_and_save(file_path, output_path):
         with open(file_path, 'r', encoding='utf-8') as file:
             code = file.read()
         app.code_to_png(code, file_path, output_path, **settings)
 
+    extension = OUTPUT_FORMATS[settings.get("output_format", "png")]
     if os.path.isdir(input_path):
         files = app.list_code_files(input_path)
-        count = 0
+        jobs = []
         for f in files:
             file_path = os.path.join(input_path, f)
-            output_file = os.path.splitext(f)[0] + ".png"
+            output_file = os.path.splitext(f)[0] + extension
             output_path = os.path.join(app.OUTPUT_FOLDER, output_file)
-            convert_and_save(file_path, output_path)
-            print(f"✅ Generated: {output_path}")
-            count += 1
-        print(f"\n🎉 {count} PNGs saved to '{app.OUTPUT_FOLDER}'")
+            jobs.append((file_path, output_path))
+
+        # Render on a process pool, skipping files whose content and settings are unchanged
+        stats = render_batch(jobs, settings, app.OUTPUT_FOLDER, workers=workers, force=force)
+        print(f"\n🎉 {stats['rendered'] + stats['skipped']} images up to date in '{app.OUTPUT_FOLDER}'")
     else:
         if not os.path.isfile(input_path):
             print("❌ Invalid file path.")
             return
-        output_file = os.path.splitext(os.path.basename(input_path))[0] + ".png"
+        output_file = os.path.splitext(os.path.basename(input_path))[0] + extension
         output_path = os.path.join(app.OUTPUT_FOLDER, output_file)
+        if page_lines or pdf:
+            # Long files: one image per page instead of a single huge bitmap
+            with open(input_path, 'r', encoding='utf-8') as file:
+                code = file.read()
+            written = render_paginated(code, input_path, output_path, page_lines or 200, pdf, **settings)
+            for path in written:
+                print(f"✅ Page saved: {path}")
+            return
         convert_and_save(input_path, output_path)
-        print(f"✅ PNG saved: {output_path}")
+        print(f"✅ Image saved: {output_path}")
 
 def main():
     parser = argparse.ArgumentParser(description="📦 Code Tool CLI")
@@ -88,13 +108,22 @@ def main():
     parser.add_argument("--border", action="store_true", help="Add a border to the PNG image")
     parser.add_argument("--dpi", type=int, help="Set DPI (resolution) for PNG output")
     parser.add_argument("--lang", type=str, help="Manually set language for syntax highlighting")
+    parser.add_argument("--engine", choices=ENGINES, help="Text render engine: pil (default) or atlas (needs NumPy)")
+    parser.add_argument("--format", dest="output_format", choices=sorted(OUTPUT_FORMATS),
+                        help="Image format: png (default), webp (lossless) or avif")
+    parser.add_argument("--palette", choices=PALETTES,
+                        help="PNG palette: adaptive keeps the frequent colors exact and shrinks files")
+    parser.add_argument("--effort", choices=EFFORTS, help="Encoder effort: fast, balanced (default) or small")
+    parser.add_argument("--workers", type=int, help="Parallel render processes (default: number of CPUs)")
+    parser.add_argument("--page-lines", type=int, help="Split a single file into pages of this many lines")
+    parser.add_argument("--pdf", action="store_true", help="Write the pages of a single file into one PDF")
 
     # Analyzer options
     parser.add_argument("--results", type=str, help="Main results file (default: results.txt)")
     parser.add_argument("--per-file", type=str, help="Directory for per-file results")
     parser.add_argument("--png-dir", type=str, help="Directory for PNG output during analysis")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose analyzer logging")
-    parser.add_argument("--force", action="store_true", help="Re-analyze even if file was already processed")
+    parser.add_argument("--force", action="store_true", help="Re-analyze / re-render even if a file was already processed")
     parser.add_argument("--json", action="store_true", help="Write JSON summary in addition to results.txt")
 
     args = parser.parse_args()
@@ -118,7 +147,11 @@ def main():
     if args.analyze:
         analyze_mode(input_path, settings, args)
     else:
-        convert_single_or_folder(app, input_path, settings)
+        if (args.page_lines or args.pdf) and os.path.isdir(input_path):
+            # Pagination writes several outputs per file; the folder batch renders one image each
+            parser.error("--page-lines and --pdf need a single file, not a folder")
+        convert_single_or_folder(app, input_path, settings, workers=args.workers, force=args.force,
+                                 page_lines=args.page_lines, pdf=args.pdf)
 
 if __name__ == "__main__":
     main()
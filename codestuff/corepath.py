@@ -0,0 +1,11 @@
+import os
+import sys
+
+# The rendering core (renderer, encoder, fontcache, batchrender, ...) lives once in ../coderender and
+# is shared with codetopng/; program measurement (measure) lives in ../coderun and is shared with
+# compileandcheckprogrammingfiles/. Importing this module first puts both on the import path.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for shared in ("coderender", "coderun"):
+    path = os.path.join(ROOT, shared)
+    if path not in sys.path:
+        sys.path.insert(0, path)
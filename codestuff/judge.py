@@ -0,0 +1,104 @@
+import os
+import glob
+import math
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import corepath  # noqa: F401  (puts the shared measurement module on sys.path)
+from measure import DEFAULT_LIMITS, run_with_input, summarize_runs
+
+# Judge mode: runs a program once per test case, with the case input piped to stdin, and checks
+# stdout against the expected output.
+# Cases live in a tests directory as <name>.in next to <name>.out (or <name>.ans). A subdirectory
+# named after the source's stem, e.g. tests/sum/ for sum.cpp, takes precedence over tests/ itself.
+
+CHECKERS = ("exact", "whitespace", "float")
+DEFAULT_EPSILON = 1e-6
+EXPECTED_EXTS = (".out", ".ans")
+
+
+def find_cases(tests_dir, source_path):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    case_dir = os.path.join(tests_dir, stem)
+    if not os.path.isdir(case_dir):
+        case_dir = tests_dir
+
+    cases = []
+    for input_path in sorted(glob.glob(os.path.join(case_dir, "*.in"))):
+        base = input_path[:-len(".in")]
+        for ext in EXPECTED_EXTS:
+            if os.path.exists(base + ext):
+                cases.append((os.path.basename(base), input_path, base + ext))
+                break
+    return cases
+
+
+def _floats_match(token, expected, epsilon):
+    # Non-numeric tokens still have to match exactly; numbers may differ by epsilon, absolute or relative
+    if token == expected:
+        return True
+    try:
+        x, y = float(token), float(expected)
+    except ValueError:
+        return False
+    if math.isnan(x) or math.isnan(y):
+        return math.isnan(x) and math.isnan(y)
+    return abs(x - y) <= epsilon * max(1.0, abs(y))
+
+
+def check_output(output, expected, checker="exact", epsilon=DEFAULT_EPSILON):
+    if checker == "exact":
+        return output == expected
+    tokens, expected_tokens = output.split(), expected.split()
+    if checker == "whitespace":
+        return tokens == expected_tokens
+    if checker == "float":
+        return len(tokens) == len(expected_tokens) and all(
+            _floats_match(t, e, epsilon) for t, e in zip(tokens, expected_tokens))
+    raise ValueError(f"Unknown checker: {checker}")
+
+
+def run_case(command, case, limits, checker, epsilon):
+    name, input_path, expected_path = case
+    with open(input_path, "rb") as f:
+        input_data = f.read()
+    metrics, error, output = run_with_input(command, input_data, limits)
+    if not error:
+        with open(expected_path, "rb") as f:
+            error = None if check_output(output, f.read(), checker, epsilon) else "Wrong Answer"
+    return {"case": name, "status": error or "Accepted", "metrics": metrics}
+
+
+def judge_program(command, cases, limits=None, checker="exact", epsilon=DEFAULT_EPSILON, jobs=1, fail_fast=False):
+    """Run command against every case, up to jobs at once, and return the case results in case order.
+
+    With fail_fast, cases not yet started are skipped after the first failure.
+    """
+    limits = DEFAULT_LIMITS if limits is None else limits
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = {executor.submit(run_case, command, case, limits, checker, epsilon): case[0] for case in cases}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[futures[future]] = future.result()
+            if fail_fast and any(r["status"] != "Accepted" for r in results.values()):
+                for future in pending:
+                    future.cancel()
+                for future in pending:
+                    if not future.cancelled():
+                        results[futures[future]] = future.result()  # Already running; let it finish
+                break
+    return [results[name] for name, _, _ in cases if name in results]
+
+
+def summarize_cases(case_results):
+    # Program status is the first failing case's status; time and memory are the worst case's
+    status = next((r["status"] for r in case_results if r["status"] != "Accepted"), "Accepted")
+    measured = [r["metrics"] for r in case_results if r["metrics"]]
+    stats = summarize_runs(measured) if measured else {}
+    stats["cases"] = [{"case": r["case"], "status": r["status"],
+                       "wall_s": r["metrics"]["wall_s"] if r["metrics"] else None,
+                       "max_rss_kb": r["metrics"]["max_rss_kb"] if r["metrics"] else None}
+                      for r in case_results]
+    stats["passed"] = sum(r["status"] == "Accepted" for r in case_results)
+    return status, stats
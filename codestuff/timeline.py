@@ -0,0 +1,122 @@
+import json
+import time
+import threading
+from array import array
+
+# Memory/IO timeline of one run, sampled from /proc while the program runs.
+# Peak RSS alone cannot tell a leak from a spike, so the sampler records RSS, address space size,
+# thread count and bytes read/written (rchar/wchar, everything passed through read/write calls) at
+# a fixed interval. Series are kept in typed arrays, so a long run costs a few bytes per sample.
+# The sampler's own CPU time is reported, since it runs beside the program.
+
+COLUMNS = ("t_s", "rss_kb", "vm_kb", "threads", "rchar", "wchar")
+STATUS_FIELDS = {b"VmRSS": "rss_kb", b"VmSize": "vm_kb", b"Threads": "threads"}
+IO_FIELDS = {b"rchar": "rchar", b"wchar": "wchar"}
+CHART_SIZE = (1200, 1000)
+
+
+def _read_fields(path, fields, sample):
+    with open(path, "rb") as f:
+        for line in f:
+            key, _, value = line.partition(b":")
+            name = fields.get(key)
+            if name:
+                sample[name] = int(value.split()[0])
+
+
+class TimelineSampler:
+    def __init__(self, interval_s=0.01):
+        self.interval_s = interval_s
+        self.series = {name: array("d" if name == "t_s" else "q") for name in COLUMNS}
+        self.sampler_cpu_s = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, pid):
+        # Passed to measure.run_and_measure as its watch callback
+        self._thread = threading.Thread(target=self._sample, args=(pid,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _sample(self, pid):
+        cpu_start = time.thread_time()
+        start = time.perf_counter()
+        status_path, io_path = f"/proc/{pid}/status", f"/proc/{pid}/io"
+        while not self._stop.is_set():
+            sample = {"rchar": 0, "wchar": 0}
+            try:
+                _read_fields(status_path, STATUS_FIELDS, sample)
+                _read_fields(io_path, IO_FIELDS, sample)
+            except (FileNotFoundError, ProcessLookupError):
+                break  # The program has exited
+            except PermissionError:
+                pass  # /proc/<pid>/io can be unreadable; the I/O columns stay 0
+            if "rss_kb" not in sample:
+                break  # A zombie has no memory left to sample
+            self.series["t_s"].append(time.perf_counter() - start)
+            for name in COLUMNS[1:]:
+                self.series[name].append(sample.get(name, 0))
+            self._stop.wait(self.interval_s)
+        self.sampler_cpu_s = time.thread_time() - cpu_start
+
+    def summary(self, run_wall_s=None):
+        samples = len(self.series["t_s"])
+        summary = {
+            "samples": samples,
+            "interval_s": self.interval_s,
+            "peak_rss_kb": max(self.series["rss_kb"], default=0),
+            "peak_vm_kb": max(self.series["vm_kb"], default=0),
+            "peak_threads": max(self.series["threads"], default=0),
+            "sampler_cpu_s": self.sampler_cpu_s,
+        }
+        if samples > 1:
+            summary["mean_interval_s"] = self.series["t_s"][-1] / (samples - 1)
+        if run_wall_s:
+            summary["sampler_cpu_fraction"] = self.sampler_cpu_s / run_wall_s
+        return summary
+
+    def write_csv(self, path):
+        with open(path, "w") as f:
+            f.write(",".join(COLUMNS) + "\n")
+            for row in zip(*(self.series[name] for name in COLUMNS)):
+                f.write(f"{row[0]:.6f}," + ",".join(str(v) for v in row[1:]) + "\n")
+
+    def write_json(self, path, summary=None):
+        with open(path, "w") as f:
+            json.dump({"summary": summary or self.summary(),
+                       "series": {name: self.series[name].tolist() for name in COLUMNS}}, f)
+
+    def write_chart(self, path, title=""):
+        # Plain PIL, already needed by the renderer: one panel per sampled quantity, RSS on top
+        from PIL import Image, ImageDraw
+
+        image = Image.new("RGB", CHART_SIZE, "white")
+        draw = ImageDraw.Draw(image)
+        width, height = CHART_SIZE
+        draw.text((20, 10), title, fill="black")
+        t = self.series["t_s"]
+        end = t[-1] if len(t) > 1 else 1.0
+        panels = [("RSS (MB)", [(self.series["rss_kb"], "#d62728")], 1024),
+                  ("VM size (MB)", [(self.series["vm_kb"], "#9467bd")], 1024),
+                  ("Threads", [(self.series["threads"], "#ff7f0e")], 1),
+                  ("I/O (MB): read, written", [(self.series["rchar"], "#1f77b4"),
+                                               (self.series["wchar"], "#2ca02c")], 2 ** 20)]
+        panel_height = (height - 60) // len(panels)
+        for i, (label, lines, scale) in enumerate(panels):
+            top, left, right = 40 + i * panel_height, 80, width - 20
+            bottom = top + panel_height - 40
+            draw.rectangle((left, top, right, bottom), outline="black")
+            peak = max((max(values, default=0) for values, _ in lines), default=0) / scale or 1.0
+            draw.text((left, bottom + 5), f"{label}, peak {peak:.1f}, over {end:.3f}s", fill="black")
+            draw.text((5, top), f"{peak:.1f}", fill="black")
+            draw.text((5, bottom - 10), "0", fill="black")
+            for values, color in lines:
+                points = [(left + (right - left) * x / end, bottom - (bottom - top) * v / scale / peak)
+                          for x, v in zip(t, values)]
+                if len(points) > 1:
+                    draw.line(points, fill=color, width=2)
+        image.save(path)
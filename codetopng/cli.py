@@ -2,9 +2,9 @@ import os
 import sys
 import json
 from io import BytesIO
-from pygments import highlight
-from pygments.lexers import get_lexer_for_filename, guess_lexer
-from pygments.formatters import ImageFormatter
+import corepath  # noqa: F401  (puts the shared rendering core on sys.path)
+from renderer import render_png
+from batchrender import render_batch
 
 SETTINGS_FILE = "settings.json"
 
@@ -28,22 +28,10 @@ class CodeToPNGCLI:
                     line_numbers=False,
                     style='monokai',
                     image_pad=20) -> BytesIO:
-        try:
-            lexer = get_lexer_for_filename(file_path)
-        except Exception:
-            lexer = guess_lexer(code)
-
-        formatter = ImageFormatter(
-            font_name=font_name,
-            font_size=font_size,
-            line_numbers=line_numbers,
-            style=style,
-            image_pad=image_pad,
-            dpi=300
-        )
-
         img_io = BytesIO()
-        img_io.write(highlight(code, lexer, formatter))
+        img_io.write(render_png(code, file_path, font_name=font_name, font_size=font_size,
+                                line_numbers=line_numbers, style=style, image_pad=image_pad,
+                                border=0, dpi=300))
         img_io.seek(0)
 
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -87,20 +75,20 @@ class CodeToPNGCLI:
 
         if all_mode:
             files = self.list_code_files(input_path)
-            count = 0
+            jobs = []
             for f in files:
                 file_path = os.path.join(input_path, f)
                 output_path = os.path.join(self.OUTPUT_FOLDER, f)
                 output_path = os.path.splitext(output_path)[0] + ".png"
-                os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    code = file.read()
-                self.code_to_png(code, file_path, output_path,
-                                 font_name, font_size, line_numbers, style, image_pad)
-                print(f"✅ Generated: {output_path}")
-                count += 1
-            print(f"\n🎉 Done! {count} PNGs saved in '{self.OUTPUT_FOLDER}'")
+                jobs.append((file_path, output_path))
+
+            # Render on a process pool, skipping files whose content and settings are unchanged
+            render_settings = {
+                "font_name": font_name, "font_size": font_size, "line_numbers": line_numbers,
+                "style": style, "image_pad": image_pad, "border": 0, "dpi": 300,
+            }
+            stats = render_batch(jobs, render_settings, self.OUTPUT_FOLDER)
+            print(f"\n🎉 Done! {stats['rendered'] + stats['skipped']} PNGs up to date in '{self.OUTPUT_FOLDER}'")
         else:
             if not os.path.isfile(input_path):
                 print("❌ Provide a valid file path when not using folder mode")
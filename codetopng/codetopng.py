@@ -1,10 +1,10 @@
 import os
 import sys
 from io import BytesIO
-from PIL import Image
-from pygments import highlight
-from pygments.lexers import get_lexer_for_filename, guess_lexer
-from pygments.formatters import ImageFormatter
+import corepath  # noqa: F401  (puts the shared rendering core on sys.path)
+from renderer import render_png, render_png_cached
+import dircache
+from batchrender import render_batch, BackgroundBatch, show_batch_progress
 
 # Attempt to import streamlit
 try:
@@ -22,15 +22,11 @@ class CodeToPNGApp:
         os.makedirs(self.OUTPUT_FOLDER, exist_ok=True)
 
     def list_subfolders(self, folder):
-        return [f for f in os.listdir(folder)
-                if os.path.isdir(os.path.join(folder, f))]
+        return dircache.list_subfolders(folder)
 
     def list_code_files(self, folder):
-        all_files = []
-        for root, _, files in os.walk(folder):
-            for f in files:
-                all_files.append(os.path.relpath(os.path.join(root, f), start=folder))
-        return all_files
+        # Cached; revalidated against directory mtimes instead of re-walking the tree
+        return dircache.list_code_files(folder)
 
     def code_to_png(self, code: str, file_path: str, output_path: str,
                     font_name='Arial',
@@ -38,22 +34,10 @@ class CodeToPNGApp:
                     line_numbers=False,
                     style='monokai',
                     image_pad=20) -> BytesIO:
-        try:
-            lexer = get_lexer_for_filename(file_path)
-        except Exception:
-            lexer = guess_lexer(code)
-
-        formatter = ImageFormatter(
-            font_name=font_name,
-            font_size=font_size,
-            line_numbers=line_numbers,
-            style=style,
-            image_pad=image_pad,
-            dpi=300
-        )
-
         img_io = BytesIO()
-        img_io.write(highlight(code, lexer, formatter))
+        img_io.write(render_png(code, file_path, font_name=font_name, font_size=font_size,
+                                line_numbers=line_numbers, style=style, image_pad=image_pad,
+                                border=0, dpi=300))
         img_io.seek(0)
 
         # Ensure output folder exists (including subfolders)
@@ -99,6 +83,10 @@ class CodeToPNGApp:
             ], index=1)
 
             generate_all = st.button("📦 Generate All PNGs from folder")
+            settings = {
+                "font_name": font_name, "font_size": font_size, "line_numbers": line_numbers,
+                "style": style, "image_pad": image_pad, "border": 0, "dpi": 300,
+            }
 
         with col2:
             st.subheader("🖼️ Live Preview")
@@ -106,34 +94,30 @@ class CodeToPNGApp:
                 output_file = os.path.splitext(selected_file)[0] + ".png"
                 output_path = os.path.join(self.OUTPUT_FOLDER, output_file)
 
-                img_io = self.code_to_png(code, file_path, output_path,
-                                          font_name, font_size, line_numbers, style, image_pad)
+                # Rendered in memory (LRU cached); nothing is written until the user exports
+                png = render_png_cached(code, file_path, **settings)
 
-                st.image(Image.open(img_io), caption=output_file, use_container_width=True)
-                st.download_button("📥 Download PNG", data=img_io, file_name=output_file, mime="image/png")
+                st.image(png, caption=output_file, use_container_width=True)
+                st.download_button("📥 Download PNG", data=png, file_name=output_file, mime="image/png")
+                if st.button("💾 Save to codeimages"):
+                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                    with open(output_path, 'wb') as f:
+                        f.write(png)
+                    st.success(f"✅ Saved: {output_path}")
 
             except Exception as e:
                 st.error(f"Error generating image: {e}")
 
-        if generate_all:
-            st.subheader("📊 Generating PNGs...")
-            generated = 0
+        if generate_all and not (st.session_state.get("batch_job") and st.session_state.batch_job.running):
+            jobs = []
             for filename in files:
                 full_path = os.path.join(folder_path, filename)
                 output_file = os.path.splitext(filename)[0] + ".png"
-                output_path = os.path.join(self.OUTPUT_FOLDER, output_file)
+                jobs.append((full_path, os.path.join(self.OUTPUT_FOLDER, output_file)))
+            # Runs on a background thread so the page stays responsive while it renders
+            st.session_state.batch_job = BackgroundBatch(jobs, settings, self.OUTPUT_FOLDER)
 
-                try:
-                    with open(full_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    self.code_to_png(content, full_path, output_path,
-                                     font_name, font_size, line_numbers, style, image_pad)
-                    st.image(output_path, caption=output_file, use_container_width=True)
-                    generated += 1
-                except Exception as e:
-                    st.error(f"❌ Failed: {filename}: {e}")
-
-            st.success(f"✅ {generated} image(s) created in '{self.OUTPUT_FOLDER}'")
+        show_batch_progress(st, self.OUTPUT_FOLDER)
 
     def run_cli(self, input_path: str, all_mode: bool):
         input_path = os.path.join(self.INPUT_FOLDER, input_path)
@@ -149,19 +133,20 @@ class CodeToPNGApp:
 
         if all_mode:
             files = self.list_code_files(input_path)
-            count = 0
+            jobs = []
             for f in files:
                 file_path = os.path.join(input_path, f)
                 output_file = os.path.splitext(f)[0] + ".png"
                 output_path = os.path.join(self.OUTPUT_FOLDER, output_file)
-
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    code = file.read()
-                self.code_to_png(code, file_path, output_path,
-                                 font_name, font_size, line_numbers, style, image_pad)
-                print(f"✅ Generated: {output_file}")
-                count += 1
-            print(f"\n🎉 Done! {count} PNGs saved in '{self.OUTPUT_FOLDER}'")
+                jobs.append((file_path, output_path))
+
+            # Render on a process pool, skipping files whose content and settings are unchanged
+            render_settings = {
+                "font_name": font_name, "font_size": font_size, "line_numbers": line_numbers,
+                "style": style, "image_pad": image_pad, "border": 0, "dpi": 300,
+            }
+            stats = render_batch(jobs, render_settings, self.OUTPUT_FOLDER)
+            print(f"\n🎉 Done! {stats['rendered'] + stats['skipped']} PNGs up to date in '{self.OUTPUT_FOLDER}'")
         else:
             if not os.path.isfile(input_path):
                 print("❌ Provide a valid file path when not using folder mode")
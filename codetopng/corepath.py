@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The rendering core (renderer, encoder, fontcache, batchrender, ...) lives once in ../coderender and
+# is shared with codestuff/. Importing this module first puts it on the import path.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for shared in ("coderender",):
+    path = os.path.join(ROOT, shared)
+    if path not in sys.path:
+        sys.path.insert(0, path)
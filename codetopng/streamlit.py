@@ -2,9 +2,10 @@ import os
 import json
 from io import BytesIO
 import streamlit as st
-from pygments import highlight
-from pygments.lexers import get_lexer_for_filename, guess_lexer
-from pygments.formatters import ImageFormatter
+import corepath  # noqa: F401  (puts the shared rendering core on sys.path)
+from renderer import render_png, render_png_cached
+from batchrender import BackgroundBatch, show_batch_progress
+import dircache
 from PIL import Image
 
 SETTINGS_FILE = "settings.json"
@@ -17,15 +18,11 @@ class CodeToPNGStreamlit:
         os.makedirs(self.OUTPUT_FOLDER, exist_ok=True)
 
     def list_subfolders(self, folder):
-        return [f for f in os.listdir(folder)
-                if os.path.isdir(os.path.join(folder, f))]
+        return dircache.list_subfolders(folder)
 
     def list_code_files(self, folder):
-        all_files = []
-        for root, _, files in os.walk(folder):
-            for f in files:
-                all_files.append(os.path.relpath(os.path.join(root, f), start=folder))
-        return all_files
+        # Cached; revalidated against directory mtimes instead of re-walking the tree
+        return dircache.list_code_files(folder)
 
     def code_to_png(self, code: str, file_path: str, output_path: str,
                     font_name='Arial',
@@ -33,22 +30,10 @@ class CodeToPNGStreamlit:
                     line_numbers=False,
                     style='monokai',
                     image_pad=20) -> BytesIO:
-        try:
-            lexer = get_lexer_for_filename(file_path)
-        except Exception:
-            lexer = guess_lexer(code)
-
-        formatter = ImageFormatter(
-            font_name=font_name,
-            font_size=font_size,
-            line_numbers=line_numbers,
-            style=style,
-            image_pad=image_pad,
-            dpi=300
-        )
-
         img_io = BytesIO()
-        img_io.write(highlight(code, lexer, formatter))
+        img_io.write(render_png(code, file_path, font_name=font_name, font_size=font_size,
+                                line_numbers=line_numbers, style=style, image_pad=image_pad,
+                                border=0, dpi=300))
         img_io.seek(0)
 
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -137,14 +122,16 @@ def run_streamlit_ui():
             key="style"
         )
 
-        # Save settings anytime they change
-        save_settings({
+        # Save settings only when they differ from the file
+        current_settings = {
             "font_name": st.session_state.font_name,
             "font_size": st.session_state.font_size,
             "image_pad": st.session_state.image_pad,
             "line_numbers": st.session_state.line_numbers,
             "style": st.session_state.style,
-        })
+        }
+        if current_settings != persistent_settings:
+            save_settings(current_settings)
 
         generate_all = st.button("📦 Generate All PNGs from folder")
 
@@ -154,43 +141,31 @@ def run_streamlit_ui():
             output_file = os.path.splitext(selected_file)[0] + ".png"
             output_path = os.path.join(app.OUTPUT_FOLDER, output_file)
 
-            img_io = app.code_to_png(code, file_path, output_path,
-                                     st.session_state.font_name,
-                                     st.session_state.font_size,
-                                     st.session_state.line_numbers,
-                                     st.session_state.style,
-                                     st.session_state.image_pad)
+            # Rendered in memory (LRU cached); nothing is written until the user exports
+            png = render_png_cached(code, file_path, **current_settings, border=0, dpi=300)
 
-            st.image(img_io, caption=output_file, use_container_width=True)
-            st.download_button("📥 Download PNG", data=img_io, file_name=output_file, mime="image/png")
+            st.image(png, caption=output_file, use_container_width=True)
+            st.download_button("📥 Download PNG", data=png, file_name=output_file, mime="image/png")
+            if st.button("💾 Save to codeimages"):
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                with open(output_path, 'wb') as f:
+                    f.write(png)
+                st.success(f"✅ Saved: {output_path}")
 
         except Exception as e:
             st.error(f"Error generating image: {e}")
 
-    if generate_all:
-        st.subheader("📊 Generating PNGs...")
-        generated = 0
+    if generate_all and not (st.session_state.get("batch_job") and st.session_state.batch_job.running):
+        jobs = []
         for filename in files:
             full_path = os.path.join(folder_path, filename)
-            output_file = os.path.splitext(filename)[0] + ".png"
             output_path = os.path.join(app.OUTPUT_FOLDER, filename)
             output_path = os.path.splitext(output_path)[0] + ".png"
+            jobs.append((full_path, output_path))
+        # Runs on a background thread so the page stays responsive while it renders
+        st.session_state.batch_job = BackgroundBatch(jobs, dict(current_settings, border=0, dpi=300), app.OUTPUT_FOLDER)
 
-            try:
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                app.code_to_png(content, full_path, output_path,
-                                st.session_state.font_name,
-                                st.session_state.font_size,
-                                st.session_state.line_numbers,
-                                st.session_state.style,
-                                st.session_state.image_pad)
-                st.image(output_path, caption=output_file, use_container_width=True)
-                generated += 1
-            except Exception as e:
-                st.error(f"❌ Failed: {filename}: {e}")
-
-        st.success(f"✅ {generated} image(s) created in '{app.OUTPUT_FOLDER}'")
+    show_batch_progress(st, app.OUTPUT_FOLDER)
 
 if __name__ == "__main__":
     run_streamlit_ui()
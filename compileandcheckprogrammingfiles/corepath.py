@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Program measurement (measure) lives once in ../coderun and is shared with codestuff/'s analyzer.
+# Importing this module first puts it on the import path.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for shared in ("coderun",):
+    path = os.path.join(ROOT, shared)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -1,14 +1,19 @@
 import os
 import subprocess
-import time
-import resource  # Unix only
 import sys
 from collections import defaultdict
 import argparse
+import corepath  # noqa: F401  (puts the shared measurement module on sys.path)
+from measure import (DEFAULT_LIMITS, launcher_path, run_and_measure, run_limits, runtime_for, startup_adjusted,
+                     startup_baseline)
 
 
 RESULT_FILE = "results.txt"
 
+# Run status -> language stats counter
+RUN_FAILURES = {"Runtime Error": "runtime_error", "Time Limit": "time_limit",
+                "Memory Limit": "memory_limit", "Output Limit": "output_limit"}
+
 def compile_and_get_binary(file_path, ext):
     base = os.path.splitext(file_path)[0]
     filename = os.path.basename(file_path)
@@ -47,49 +52,36 @@ def compile_and_get_binary(file_path, ext):
     except subprocess.CalledProcessError as e:
         return None, e.stderr.decode()
 
-def run_and_measure(command):
-    start_time = time.time()
-    usage_start = resource.getrusage(resource.RUSAGE_CHILDREN)
-
-    try:
-        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-    except subprocess.CalledProcessError:
-        return None, None, "Runtime Error"
-
-    end_time = time.time()
-    usage_end = resource.getrusage(resource.RUSAGE_CHILDREN)
-
-    elapsed_time = end_time - start_time
-    memory_used_kb = usage_end.ru_maxrss - usage_start.ru_maxrss
-
-    return elapsed_time, memory_used_kb, None
-
-def process_file(file_path):
+def process_file(file_path, limits=DEFAULT_LIMITS):
     ext = os.path.splitext(file_path)[1]
     filename = os.path.basename(file_path)
 
     binary, compile_err = compile_and_get_binary(file_path, ext)
 
     if compile_err:
-        return filename, "Fail", "", "", f"Compile Error: {compile_err.strip()}"
+        return filename, "Fail", "", "", f"Compile Error: {compile_err.strip()}", None
 
     if ext == ".py":
         command = [binary, file_path]
     elif ext == ".java":
-        command = ["java", binary]
+        heap = [f"-Xmx{limits['memory_mb']}m"] if limits.get("memory_mb") else []
+        command = ["java", *heap, binary]
     else:
         command = [binary]
 
-    time_taken, mem_used, runtime_err = run_and_measure(command)
+    metrics, runtime_err = run_and_measure(command, limits=run_limits(ext, limits))
 
     if runtime_err:
-        return filename, "Success", "Runtime Error", "", runtime_err
+        return filename, "Success", runtime_err, "", runtime_err, metrics
 
-    return filename, "Success", f"{time_taken:.4f}", f"{mem_used}", ""
+    return filename, "Success", f"{metrics['wall_s']:.4f}", f"{metrics['max_rss_kb']}", "", metrics
 
-def summarize_language_stats(stats, result_file):
+def summarize_language_stats(stats, result_file, baselines=None):
+    baselines = baselines or {}
     result_file.write("\n\nSummary by Language:\n")
-    result_file.write("Language, Files, Successes, Compile Fails, Runtime Errors, Avg Time (s), Avg Memory (KB), Files Processed\n")
+    result_file.write("Language, Files, Successes, Compile Fails, Runtime Errors, Time Limits, Memory Limits, "
+                      "Output Limits, Avg Time (s), Avg CPU (s), Avg Memory (KB), Startup (s), Startup Memory (KB), "
+                      "Adj Avg Time (s), Adj Avg CPU (s), Adj Avg Memory (KB), Files Processed\n")
 
     for lang, data in stats.items():
         files = data["total"]
@@ -97,25 +89,53 @@ def summarize_language_stats(stats, result_file):
         compile_fail = data["compile_fail"]
         runtime_error = data["runtime_error"]
         avg_time = data["total_time"] / success if success > 0 else 0
+        avg_cpu = data["total_cpu"] / success if success > 0 else 0
         avg_mem = data["total_mem"] / success if success > 0 else 0
         file_list = "; ".join(data["filenames"])
+        # Python and Java averages minus their runtime's startup; other languages keep the raw numbers
+        baseline = baselines.get(lang)
+        startup = f"{baseline['wall_s']:.4f}, {baseline['max_rss_kb']:.0f}" if baseline else ", "
 
         result_file.write(f"{lang}, {files}, {success}, {compile_fail}, {runtime_error}, "
-                          f"{avg_time:.4f}, {avg_mem:.0f}, {file_list}\n")
-
-def main(folder_path):
+                          f"{data['time_limit']}, {data['memory_limit']}, {data['output_limit']}, "
+                          f"{avg_time:.4f}, {avg_cpu:.4f}, {avg_mem:.0f}, {startup}, "
+                          f"{startup_adjusted(avg_time, baseline, 'wall_s'):.4f}, "
+                          f"{startup_adjusted(avg_cpu, baseline, 'cpu_s'):.4f}, "
+                          f"{startup_adjusted(avg_mem, baseline, 'max_rss_kb'):.0f}, {file_list}\n")
+
+def calibrate_startup(folder_path, limits, refresh=False):
+    # Empty-program baselines for the runtimes present, cached per toolchain version
+    baselines = {}
+    for ext in sorted({os.path.splitext(file)[1] for _, _, files in os.walk(folder_path) for file in files}):
+        runtime = runtime_for(ext)
+        if runtime:
+            baseline = startup_baseline(runtime, limits.get("memory_mb"), refresh)
+            if baseline:
+                baselines[ext[1:]] = baseline
+                print(f"🎯 {runtime} startup: {baseline['wall_s']:.4f}s, {baseline['max_rss_kb']:.0f} KB")
+    return baselines
+
+def main(folder_path, limits=DEFAULT_LIMITS, calibrate=True, recalibrate=False):
     lang_stats = defaultdict(lambda: {
         "total": 0,
         "success": 0,
         "compile_fail": 0,
         "runtime_error": 0,
+        "time_limit": 0,
+        "memory_limit": 0,
+        "output_limit": 0,
         "total_time": 0.0,
+        "total_cpu": 0.0,
         "total_mem": 0,
         "filenames": []
     })
 
+    launcher_path()  # Build the measurement launcher up front instead of inside the first timing
+    baselines = calibrate_startup(folder_path, limits, recalibrate) if calibrate else {}
+
     with open(RESULT_FILE, "w") as result_file:
-        result_file.write("File, Compile Success, Time (s), Memory (KB), Error\n")
+        result_file.write("File, Compile Success, Time (s), Memory (KB), User (s), Sys (s), "
+                          "Vol CS, Invol CS, Minor PF, Major PF, Error\n")
 
         for root, _, files in os.walk(folder_path):
             for file in files:
@@ -128,27 +148,36 @@ def main(folder_path):
                     lang_stats[lang]["total"] += 1
                     lang_stats[lang]["filenames"].append(file)
 
-                    filename, status, time_taken, memory_used, error = process_file(full_path)
+                    filename, status, time_taken, memory_used, error, metrics = process_file(full_path, limits)
 
                     if status == "Fail":
                         lang_stats[lang]["compile_fail"] += 1
-                    elif time_taken == "Runtime Error":
-                        lang_stats[lang]["runtime_error"] += 1
+                    elif time_taken in RUN_FAILURES:
+                        lang_stats[lang][RUN_FAILURES[time_taken]] += 1
                     else:
                         lang_stats[lang]["success"] += 1
                         lang_stats[lang]["total_time"] += float(time_taken)
+                        lang_stats[lang]["total_cpu"] += metrics["user_s"] + metrics["sys_s"]
                         lang_stats[lang]["total_mem"] += int(memory_used)
 
-                    result_file.write(f"{filename}, {status}, {time_taken}, {memory_used}, {error}\n")
+                    usage = ", , , , , "
+                    if metrics:
+                        usage = (f"{metrics['user_s']:.4f}, {metrics['sys_s']:.4f}, "
+                                 f"{metrics['voluntary_switches']}, {metrics['involuntary_switches']}, "
+                                 f"{metrics['minor_faults']}, {metrics['major_faults']}")
+                    result_file.write(f"{filename}, {status}, {time_taken}, {memory_used}, {usage}, {error}\n")
 
                     if status == "Fail":
                         print(f"❌ Compile failed for {filename}")
                     elif time_taken == "Runtime Error":
                         print(f"⚠️ Runtime error in {filename}")
+                    elif time_taken in RUN_FAILURES:
+                        print(f"⏱️ {time_taken} exceeded by {filename}")
                     else:
-                        print(f"✅ Ran {filename}: {time_taken}s, {memory_used} KB")
+                        print(f"✅ Ran {filename}: {time_taken}s, {memory_used} KB, "
+                              f"{metrics['user_s'] + metrics['sys_s']:.4f}s CPU")
 
-        summarize_language_stats(lang_stats, result_file)
+        summarize_language_stats(lang_stats, result_file, baselines)
 
 if __name__ == "__main__":
     if sys.platform.startswith("win"):
@@ -161,6 +190,17 @@ if __name__ == "__main__":
         default="inputs",
         help=f"Path to folder containing source files (default: {'inputs'})"
     )
+    parser.add_argument("--time-limit", type=float, default=DEFAULT_LIMITS["wall_s"],
+                        help=f"Wall-clock seconds per program, 0 for none (default: {DEFAULT_LIMITS['wall_s']:g})")
+    parser.add_argument("--cpu-limit", type=float, default=DEFAULT_LIMITS["cpu_s"],
+                        help=f"CPU seconds per program, 0 for none (default: {DEFAULT_LIMITS['cpu_s']:g})")
+    parser.add_argument("--memory-limit", type=int, default=DEFAULT_LIMITS["memory_mb"],
+                        help=f"Address space in MB per program, 0 for none (default: {DEFAULT_LIMITS['memory_mb']})")
+    parser.add_argument("--output-limit", type=int, default=DEFAULT_LIMITS["output_mb"],
+                        help=f"Output size in MB per program, 0 for none (default: {DEFAULT_LIMITS['output_mb']})")
+    parser.add_argument("--no-calibrate", action="store_true",
+                        help="Skip the Python/Java startup calibration and the startup-adjusted averages")
+    parser.add_argument("--recalibrate", action="store_true", help="Measure the startup baselines again")
 
     args = parser.parse_args()
 
@@ -171,4 +211,6 @@ if __name__ == "__main__":
         print(f"📁 Folder '{folder}' not found. Creating it...")
         os.makedirs(folder, exist_ok=True)
 
-    main(folder)
\ No newline at end of file
+    main(folder, {"wall_s": args.time_limit or None, "cpu_s": args.cpu_limit or None,
+                  "memory_mb": args.memory_limit or None, "output_mb": args.output_limit or None},
+         calibrate=not args.no_calibrate, recalibrate=args.recalibrate)
\ No newline at end of file
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# Random-access index for tar / tar.gz / tar.bz2 / tar.xz / zip archives
+# The index is stored next to the archive as <archive>.idx.json and reused while the archive is unchanged.
+# For gzip it also stores zran-style checkpoints (compressed offset, bit offset, 32KB window) so a single
+# member can be extracted by inflating from the nearest checkpoint instead of from the start of the file.
+
+import os
+import bz2
+import sys
+import json
+import lzma
+import gzip
+import zlib
+import base64
+import ctypes
+import ctypes.util
+import shutil
+import tarfile
+import zipfile
+import argparse
+
+INDEX_SUFFIX = ".idx.json"
+INDEX_VERSION = 1
+SPAN = 8 * 1024 * 1024   # Uncompressed bytes between gzip checkpoints
+CHUNK = 64 * 1024        # Compressed bytes read / uncompressed bytes produced per inflate call
+WINDOW_SIZE = 32768      # Deflate history window
+
+# zlib constants
+Z_OK = 0
+Z_STREAM_END = 1
+Z_NEED_DICT = 2
+Z_BUF_ERROR = -5
+Z_BLOCK = 5
+
+
+# --- Minimal libz binding: Python's zlib module has no inflatePrime, which checkpoints need ---
+class ZStream(ctypes.Structure):
+    _fields_ = [
+        ("next_in", ctypes.c_void_p), ("avail_in", ctypes.c_uint), ("total_in", ctypes.c_ulong),
+        ("next_out", ctypes.c_void_p), ("avail_out", ctypes.c_uint), ("total_out", ctypes.c_ulong),
+        ("msg", ctypes.c_char_p), ("state", ctypes.c_void_p),
+        ("zalloc", ctypes.c_void_p), ("zfree", ctypes.c_void_p), ("opaque", ctypes.c_void_p),
+        ("data_type", ctypes.c_int), ("adler", ctypes.c_ulong), ("reserved", ctypes.c_ulong),
+    ]
+
+
+_libz = None
+
+
+def load_libz():
+    global _libz
+    if _libz is None:
+        _libz = False
+        name = ctypes.util.find_library("z") or ctypes.util.find_library("zlib1")
+        try:
+            lib = ctypes.CDLL(name)
+            stream_p = ctypes.POINTER(ZStream)
+            lib.zlibVersion.restype = ctypes.c_char_p
+            lib.inflateInit2_.argtypes = [stream_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+            lib.inflate.argtypes = [stream_p, ctypes.c_int]
+            lib.inflateEnd.argtypes = [stream_p]
+            lib.inflateReset.argtypes = [stream_p]
+            lib.inflateReset2.argtypes = [stream_p, ctypes.c_int]
+            lib.inflatePrime.argtypes = [stream_p, ctypes.c_int, ctypes.c_int]
+            lib.inflateSetDictionary.argtypes = [stream_p, ctypes.c_char_p, ctypes.c_uint]
+            _libz = lib
+        except (OSError, TypeError, AttributeError):
+            pass  # No usable libz: gzip archives fall back to streaming from the start
+    return _libz or None
+
+
+class GzipReader:
+    """Sequential reader over a gzip file that can start at a checkpoint and record new ones."""
+
+    def __init__(self, f, lib, checkpoint=None, span=None):
+        self.f = f
+        self.lib = lib
+        self.span = span
+        self.points = []
+        self.strm = ZStream()
+        self.in_buf = ctypes.create_string_buffer(CHUNK)
+        self.out_buf = ctypes.create_string_buffer(CHUNK)
+        self.pending = bytearray()
+        self.window = bytearray()
+        self.totin = 0
+        self.totout = 0
+        self.last = 0
+        self.done = False
+
+        if checkpoint is None:
+            self.raw = False
+            self._init(47)  # gzip / zlib header auto-detection
+        else:
+            # Resume raw inflate at the checkpoint: feed the partial byte, then restore the window
+            self.raw = True
+            bits = checkpoint["bits"]
+            f.seek(checkpoint["in"] - (1 if bits else 0))
+            self._init(-15)
+            if bits:
+                byte = f.read(1)[0]
+                lib.inflatePrime(ctypes.byref(self.strm), bits, byte >> (8 - bits))
+            window = checkpoint["window"]
+            if window:
+                lib.inflateSetDictionary(ctypes.byref(self.strm), window, len(window))
+            self.totin = checkpoint["in"]
+            self.totout = checkpoint["out"]
+
+    def _init(self, wbits):
+        version = self.lib.zlibVersion()
+        if self.lib.inflateInit2_(ctypes.byref(self.strm), wbits, version, ctypes.sizeof(ZStream)) != Z_OK:
+            raise RuntimeError("inflateInit2 failed")
+
+    def _refill(self):
+        n = self.f.readinto(self.in_buf)
+        self.strm.next_in = ctypes.addressof(self.in_buf)
+        self.strm.avail_in = n
+        return n
+
+    def _next_member(self):
+        # Raw inflate stops before the 8-byte gzip trailer; gzip mode consumes it itself
+        if self.raw:
+            skip = 8
+            while skip:
+                if not self.strm.avail_in and not self._refill():
+                    return False
+                step = min(skip, self.strm.avail_in)
+                self.strm.next_in += step
+                self.strm.avail_in -= step
+                self.totin += step
+                skip -= step
+        if not self.strm.avail_in and not self._refill():
+            return False
+        if ctypes.string_at(self.strm.next_in, 1) != b"\x1f":
+            return False  # Trailing padding, not another member
+        if self.raw:
+            self.lib.inflateReset2(ctypes.byref(self.strm), 47)
+            self.raw = False
+        else:
+            self.lib.inflateReset(ctypes.byref(self.strm))
+        return True
+
+    def _step(self):
+        strm = self.strm
+        if not strm.avail_in and not self._refill():
+            raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+
+        avail_in = strm.avail_in
+        strm.next_out = ctypes.addressof(self.out_buf)
+        strm.avail_out = CHUNK
+        ret = self.lib.inflate(ctypes.byref(strm), Z_BLOCK)
+        if ret not in (Z_OK, Z_STREAM_END, Z_BUF_ERROR):
+            raise zlib.error(f"inflate failed ({ret}): {strm.msg.decode() if strm.msg else ''}")
+
+        produced = CHUNK - strm.avail_out
+        self.totin += avail_in - strm.avail_in
+        self.totout += produced
+        if produced:
+            data = self.out_buf.raw[:produced]
+            self.pending += data
+            if self.span is not None:
+                self.window += data
+                if len(self.window) > WINDOW_SIZE:
+                    del self.window[:-WINDOW_SIZE]
+
+        # At a deflate block boundary (bit 7) that is not the end of the stream (bit 6)
+        if (self.span is not None and strm.data_type & 128 and not strm.data_type & 64
+                and (self.totout == 0 or self.totout - self.last > self.span)):
+            self.points.append({"in": self.totin, "out": self.totout,
+                                "bits": strm.data_type & 7, "window": bytes(self.window)})
+            self.last = self.totout
+
+        if ret == Z_STREAM_END and not self._next_member():
+            self.done = True
+
+    def read(self, size=-1):
+        while not self.done and (size < 0 or len(self.pending) < size):
+            self._step()
+        if size < 0:
+            size = len(self.pending)
+        data = bytes(self.pending[:size])
+        del self.pending[:size]
+        return data
+
+    def close(self):
+        self.lib.inflateEnd(ctypes.byref(self.strm))
+
+
+# --- Archive type detection ---
+def detect_kind(path):
+    with open(path, "rb") as f:
+        magic = f.read(6)
+    if magic.startswith(b"\x1f\x8b"):
+        return "gz"
+    if magic.startswith(b"BZh"):
+        return "bz2"
+    if magic.startswith(b"\xfd7zXZ\x00"):
+        return "xz"
+    if magic.startswith(b"PK"):
+        return "zip"
+    return "tar"
+
+
+def archive_signature(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def index_path_for(archive_path):
+    return archive_path + INDEX_SUFFIX
+
+
+# --- Index building ---
+def tar_members(fileobj, stream=False):
+    members = []
+    # Stream mode only reads forward, so it works on top of a decompressing reader (GzipReader);
+    # a seekable file is opened normally, so member data is skipped with seeks instead of read through
+    with tarfile.open(fileobj=fileobj, mode="r|" if stream else "r:") as tf:
+        for member in tf:
+            members.append({
+                "name": member.name,
+                "type": "file" if member.isfile() else "dir" if member.isdir() else "other",
+                "offset": member.offset_data,
+                "size": member.size,
+                "sparse": member.issparse(),
+            })
+    return members
+
+
+def build_index(archive_path, span=SPAN):
+    kind = detect_kind(archive_path)
+    index = {"version": INDEX_VERSION, "kind": kind, **archive_signature(archive_path), "checkpoints": []}
+
+    if kind == "zip":
+        with zipfile.ZipFile(archive_path) as zf:
+            index["members"] = [{
+                "name": info.filename,
+                "type": "dir" if info.is_dir() else "file",
+                "offset": info.header_offset,
+                "size": info.file_size,
+                "compressed_size": info.compress_size,
+            } for info in zf.infolist()]
+    elif kind == "gz" and load_libz():
+        with open(archive_path, "rb") as f:
+            reader = GzipReader(f, load_libz(), span=span)
+            try:
+                index["members"] = tar_members(reader, stream=True)
+                while not reader.done:
+                    reader.read(CHUNK)  # Keep recording checkpoints past the tar end marker
+                    reader.pending.clear()
+            finally:
+                reader.close()
+        index["checkpoints"] = [
+            {**p, "window": base64.b64encode(zlib.compress(p["window"])).decode("ascii")}
+            for p in reader.points
+        ]
+    else:
+        opener = {"gz": gzip.open, "bz2": bz2.open, "xz": lzma.open}.get(kind, open)
+        with opener(archive_path, "rb") as f:
+            index["members"] = tar_members(f)
+
+    with open(index_path_for(archive_path), "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    return index
+
+
+def load_index(archive_path, rebuild=False):
+    index_path = index_path_for(archive_path)
+    if not rebuild and os.path.exists(index_path):
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            signature = archive_signature(archive_path)
+            if index.get("version") == INDEX_VERSION and all(index.get(k) == v for k, v in signature.items()):
+                return index
+        except (OSError, ValueError):
+            pass
+    return build_index(archive_path)
+
+
+# --- Listing and extraction ---
+def list_members(archive_path):
+    return load_index(archive_path)["members"]
+
+
+def copy_range(src, dst, skip, length):
+    # Discard `skip` bytes then copy `length` bytes, in CHUNK-sized pieces
+    while skip:
+        data = src.read(min(CHUNK, skip))
+        if not data:
+            raise EOFError("Archive ended before the member offset")
+        skip -= len(data)
+    while length:
+        data = src.read(min(CHUNK, length))
+        if not data:
+            raise EOFError("Archive ended inside the member")
+        dst.write(data)
+        length -= len(data)
+
+
+def nearest_checkpoint(checkpoints, offset):
+    best = None
+    for point in checkpoints:
+        if point["out"] > offset:
+            break
+        best = point
+    return best
+
+
+def extract_member(archive_path, name, output_path=None):
+    index = load_index(archive_path)
+    member = next((m for m in index["members"] if m["name"] == name), None)
+    if member is None:
+        raise KeyError(f"No member named {name!r} in {archive_path}")
+    if member["type"] != "file":
+        raise ValueError(f"{name!r} is not a regular file")
+
+    output_path = output_path or os.path.basename(name)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    kind = index["kind"]
+
+    with open(output_path, "wb") as dst:
+        if kind == "zip":
+            with zipfile.ZipFile(archive_path) as zf, zf.open(name) as src:
+                shutil.copyfileobj(src, dst, CHUNK)
+        elif member.get("sparse"):
+            # Sparse members need tarfile's hole handling
+            with tarfile.open(archive_path, "r:*") as tf:
+                shutil.copyfileobj(tf.extractfile(name), dst, CHUNK)
+        elif kind == "tar":
+            with open(archive_path, "rb") as src:
+                src.seek(member["offset"])
+                copy_range(src, dst, 0, member["size"])
+        elif kind == "gz" and index["checkpoints"] and load_libz():
+            point = dict(nearest_checkpoint(index["checkpoints"], member["offset"]))
+            point["window"] = zlib.decompress(base64.b64decode(point["window"]))
+            with open(archive_path, "rb") as f:
+                reader = GzipReader(f, load_libz(), checkpoint=point)
+                try:
+                    copy_range(reader, dst, member["offset"] - point["out"], member["size"])
+                finally:
+                    reader.close()
+        else:
+            # bz2 / xz (or gzip without libz): no restart points, stream up to the member and stop there
+            opener = {"gz": gzip.open, "bz2": bz2.open, "xz": lzma.open}[kind]
+            with opener(archive_path, "rb") as src:
+                copy_range(src, dst, member["offset"], member["size"])
+    return output_path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="List or extract single members of large archives via a stored index.")
+    parser.add_argument("archive", help="tar, tar.gz, tar.bz2, tar.xz or zip archive")
+    parser.add_argument("--list", action="store_true", help="List members from the index")
+    parser.add_argument("--extract", metavar="NAME", help="Extract a single member")
+    parser.add_argument("-o", "--output", default=None, help="Output path for --extract (default: member basename)")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index even if it is up to date")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not os.path.isfile(args.archive):
+        print(f"❌ Archive not found: {args.archive}")
+        sys.exit(1)
+
+    index = load_index(args.archive, rebuild=args.rebuild)
+    if args.list or not args.extract:
+        for m in index["members"]:
+            print(f"{m['size']:>12}  {m['name']}{'/' if m['type'] == 'dir' else ''}")
+        print(f"\n📄 {len(index['members'])} member(s), {len(index['checkpoints'])} checkpoint(s)")
+    if args.extract:
+        try:
+            out = extract_member(args.archive, args.extract, args.output)
+            print(f"✅ Extracted: {args.extract} -> {out}")
+        except (KeyError, ValueError, EOFError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# Parallel block compression (pigz-style) - the input is cut into blocks that are compressed
+# on a process pool and written in order as a standard multi-member gz / multi-stream xz / bz2 file.
+# Folders are packed into a tar on the fly; files are streamed, never staged as copies.
+
+import os
+import bz2
+import gzip
+import lzma
+import time
+import filecmp
+import tarfile
+import tempfile
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+BLOCK_SIZE = 4 * 1024 * 1024  # Uncompressed bytes per block
+READ_SIZE = 1024 * 1024       # Bytes read from a file at a time
+
+# Format -> (suffix, default level)
+FORMATS = {
+    "gz": (".gz", 6),
+    "xz": (".xz", 6),
+    "bz2": (".bz2", 9),
+}
+
+
+# --- Worker: compress one block into a complete member/stream ---
+def compress_block(data, fmt, level):
+    if fmt == "gz":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if fmt == "xz":
+        return lzma.compress(data, format=lzma.FORMAT_XZ, preset=level)
+    return bz2.compress(data, compresslevel=level)
+
+
+class BlockWriter:
+    """File-like sink that compresses fixed-size blocks in parallel and writes them in order."""
+
+    def __init__(self, out_file, executor, fmt="gz", level=6, block_size=BLOCK_SIZE, max_pending=2):
+        self.out_file = out_file
+        self.executor = executor
+        self.fmt = fmt
+        self.level = level
+        self.block_size = block_size
+        self.max_pending = max_pending  # Blocks in flight; bounds memory use
+        self.buffer = bytearray()
+        self.pending = deque()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.bytes_in += len(data)
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def _submit(self, block):
+        self.pending.append(self.executor.submit(compress_block, block, self.fmt, self.level))
+        while len(self.pending) >= self.max_pending:
+            self._write_oldest()
+
+    def _write_oldest(self):
+        compressed = self.pending.popleft().result()
+        self.out_file.write(compressed)
+        self.bytes_out += len(compressed)
+
+    def close(self):
+        if self.buffer or not self.bytes_in:
+            self._submit(bytes(self.buffer))  # An empty input still gets one valid member
+            self.buffer = bytearray()
+        while self.pending:
+            self._write_oldest()
+
+
+def default_output(input_path, fmt):
+    base = os.path.normpath(input_path)
+    suffix = FORMATS[fmt][0]
+    return base + (".tar" + suffix if os.path.isdir(base) else suffix)
+
+
+# --- Compress a file or folder ---
+def compress_path(input_path, output_path=None, fmt="gz", level=None, block_size=BLOCK_SIZE, max_workers=None):
+    level = FORMATS[fmt][1] if level is None else level
+    output_path = output_path or default_output(input_path, fmt)
+
+    workers = max_workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(output_path, "wb") as out_file:
+        writer = BlockWriter(out_file, executor, fmt, level, block_size, max_pending=2 * workers)
+        if os.path.isdir(input_path):
+            # Stream mode ("w|") writes the tar sequentially straight into the block writer
+            with tarfile.open(fileobj=writer, mode="w|", bufsize=READ_SIZE) as tf:
+                tf.add(input_path, arcname=os.path.basename(os.path.normpath(input_path)))
+        else:
+            with open(input_path, "rb") as src:
+                while True:
+                    chunk = src.read(READ_SIZE)
+                    if not chunk:
+                        break
+                    writer.write(chunk)
+        writer.close()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "input": input_path,
+        "output": output_path,
+        "format": fmt,
+        "bytes_in": writer.bytes_in,
+        "bytes_out": writer.bytes_out,
+        "seconds": elapsed,
+        "mb_per_s": writer.bytes_in / (1024 * 1024) / elapsed if elapsed > 0 else 0.0,
+        "ratio": writer.bytes_in / writer.bytes_out if writer.bytes_out else 0.0,
+    }
+
+
+# --- Round-trip check ---
+def same_tree(left, right):
+    # Same names and byte-identical files, all the way down
+    cmp = filecmp.dircmp(left, right)
+    if cmp.left_only or cmp.right_only or cmp.funny_files:
+        return False
+    _, mismatch, errors = filecmp.cmpfiles(left, right, cmp.common_files, shallow=False)
+    return not mismatch and not errors and all(
+        same_tree(os.path.join(left, d), os.path.join(right, d)) for d in cmp.common_dirs)
+
+
+def verify_roundtrip(input_path, output_path, fmt):
+    """Extract output_path with decompress.py's own extractors and compare it with input_path."""
+    from decompress import extract_single, extract_tar
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if os.path.isdir(input_path):
+            extract_tar(output_path, tmp)
+            return same_tree(input_path, os.path.join(tmp, os.path.basename(os.path.normpath(input_path))))
+        extract_single(output_path, tmp, fmt, "roundtrip")
+        return filecmp.cmp(input_path, os.path.join(tmp, "roundtrip"), shallow=False)
+
+
+def print_report(report):
+    print()
+    print("📊 Compression Summary")
+    print("------------------------")
+    print(f"Output       : {report['output']}")
+    print(f"Input size   : {report['bytes_in'] / (1024 * 1024):.1f} MB")
+    print(f"Output size  : {report['bytes_out'] / (1024 * 1024):.1f} MB")
+    print(f"Ratio        : {report['ratio']:.2f}x")
+    print(f"Time         : {report['seconds']:.2f}s")
+    print(f"Throughput   : {report['mb_per_s']:.1f} MB/s")
+    print("------------------------")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compress a file or folder with parallel block compression.")
+    parser.add_argument("input", help="File or folder to compress (folders are packed into a tar)")
+    parser.add_argument("-o", "--output", default=None, help="Output file (default: input + .gz/.tar.gz/...)")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="gz", help="Compression format (default: gz)")
+    parser.add_argument("--level", type=int, default=None, help="Compression level (default: 6 for gz/xz, 9 for bz2)")
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE // 1024, help="Block size in KB (default: 4096)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of parallel workers (default: number of CPUs)")
+    parser.add_argument("--verify", action="store_true",
+                        help="Extract the output again with decompress.py and compare it with the input")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not os.path.exists(args.input):
+        print(f"❌ Input not found: {args.input}")
+    else:
+        report = compress_path(args.input, args.output, args.format, args.level,
+                               args.block_size * 1024, args.workers)
+        print_report(report)
+        if args.verify:
+            if verify_roundtrip(args.input, report["output"], args.format):
+                print("✅ Round trip matches the input")
+            else:
+                print("❌ Round trip differs from the input")
+                raise SystemExit(1)
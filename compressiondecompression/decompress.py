@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# Parallel recursive decompression - each archive is extracted into its own subfolder
+# zip/tar/gz/bz2/xz use the standard library; rar and 7z need unrar / 7z on PATH
+
+import os
+import bz2
+import gzip
+import json
+import lzma
+import shutil
+import tarfile
+import zipfile
+import argparse
+import subprocess
+from shutil import which
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+MANIFEST_NAME = ".extracted.json"
+CHUNK_SIZE = 1024 * 1024  # Members are copied in 1MB chunks, never buffered whole
+
+# Colors
+GREEN = "\033[0;32m"
+YELLOW = "\033[1;33m"
+RED = "\033[0;31m"
+NC = "\033[0m"  # No Color
+
+# Suffix -> format, longest suffixes first so .tar.gz wins over .gz
+FORMATS = [
+    (".tar.gz", "tar"), (".tgz", "tar"),
+    (".tar.bz2", "tar"), (".tbz2", "tar"), (".tbz", "tar"),
+    (".tar.xz", "tar"), (".txz", "tar"),
+    (".tar", "tar"),
+    (".zip", "zip"),
+    (".rar", "rar"),
+    (".7z", "7z"),
+    (".gz", "gz"),
+    (".bz2", "bz2"),
+    (".xz", "xz"),
+]
+
+SINGLE_FILE_OPENERS = {"gz": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+
+
+def detect_format(path):
+    lower = path.lower()
+    for suffix, fmt in FORMATS:
+        if lower.endswith(suffix):
+            return fmt, os.path.basename(path)[:-len(suffix)]
+    return None, None
+
+
+def is_within(directory, target):
+    directory = os.path.realpath(directory)
+    return os.path.commonpath([directory, os.path.realpath(target)]) == directory
+
+
+# --- Manifest ---
+def archive_signature(archive_path):
+    stat = os.stat(archive_path)
+    return {"archive": os.path.abspath(archive_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def already_extracted(archive_path, out_dir):
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return False
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    signature = archive_signature(archive_path)
+    return all(manifest.get(k) == v for k, v in signature.items())
+
+
+def write_manifest(archive_path, out_dir, files, total_bytes):
+    manifest = archive_signature(archive_path)
+    manifest.update({"files": files, "bytes": total_bytes})
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+# --- Extractors (each returns (files, bytes) written) ---
+def extract_zip(archive_path, out_dir):
+    files = total = 0
+    with zipfile.ZipFile(archive_path) as zf:
+        for info in zf.infolist():
+            target = os.path.join(out_dir, info.filename)
+            if not is_within(out_dir, target):
+                raise ValueError(f"Unsafe path in archive: {info.filename}")
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with zf.open(info) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            files += 1
+            total += info.file_size
+    return files, total
+
+
+def extract_tar(archive_path, out_dir):
+    files = total = 0
+    # "r:*" rather than stream mode: GzipFile, BZ2File and LZMAFile read every member of a
+    # multi-member stream, such as the parallel blocks written by compress.py
+    with tarfile.open(archive_path, mode="r:*") as tf:
+        for member in tf:
+            if not is_within(out_dir, os.path.join(out_dir, member.name)):
+                raise ValueError(f"Unsafe path in archive: {member.name}")
+            if hasattr(tarfile, "data_filter"):
+                tf.extract(member, out_dir, filter="data")
+            else:
+                tf.extract(member, out_dir)
+            if member.isfile():
+                files += 1
+                total += member.size
+    return files, total
+
+
+def extract_single(archive_path, out_dir, fmt, name):
+    target = os.path.join(out_dir, name)
+    with SINGLE_FILE_OPENERS[fmt](archive_path, "rb") as src, open(target, "wb") as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    return 1, os.path.getsize(target)
+
+
+def extract_external(archive_path, out_dir, fmt):
+    if fmt == "rar":
+        tool = which("unrar")
+        cmd = [tool, "x", "-o+", archive_path, out_dir + os.sep]
+    else:
+        tool = which("7z") or which("7za") or which("7zz")
+        cmd = [tool, "x", "-y", archive_path, f"-o{out_dir}"]
+    if not tool:
+        raise RuntimeError(f"No {fmt} extractor found on PATH; install {'unrar' if fmt == 'rar' else '7z'}")
+
+    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+
+    files = total = 0
+    for root, _, names in os.walk(out_dir):
+        for n in names:
+            files += 1
+            total += os.path.getsize(os.path.join(root, n))
+    return files, total
+
+
+# --- Decompress single archive into its own folder ---
+def decompress_file(archive_path, delete_after=False, force=False):
+    fmt, name = detect_format(archive_path)
+    result = {"archive": archive_path, "status": "unknown", "out_dir": None, "files": 0, "bytes": 0, "error": ""}
+    if fmt is None:
+        return result
+
+    out_dir = os.path.join(os.path.dirname(archive_path), name)
+    result["out_dir"] = out_dir
+
+    if not force and already_extracted(archive_path, out_dir):
+        result["status"] = "skipped"
+        return result
+
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        if fmt == "zip":
+            files, total = extract_zip(archive_path, out_dir)
+        elif fmt == "tar":
+            files, total = extract_tar(archive_path, out_dir)
+        elif fmt in SINGLE_FILE_OPENERS:
+            files, total = extract_single(archive_path, out_dir, fmt, name)
+        else:
+            files, total = extract_external(archive_path, out_dir, fmt)
+    except subprocess.CalledProcessError as e:
+        result["status"] = "failed"
+        result["error"] = e.stderr.decode(errors="replace").strip()
+        return result
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+        return result
+
+    write_manifest(archive_path, out_dir, files, total)
+    result.update({"status": "extracted", "files": files, "bytes": total})
+
+    if delete_after:
+        os.remove(archive_path)
+    return result
+
+
+def find_archives(folder):
+    archives = []
+    for root, _, files in os.walk(folder):
+        for f in files:
+            path = os.path.join(root, f)
+            if detect_format(path)[0] is not None:
+                archives.append(path)
+    return archives
+
+
+def log_result(result):
+    status = result["status"]
+    if status == "extracted":
+        print(f"{GREEN}✅ Done: {result['archive']} -> {result['out_dir']} ({result['files']} files){NC}")
+    elif status == "skipped":
+        print(f"{YELLOW}⏭ Already extracted: {result['archive']}{NC}")
+    elif status == "unknown":
+        print(f"{YELLOW}⚠️ Unknown format: {result['archive']} (skipped){NC}")
+    else:
+        print(f"{RED}❌ Failed: {result['archive']}{NC}\n   {result['error'][:500]}")
+
+
+# --- Main loop (parallel, optionally recursing into nested archives) ---
+def decompress_folder(folder=".", delete_after=False, recursive=False, force=False, max_workers=None, max_depth=5):
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = {
+            executor.submit(decompress_file, path, delete_after, force): 0
+            for path in find_archives(folder)
+        }
+        while pending:
+            for future in as_completed(list(pending)):
+                depth = pending.pop(future)
+                result = future.result()
+                results.append(result)
+                log_result(result)
+
+                # Nested archives are only looked for in freshly extracted output
+                if recursive and result["status"] == "extracted" and depth < max_depth:
+                    for nested in find_archives(result["out_dir"]):
+                        pending[executor.submit(decompress_file, nested, delete_after, force)] = depth + 1
+                break  # Re-enter as_completed so newly submitted nested jobs are awaited too
+    return results
+
+
+def print_summary(results):
+    counts = {s: sum(1 for r in results if r["status"] == s) for s in ("extracted", "skipped", "unknown", "failed")}
+    print()
+    print("📊 Decompression Summary")
+    print("------------------------")
+    print(f"Total archives found  : {len(results)}")
+    print(f"Successfully extracted: {GREEN}{counts['extracted']}{NC}")
+    print(f"Already extracted     : {YELLOW}{counts['skipped']}{NC}")
+    print(f"Failed                : {RED}{counts['failed']}{NC}")
+    print("------------------------")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract every archive in a folder, in parallel.")
+    parser.add_argument("folder", nargs="?", default=".", help="Folder to scan (default: current directory)")
+    parser.add_argument("--delete", action="store_true", help="Delete compressed files after extraction")
+    parser.add_argument("--recursive", action="store_true", help="Also extract archives found inside extracted archives")
+    parser.add_argument("--force", action="store_true", help="Re-extract even if the manifest says it is done")
+    parser.add_argument("--workers", type=int, default=None, help="Number of parallel workers (default: number of CPUs)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = decompress_folder(args.folder, args.delete, args.recursive, args.force, args.workers)
+    print_summary(results)
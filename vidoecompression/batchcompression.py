@@ -0,0 +1,239 @@
+# Import necessary modules
+import argparse    # Used to read command-line arguments
+import json        # Used to write the JSON-lines results log
+import os          # Used to scan folders and check file sizes
+import subprocess  # Used to run ffmpeg with progress output
+import threading   # Used to serialize progress printing
+import time        # Used for wall-clock timing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from videocompression import VideoCompressor
+
+VIDEO_EXTS = (".mp4", ".mkv", ".mov", ".avi", ".webm", ".m4v", ".wmv", ".flv")
+PROGRESS_INTERVAL = 2.0  # Seconds between progress lines per job
+
+print_lock = threading.Lock()
+
+
+# Collect the input videos from a folder (recursively) or a queue file (one path per line)
+def collect_inputs(folder=None, queue_file=None):
+    inputs = []
+    if folder:
+        for root, _, files in os.walk(folder):
+            for f in sorted(files):
+                if os.path.splitext(f)[1].lower() in VIDEO_EXTS:
+                    inputs.append(os.path.join(root, f))
+    if queue_file:
+        with open(queue_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    inputs.append(line)
+    return inputs
+
+
+# Parse one block of `ffmpeg -progress` key=value lines into progress numbers
+def parse_progress(block, duration, last_out_time=0.0):
+    out_time_us = block.get("out_time_us") or block.get("out_time_ms")  # Both are microseconds
+    try:
+        out_time = int(out_time_us) / 1_000_000
+    except (TypeError, ValueError):
+        out_time = last_out_time  # Reported as N/A now and then; keep the last known position
+
+    try:
+        speed = float(block.get("speed", "0").rstrip("x"))
+    except ValueError:
+        speed = 0.0  # Reported as N/A at the start
+
+    try:
+        fps = float(block.get("fps", 0))
+    except ValueError:
+        fps = 0.0
+
+    try:
+        total_size = int(block.get("total_size", 0))
+    except ValueError:
+        total_size = 0
+
+    percent = min(100.0, out_time / duration * 100) if duration else 0.0
+    eta = (duration - out_time) / speed if speed > 0 else None
+
+    return {
+        "out_time": out_time,
+        "percent": percent,
+        "fps": fps,
+        "speed": speed,
+        "eta": eta,
+        "size_mb": total_size / (1024 * 1024),
+        "done": block.get("progress") == "end",
+    }
+
+
+# Print a progress line for a job
+def report_progress(name, progress):
+    eta = f"{progress['eta']:.0f}s" if progress["eta"] is not None else "?"
+    with print_lock:
+        print(f"⏳ {name}: {progress['percent']:5.1f}% fps={progress['fps']:.1f} "
+              f"speed={progress['speed']:.2f}x eta={eta} size={progress['size_mb']:.1f}MB", flush=True)
+
+
+# Compress one video while parsing live progress from ffmpeg, return a result record
+def compress_with_progress(input_path, output_path, target_size_mb, threads):
+    compressor = VideoCompressor(input_path, output_path, target_size_mb)
+    name = os.path.basename(input_path)
+    record = {
+        "input": input_path,
+        "output": output_path,
+        "target_size_mb": target_size_mb,
+        "threads": threads,
+        "status": "Failed",
+        "error": "",
+    }
+
+    start = time.perf_counter()
+    try:
+        duration = compressor.get_duration()
+        record["duration_s"] = duration
+        record["input_size_mb"] = os.path.getsize(input_path) / (1024 * 1024)
+
+        command = compressor.build_command(
+            compressor.get_video_bitrate_kbps(duration), threads,
+            extra_args=['-y', '-nostats', '-loglevel', 'error', '-progress', 'pipe:1']
+        )
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   stdin=subprocess.DEVNULL, text=True)
+
+        # stderr only carries errors at this log level; drain it on a thread so ffmpeg never blocks
+        stderr_lines = []
+        stderr_thread = threading.Thread(target=lambda: stderr_lines.extend(process.stderr), daemon=True)
+        stderr_thread.start()
+
+        block = {}
+        last_report = 0.0
+        speeds = []
+        out_time = 0.0
+        for line in process.stdout:
+            key, _, value = line.strip().partition("=")
+            block[key] = value
+            if key != "progress":
+                continue
+
+            # "progress" closes each block
+            progress = parse_progress(block, duration, out_time)
+            out_time = progress["out_time"]
+            if progress["speed"] > 0:
+                speeds.append(progress["speed"])
+            now = time.perf_counter()
+            if progress["done"] or now - last_report >= PROGRESS_INTERVAL:
+                report_progress(name, progress)
+                last_report = now
+            block = {}
+
+        process.wait()
+        stderr_thread.join()
+        if process.returncode != 0:
+            record["error"] = "".join(stderr_lines).strip()[-2000:]
+        else:
+            record["status"] = "Done"
+            record["output_size_mb"] = os.path.getsize(output_path) / (1024 * 1024)
+            record["avg_speed"] = sum(speeds) / len(speeds) if speeds else None
+    except Exception as e:
+        record["error"] = str(e)
+
+    if record["status"] != "Done" and os.path.exists(output_path):
+        os.remove(output_path)  # Do not leave a partial file that looks like a result
+
+    record["wall_s"] = time.perf_counter() - start
+    if record.get("duration_s") and record["status"] == "Done":
+        record["realtime_factor"] = record["duration_s"] / record["wall_s"]  # Media seconds per wall second
+    return record
+
+
+# Output path for each input: its path relative to the inputs' common folder, under output_dir,
+# so same-named videos from different subfolders do not overwrite each other.
+# Outputs are always MP4 (H.264 + AAC, see VideoCompressor.build_command); containers such as WebM
+# cannot hold that, so x.webm becomes x.mp4, or x.webm.mp4 if an input x.mp4 sits next to it.
+def output_paths(inputs, output_dir):
+    dirs = [os.path.dirname(os.path.abspath(p)) for p in inputs]
+    root = os.path.commonpath(dirs) if dirs else ""
+    outputs, taken = {}, set()
+    for p in sorted(inputs, key=lambda p: os.path.splitext(p)[1].lower() != ".mp4"):  # MP4 inputs keep their name
+        relative = os.path.relpath(os.path.abspath(p), root)
+        output = os.path.join(output_dir, os.path.splitext(relative)[0] + ".mp4")
+        if output in taken:
+            output = os.path.join(output_dir, relative + ".mp4")
+        taken.add(output)
+        outputs[p] = output
+    return outputs
+
+
+# Compress all inputs with at most `jobs` concurrent encodes sharing a CPU budget
+def run_batch(inputs, output_dir, target_size_mb, cpu_budget=None, jobs=1, log_path="compression_log.jsonl"):
+    cpu_budget = cpu_budget or os.cpu_count() or 1
+    jobs = max(1, min(jobs, cpu_budget, len(inputs) or 1))
+    threads = max(1, cpu_budget // jobs)  # Threads each ffmpeg may use
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"📦 {len(inputs)} video(s), {jobs} concurrent job(s) x {threads} thread(s)")
+
+    batch_start = time.perf_counter()
+    results = []
+    with ThreadPoolExecutor(max_workers=jobs) as executor, open(log_path, "a", encoding="utf-8") as log:
+        futures = {}
+        for input_path, output_path in output_paths(inputs, output_dir).items():
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            futures[executor.submit(compress_with_progress, input_path, output_path, target_size_mb, threads)] = input_path
+
+        for future in as_completed(futures):
+            record = future.result()
+            results.append(record)
+            log.write(json.dumps(record) + "\n")
+            log.flush()
+            with print_lock:
+                if record["status"] == "Done":
+                    print(f"✅ {record['input']} -> {record['output']} "
+                          f"({record['output_size_mb']:.1f}MB in {record['wall_s']:.1f}s)")
+                else:
+                    print(f"❌ {record['input']}: {record['error']}")
+
+    wall = time.perf_counter() - batch_start
+    done = [r for r in results if r["status"] == "Done"]
+    media_seconds = sum(r.get("duration_s", 0) for r in done)
+    input_mb = sum(r.get("input_size_mb", 0) for r in done)
+
+    print("\n📊 Batch Summary")
+    print("------------------------")
+    print(f"Compressed      : {len(done)}/{len(results)}")
+    print(f"Wall time       : {wall:.1f}s")
+    if wall > 0:
+        print(f"Throughput      : {media_seconds / wall:.2f} media s/s, {input_mb / wall:.2f} input MB/s")
+    print(f"Log             : {log_path}")
+    return results
+
+
+# Entry point of the script
+def main():
+    parser = argparse.ArgumentParser(description="Compress a folder or queue of videos with progress telemetry.")
+    parser.add_argument("folder", nargs="?", help="Folder of videos to compress (searched recursively)")
+    parser.add_argument("--queue", help="Text file with one input path per line")
+    parser.add_argument("--output-dir", default="compressed", help="Output folder (default: compressed)")
+    parser.add_argument("--target-size-mb", type=int, default=950, help="Target size per video in MB (default: 950)")
+    parser.add_argument("--cpu-budget", type=int, default=None, help="Total CPU threads for all jobs (default: number of CPUs)")
+    parser.add_argument("--jobs", type=int, default=1, help="Concurrent encodes (default: 1)")
+    parser.add_argument("--log", default="compression_log.jsonl", help="JSON-lines results log (default: compression_log.jsonl)")
+    args = parser.parse_args()
+
+    if not args.folder and not args.queue:
+        parser.error("provide a folder or --queue")
+
+    inputs = collect_inputs(args.folder, args.queue)
+    if not inputs:
+        print("No videos found.")
+        return
+
+    run_batch(inputs, args.output_dir, args.target_size_mb, args.cpu_budget, args.jobs, args.log)
+
+
+# Run main function if the script is executed directly
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,32 @@
 # Import necessary modules
 import subprocess  # Used to run external commands (ffmpeg and ffprobe)
-import sys         # Used to read command-line arguments
+import argparse    # Used to read command-line arguments
 import os          # Used to check file existence
+import glob        # Used to collect the split segments
+import json        # Used to parse ffprobe output
+import tempfile    # Used for the segment and pass-log working directories
+from concurrent.futures import ThreadPoolExecutor  # Used to run segment encodes concurrently
+
+AUDIO_BITRATE_KBPS = 128   # AAC audio bitrate used for every encode
+MUX_OVERHEAD = 0.01        # Fraction of the file taken by container overhead (MP4/MKV headers, indexes)
+SAMPLE_SECONDS = 10        # Length of each sample encode used to predict the final size
+
+# ffprobe results per input, keyed by (real path, size, mtime) so modified files are re-probed
+_probe_cache = {}
+
+# Run ffprobe once per file version and return its format/stream info
+def probe(path):
+    stat = os.stat(path)
+    key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _probe_cache:
+        result = subprocess.run([
+            'ffprobe', '-v', 'error',  # Suppress extra output
+            '-show_format', '-show_streams',  # Request container and stream info
+            '-of', 'json',
+            path
+        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        _probe_cache[key] = json.loads(result.stdout)
+    return _probe_cache[key]
 
 # Define a class to handle video compression
 class VideoCompressor:
@@ -11,52 +36,261 @@ class VideoCompressor:
         self.output_path = output_path
         self.target_size_mb = target_size_mb  # Desired file size in megabytes
 
-    # Get the duration of the video using ffprobe
-    def get_duration(self):
-        result = subprocess.run([
-            'ffprobe', '-v', 'error',  # Suppress extra output
-            '-show_entries', 'format=duration',  # Request duration info
-            '-of', 'default=noprint_wrappers=1:nokey=1',  # Simplify output format
-            self.input_path
-        ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-        
-        # Convert result to float (seconds) and return
-        return float(result.stdout)
+    # Get the duration of the video using ffprobe (defaults to the input file)
+    def get_duration(self, path=None):
+        return float(probe(path or self.input_path)['format']['duration'])
 
-    # Perform the compression using ffmpeg
-    def compress(self):
-        duration = self.get_duration()  # Get video duration in seconds
+    # Check whether the input has an audio stream (it is re-encoded at AUDIO_BITRATE_KBPS)
+    def has_audio(self):
+        return any(stream.get('codec_type') == 'audio' for stream in probe(self.input_path).get('streams', []))
 
-        # Calculate target bitrate in bits per second
-        target_bitrate = (self.target_size_mb * 1024 * 1024 * 8) / duration
-        
-        # Convert target bitrate to kilobits per second
-        video_bitrate_kbps = int(target_bitrate / 1000)
+    # Calculate the video bitrate in kilobits per second that fills size_mb (defaults to the target)
+    def get_video_bitrate_kbps(self, duration, size_mb=None):
+        size_mb = size_mb or self.target_size_mb
+        total_bits = size_mb * 1024 * 1024 * 8 * (1 - MUX_OVERHEAD)  # Bits left after container overhead
+        audio_bits = AUDIO_BITRATE_KBPS * 1000 * duration if self.has_audio() else 0
 
-        # Run ffmpeg to compress the video with calculated bitrate
-        subprocess.run([
+        # Convert the remaining video bits to kilobits per second (never below 1k)
+        return max(1, int((total_bits - audio_bits) / duration / 1000))
+
+    # Build the ffmpeg command that compresses the video with the given bitrate
+    def build_command(self, video_bitrate_kbps, threads=None, extra_args=(), constrained=True):
+        command = [
             'ffmpeg', '-i', self.input_path,  # Input file
+            '-c:v', 'libx264',  # H.264 whatever the output extension, so preset and bitrate apply
             '-b:v', f'{video_bitrate_kbps}k',  # Set video bitrate
-            '-bufsize', f'{video_bitrate_kbps}k',  # Set buffer size
-            '-maxrate', f'{video_bitrate_kbps}k',  # Set max bitrate
+        ]
+        if constrained:
+            command += [
+                '-bufsize', f'{video_bitrate_kbps}k',  # Set buffer size
+                '-maxrate', f'{video_bitrate_kbps}k',  # Set max bitrate
+            ]
+        command += [
             '-preset', 'slow',  # Use slow preset for better compression
-            '-c:a', 'aac', '-b:a', '128k',  # Use AAC audio codec with 128k bitrate
-            self.output_path  # Output file
-        ])
+            '-c:a', 'aac', '-b:a', f'{AUDIO_BITRATE_KBPS}k',  # Use AAC audio codec with 128k bitrate
+        ]
+        if threads:
+            command += ['-threads', str(threads)]  # Limit encoder threads
+        command += list(extra_args)
+        command.append(self.output_path)  # Output file
+        return command
+
+    # Run a two-pass ABR encode: the first pass only writes the rate-control log
+    def encode_two_pass(self, video_bitrate_kbps):
+        output_dir = os.path.dirname(os.path.abspath(self.output_path))
+        with tempfile.TemporaryDirectory(prefix='passlog_', dir=output_dir) as work_dir:
+            passlog = os.path.join(work_dir, 'ffmpeg2pass')
+            subprocess.run([
+                'ffmpeg', '-v', 'error', '-y', '-i', self.input_path,
+                '-c:v', 'libx264', '-b:v', f'{video_bitrate_kbps}k',
+                '-preset', 'slow',
+                '-pass', '1', '-passlogfile', passlog,
+                '-an', '-f', 'null', os.devnull
+            ], check=True)
+            subprocess.run(self.build_command(
+                video_bitrate_kbps,
+                extra_args=['-y', '-pass', '2', '-passlogfile', passlog],
+                constrained=False  # Let two-pass ABR distribute bits across the whole video
+            ), check=True)
+
+    # Encode short samples spread over the input and scale the bitrate by how far they missed it
+    def calibrate_bitrate(self, video_bitrate_kbps, duration, sample_count):
+        sample_seconds = min(SAMPLE_SECONDS, duration / sample_count)
+        requested_bits = 0
+        achieved_bits = 0
+
+        with tempfile.TemporaryDirectory(prefix='samples_') as work_dir:
+            for i in range(sample_count):
+                # Place samples at the centres of equal slices of the video
+                start = duration * (i + 0.5) / sample_count - sample_seconds / 2
+                sample_path = os.path.join(work_dir, f'sample_{i}.mp4')
+                subprocess.run([
+                    'ffmpeg', '-v', 'error', '-y',
+                    '-ss', f'{max(0.0, start):.3f}', '-t', f'{sample_seconds:.3f}',
+                    '-i', self.input_path,
+                    '-b:v', f'{video_bitrate_kbps}k',
+                    '-bufsize', f'{video_bitrate_kbps}k',
+                    '-maxrate', f'{video_bitrate_kbps}k',
+                    '-preset', 'slow', '-an',
+                    sample_path
+                ], check=True)
+                requested_bits += video_bitrate_kbps * 1000 * sample_seconds
+                achieved_bits += os.path.getsize(sample_path) * 8
+
+        # Clamp the correction so one odd sample cannot wreck the estimate
+        ratio = min(2.0, max(0.5, requested_bits / achieved_bits)) if achieved_bits else 1.0
+        return max(1, int(video_bitrate_kbps * ratio))
+
+    # Predict the output size in MB for a video bitrate
+    def predict_size_mb(self, video_bitrate_kbps, duration):
+        audio_kbps = AUDIO_BITRATE_KBPS if self.has_audio() else 0
+        total_bits = (video_bitrate_kbps + audio_kbps) * 1000 * duration
+        return total_bits / (1 - MUX_OVERHEAD) / (8 * 1024 * 1024)
+
+    # Perform the compression using ffmpeg
+    # With a tolerance, the output must land in [target * (1 - tolerance), target]; one corrective
+    # re-encode is run if the first attempt misses that window, and a warning printed if that misses too.
+    def compress(self, two_pass=False, sample_count=0, tolerance=None):
+        duration = self.get_duration()  # Get video duration in seconds
+
+        # Aim at the middle of the tolerance window rather than its upper edge
+        aim_mb = self.target_size_mb * (1 - tolerance / 2) if tolerance else self.target_size_mb
+        video_bitrate_kbps = self.get_video_bitrate_kbps(duration, aim_mb)
+
+        if sample_count:
+            video_bitrate_kbps = self.calibrate_bitrate(video_bitrate_kbps, duration, sample_count)
+            print(f"Sample encodes: using {video_bitrate_kbps}k video, "
+                  f"predicted size {self.predict_size_mb(video_bitrate_kbps, duration):.1f}MB")
+
+        def encode(bitrate):
+            if two_pass:
+                self.encode_two_pass(bitrate)
+            else:
+                # Run ffmpeg to compress the video with calculated bitrate
+                subprocess.run(self.build_command(bitrate, extra_args=['-y'] if tolerance else ()), check=True)
+
+        encode(video_bitrate_kbps)
+        if tolerance is None:
+            return
+
+        size_mb = os.path.getsize(self.output_path) / (1024 * 1024)
+        low_mb = self.target_size_mb * (1 - tolerance)
+        if low_mb <= size_mb <= self.target_size_mb:
+            return size_mb
+
+        # Corrective pass: scale the video bitrate by how far the video part missed
+        audio_mb = self.predict_size_mb(0, duration)
+        achieved_video_mb = max(size_mb - audio_mb, 0.001)
+        wanted_video_mb = max(aim_mb - audio_mb, 0.001)
+        corrected_kbps = max(1, int(video_bitrate_kbps * wanted_video_mb / achieved_video_mb))
+        print(f"Output {size_mb:.1f}MB outside {low_mb:.1f}-{self.target_size_mb}MB, "
+              f"re-encoding at {corrected_kbps}k (was {video_bitrate_kbps}k)")
+        encode(corrected_kbps)
+        size_mb = os.path.getsize(self.output_path) / (1024 * 1024)
+        if not low_mb <= size_mb <= self.target_size_mb:
+            print(f"Warning: output {size_mb:.1f}MB is still outside {low_mb:.1f}-{self.target_size_mb}MB "
+                  f"after the corrective pass")
+        return size_mb
+
+    # Split the input at keyframes into segments of roughly segment_seconds (stream copy, no re-encode)
+    def split_segments(self, work_dir, segment_seconds):
+        subprocess.run([
+            'ffmpeg', '-v', 'error', '-y', '-i', self.input_path,
+            '-map', '0:v:0',  # Video only; audio is encoded once from the original
+            '-c', 'copy',  # Cut on existing keyframes without re-encoding
+            '-f', 'segment',
+            '-segment_time', str(segment_seconds),
+            '-reset_timestamps', '1',  # Each segment starts at t=0
+            os.path.join(work_dir, 'segment_%05d.mkv')
+        ], check=True)
+        return sorted(glob.glob(os.path.join(work_dir, 'segment_*.mkv')))
+
+    # Encode a single video segment at the given bitrate
+    def encode_segment(self, segment_path, video_bitrate_kbps, threads):
+        # Rename the file only; the work dir itself may contain 'segment_'
+        folder, name = os.path.split(segment_path)
+        output = os.path.join(folder, name.replace('segment_', 'encoded_', 1))
+        subprocess.run([
+            'ffmpeg', '-v', 'error', '-y', '-i', segment_path,
+            '-c:v', 'libx264',
+            '-b:v', f'{video_bitrate_kbps}k',  # Same bitrate for every segment
+            '-bufsize', f'{video_bitrate_kbps}k',
+            '-maxrate', f'{video_bitrate_kbps}k',
+            '-preset', 'slow',
+            '-threads', str(threads),  # Share the cores between concurrent encodes
+            '-an',
+            output
+        ], check=True)
+        return output
+
+    # Encode the audio track of the whole input once
+    def encode_audio(self, work_dir):
+        output = os.path.join(work_dir, 'audio.m4a')
+        result = subprocess.run([
+            'ffmpeg', '-v', 'error', '-y', '-i', self.input_path,
+            '-vn', '-c:a', 'aac', '-b:a', f'{AUDIO_BITRATE_KBPS}k',
+            output
+        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # Inputs without an audio stream simply produce no audio file
+        return output if result.returncode == 0 and os.path.exists(output) else None
+
+    # Stream-copy concatenate the encoded segments (and audio) into the output file
+    def concat_segments(self, work_dir, encoded_segments, audio_path):
+        list_path = os.path.join(work_dir, 'segments.txt')
+        with open(list_path, 'w') as f:
+            for segment in encoded_segments:
+                escaped = segment.replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+
+        command = ['ffmpeg', '-v', 'error', '-y', '-f', 'concat', '-safe', '0', '-i', list_path]
+        if audio_path:
+            command += ['-i', audio_path, '-map', '0:v', '-map', '1:a']
+        command += ['-c', 'copy', self.output_path]
+        subprocess.run(command, check=True)
+
+    # Check the output duration against the input and the output size against the target
+    def verify_output(self, input_duration, duration_tolerance=1.0):
+        problems = []
+        output_duration = self.get_duration(self.output_path)
+        if abs(output_duration - input_duration) > max(duration_tolerance, input_duration * 0.001):
+            problems.append(f"Duration mismatch: input {input_duration:.2f}s, output {output_duration:.2f}s")
+
+        size_mb = os.path.getsize(self.output_path) / (1024 * 1024)
+        if size_mb > self.target_size_mb:
+            problems.append(f"Output is {size_mb:.1f}MB, above the {self.target_size_mb}MB target")
+        return problems
+
+    # Perform the compression by encoding keyframe-aligned segments concurrently
+    def compress_parallel(self, workers=None, segment_seconds=60):
+        duration = self.get_duration()
+        video_bitrate_kbps = self.get_video_bitrate_kbps(duration)
+
+        workers = workers or os.cpu_count() or 1
+        threads = max(1, (os.cpu_count() or 1) // workers)  # Threads per ffmpeg process
+
+        output_dir = os.path.dirname(os.path.abspath(self.output_path))
+        with tempfile.TemporaryDirectory(prefix='segments_', dir=output_dir) as work_dir:
+            segments = self.split_segments(work_dir, segment_seconds)
+            print(f"Split into {len(segments)} segments, encoding with {workers} workers")
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Submit the audio encode alongside the video segments
+                audio_future = executor.submit(self.encode_audio, work_dir)
+                encoded = list(executor.map(
+                    lambda segment: self.encode_segment(segment, video_bitrate_kbps, threads),
+                    segments
+                ))
+                audio_path = audio_future.result()
+
+            self.concat_segments(work_dir, encoded, audio_path)
+
+        return self.verify_output(duration)
 
 # Entry point of the script
 def main():
-    # Check if there are enough command-line arguments
-    if len(sys.argv) < 3:
-        print("Usage: python compress.py input.mp4 output.mp4 [target_size_mb]")
-        return
+    parser = argparse.ArgumentParser(description="Compress a video to a target size.")
+    parser.add_argument("input_path", help="Input video file")
+    parser.add_argument("output_path", help="Output video file")
+    # Target size is optional, default is 950MB
+    parser.add_argument("target_size_mb", nargs="?", type=int, default=950, help="Target size in MB (default: 950)")
+    parser.add_argument("--parallel", action="store_true", help="Split at keyframes and encode segments concurrently")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent segment encodes (default: number of CPUs)")
+    parser.add_argument("--segment-seconds", type=int, default=60, help="Approximate segment length in seconds (default: 60)")
+    parser.add_argument("--two-pass", action="store_true", help="Use two-pass ABR for accurate sizing")
+    parser.add_argument("--samples", type=int, default=0, help="Short sample encodes used to predict the final size (default: 0)")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="Allowed undershoot as a fraction of the target, e.g. 0.03; enables one corrective pass")
+    args = parser.parse_args()
+    # The parallel path sizes each segment from the target alone; it has no two-pass, sampling or correction
+    if args.parallel:
+        unsupported = [flag for flag, used in (("--two-pass", args.two_pass), ("--samples", args.samples),
+                                               ("--tolerance", args.tolerance is not None)) if used]
+        if unsupported:
+            parser.error(f"--parallel cannot be combined with {', '.join(unsupported)}")
 
-    # Get input and output paths from arguments
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
-    
-    # Get target size from arguments if provided, else use default (950MB)
-    target_size_mb = int(sys.argv[3]) if len(sys.argv) > 3 else 950
+    input_path = args.input_path
+    output_path = args.output_path
+    target_size_mb = args.target_size_mb
 
     # Check if input file exists
     if not os.path.exists(input_path):
@@ -65,7 +299,17 @@ def main():
 
     # Create a VideoCompressor instance and compress the video
     compressor = VideoCompressor(input_path, output_path, target_size_mb)
-    compressor.compress()
+    try:
+        if args.parallel:
+            problems = compressor.compress_parallel(args.workers, args.segment_seconds)
+            for problem in problems:
+                print(f"Warning: {problem}")
+        else:
+            compressor.compress(args.two_pass, args.samples, args.tolerance)
+    except subprocess.CalledProcessError as e:
+        # ffmpeg has already printed why; do not report a size measured from a missing or stale file
+        print(f"Compression failed: {e.cmd[0]} exited with code {e.returncode}")
+        raise SystemExit(1)
 
     # Notify user that compression is complete
     print(f"Compression complete: {output_path}")